@@ -0,0 +1,58 @@
+"""Memory benchmark for the flat DOM arena.
+
+Parses the same synthetic document into Element and Text objects and into
+a DOMArena, and reports the memory each tree keeps (tracemalloc, after
+the parse, not counting the source string both start from) and the parse
+time (timed separately, as tracing slows allocation down).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_arena [megabytes]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+
+from dom.htmlparser import HTMLParser
+from tests.reference_parser import make_document
+
+
+def measure(source, arena):
+    start = time.perf_counter()
+    HTMLParser(source, arena=arena).parse()
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    tree = HTMLParser(source, arena=arena).parse()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return tree, size, peak, elapsed
+
+
+def bench(megabytes):
+    source = make_document(int(megabytes * 1024 * 1024))
+    print(f"document: {len(source) / 1024 / 1024:.1f} MB")
+
+    for name, arena in [("objects", False), ("arena", True)]:
+        tree, size, peak, elapsed = measure(source, arena)
+        if arena:
+            count = len(tree.arena)
+        else:
+            count = 0
+            stack = [tree]
+            while stack:
+                count += 1
+                stack.extend(stack.pop().children)
+        print(
+            f"{name:8} {count} nodes: {size / 1024 / 1024:6.1f} MB kept "
+            f"({size / count:.0f} bytes per node), "
+            f"peak {peak / 1024 / 1024:.1f} MB, parsed in {elapsed:.2f}s"
+        )
+        del tree
+
+
+if __name__ == "__main__":
+    bench(float(sys.argv[1]) if len(sys.argv) > 1 else 2)
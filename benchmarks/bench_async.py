@@ -0,0 +1,119 @@
+"""Concurrent fetch benchmark for URL.request_async.
+
+Runs a small keep-alive HTTP/1.1 server on asyncio streams in a
+background thread, answering every request after a fixed latency (some
+responses chunked, some gzipped), then fetches the same set of URLs with
+blocking URL.request() calls on a thread pool and with request_async()
+on a single event loop, at the same concurrency.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_async [requests] [concurrency] [latency_ms]
+"""
+
+import asyncio
+import gzip
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from network.cache import Cache
+from network.sockets import AsyncSockets, Sockets
+from network.url import URL
+
+BODY = b"<p>" + b"crawl me " * 200 + b"</p>"
+
+
+async def handle(reader, writer, latency):
+    try:
+        while True:
+            statusline = await reader.readline()
+            if not statusline:
+                break
+            while (await reader.readline()) not in (b"\r\n", b""):
+                pass
+            await asyncio.sleep(latency)
+
+            path = statusline.split()[1]
+            headers = b"HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n"
+            headers += b"Cache-Control: no-store\r\n"
+            body = BODY
+            if path.endswith(b"0"):
+                body = gzip.compress(body)
+                headers += b"Content-Encoding: gzip\r\n"
+            if path.endswith(b"1"):
+                half = len(body) // 2
+                writer.write(headers + b"Transfer-Encoding: chunked\r\n\r\n")
+                for chunk in (body[:half], body[half:]):
+                    writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                writer.write(b"0\r\n\r\n")
+            else:
+                headers += b"Content-Length: %d\r\n\r\n" % len(body)
+                writer.write(headers + body)
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+def start_server(latency):
+    started = threading.Event()
+    address = []
+
+    async def serve():
+        server = await asyncio.start_server(
+            lambda r, w: handle(r, w, latency), "127.0.0.1", 0, backlog=4096
+        )
+        address.append(server.sockets[0].getsockname()[1])
+        started.set()
+        await server.serve_forever()
+
+    threading.Thread(target=asyncio.run, args=(serve(),), daemon=True).start()
+    started.wait()
+    return address[0]
+
+
+def fetch_threads(urls, concurrency):
+    Sockets.configure(max_per_host=concurrency, max_total=concurrency)
+    with ThreadPoolExecutor(concurrency) as pool:
+        return list(pool.map(lambda url: URL(url).request(), urls))
+
+
+async def fetch_async(urls, concurrency):
+    pool = AsyncSockets(max_per_host=concurrency, max_total=concurrency)
+    bodies = await asyncio.gather(*[URL(url).request_async(pool=pool) for url in urls])
+    pool.close_all()
+    print(f"  async pool: {pool.stats()}")
+    return bodies
+
+
+def bench(count, concurrency, latency):
+    port = start_server(latency)
+    urls = [f"http://127.0.0.1:{port}/page/{i}" for i in range(count)]
+    expected = BODY.decode()
+    Cache.clear()
+
+    print(f"{count} requests, concurrency {concurrency}, {latency * 1000:.0f} ms")
+
+    start = time.perf_counter()
+    bodies = fetch_threads(urls, concurrency)
+    threaded = time.perf_counter() - start
+    assert bodies == [expected] * count
+
+    start = time.perf_counter()
+    bodies = asyncio.run(fetch_async(urls, concurrency))
+    asynchronous = time.perf_counter() - start
+    assert bodies == [expected] * count
+
+    print(f"threads: {threaded:.2f} s ({count / threaded:.0f} requests/s)")
+    print(f"asyncio: {asynchronous:.2f} s ({count / asynchronous:.0f} requests/s)")
+
+
+if __name__ == "__main__":
+    bench(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 300,
+        float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.05,
+    )
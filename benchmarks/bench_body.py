@@ -0,0 +1,114 @@
+"""Peak memory benchmark for reading response bodies.
+
+Serves a multi-megabyte page from a local http.server with a
+Content-Length, chunked, gzip and deflate, and reports the tracemalloc
+peak while URL.request() reads it, as a multiple of the page size. The
+raw bytes and the decoded text have to coexist while decoding, so 2.0x
+is the floor for an ASCII page. The last row is a cache hit.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_body [megabytes]
+"""
+
+import gzip
+import http.server
+import socketserver
+import sys
+import threading
+import time
+import tracemalloc
+import zlib
+
+from network.cache import Cache
+from network.url import URL
+
+
+def make_page(size):
+    line = "<p>Line {0} of a large page with plain ASCII text.</p>\n"
+    parts = ["<html><body>\n"]
+    length = 0
+    i = 0
+    while length < size:
+        part = line.format(i)
+        parts.append(part)
+        length += len(part)
+        i += 1
+    parts.append("</body></html>\n")
+    return "".join(parts).encode()
+
+
+def start_server(page):
+    bodies = {
+        "/plain": (page, None),
+        "/chunked": (page, None),
+        "/gzip": (gzip.compress(page), "gzip"),
+        "/deflate": (zlib.compress(page), "deflate"),
+        "/cached": (page, None),
+    }
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            body, encoding = bodies[self.path]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            if self.path == "/cached":
+                self.send_header("Cache-Control", "max-age=600")
+            else:
+                self.send_header("Cache-Control", "no-store")
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
+            if self.path == "/chunked":
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i in range(0, len(body), 256 * 1024):
+                    chunk = body[i : i + 256 * 1024]
+                    self.wfile.write(b"%x\r\n" % len(chunk) + chunk + b"\r\n")
+                self.wfile.write(b"0\r\n\r\n")
+            else:
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+    class Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+        daemon_threads = True
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1]
+
+
+def bench(megabytes):
+    page = make_page(int(megabytes * 1024 * 1024))
+    port = start_server(page)
+    expected = page.decode()
+    Cache.clear()
+
+    print(f"page: {len(page) / 1024 / 1024:.1f} MB")
+    Cache.configure(max_bytes=4 * len(page))
+    for path in ["/plain", "/chunked", "/gzip", "/deflate", "/cached"]:
+        url = URL(f"http://127.0.0.1:{port}{path}")
+        url.request()  # Warm up the connection (and the cache)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        body = url.request()
+        elapsed = time.perf_counter() - start
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        assert body == expected, path
+        print(
+            f"{path:9} peak {peak / len(page):.1f}x page size, "
+            f"{len(page) / elapsed / 1024 / 1024:.0f} MB/s"
+        )
+        del body
+
+
+if __name__ == "__main__":
+    bench(float(sys.argv[1]) if len(sys.argv) > 1 else 16)
@@ -0,0 +1,78 @@
+"""Canvas traffic benchmark for RetainedCanvas.
+
+Scrolls through a long page with a stand-in canvas that only counts the
+calls it receives (and keeps the stacking order to check it), comparing
+the old delete-and-redraw loop with the retained renderer.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_canvas [commands]
+"""
+
+import sys
+
+from browser import RetainedCanvas
+from dom.displaylist import DisplayList
+from benchmarks.bench_scroll import make_commands, HEIGHT, SCROLL_STEP
+
+
+class CountingCanvas:
+    def __init__(self):
+        self.calls = 0
+        self.stack = []
+        self.next_item = 1
+
+    def create(self, *args, **kwargs):
+        self.calls += 1
+        item = self.next_item
+        self.next_item += 1
+        self.stack.append(item)
+        return item
+
+    create_text = create_rectangle = create
+
+    def delete(self, *items):
+        self.calls += 1
+        if items == ("all",):
+            self.stack = []
+        else:
+            gone = set(items)
+            self.stack = [item for item in self.stack if item not in gone]
+
+    def move(self, *args):
+        self.calls += 1
+
+    def tag_lower(self, item, below):
+        self.calls += 1
+        self.stack.remove(item)
+        self.stack.insert(self.stack.index(below), item)
+
+
+def immediate_draw(canvas, display_list, scroll):
+    canvas.delete("all")
+    for cmd in display_list.visible(scroll, scroll + HEIGHT):
+        cmd.execute(scroll, canvas)
+
+
+def bench(count):
+    display_list = DisplayList(make_commands(count))
+    scrolls = range(0, 200 * SCROLL_STEP, SCROLL_STEP)
+
+    immediate = CountingCanvas()
+    for scroll in scrolls:
+        immediate_draw(immediate, display_list, scroll)
+
+    retained = CountingCanvas()
+    renderer = RetainedCanvas(retained)
+    for scroll in scrolls:
+        renderer.draw(display_list, scroll, HEIGHT)
+        # Stacking order must match paint order.
+        visible = display_list.visible(scroll, scroll + HEIGHT)
+        assert retained.stack == [renderer.items[cmd] for cmd in visible]
+
+    print(f"immediate: {immediate.calls / len(scrolls):.1f} canvas calls per frame")
+    print(f"retained:  {retained.calls / len(scrolls):.1f} canvas calls per frame")
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
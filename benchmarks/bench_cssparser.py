@@ -0,0 +1,141 @@
+"""Throughput benchmark for CSSParser declaration blocks.
+
+Parses a corpus of declaration blocks in the style of real sites' style
+attributes and stylesheet rules (shorthands, colours, font stacks,
+url()s, vendor prefixes, !important) with the regex parser and with the
+character-by-character parser it replaced. Reports blocks per second and
+how many declarations each one read with their whole value (the old
+parser keeps only the first word of a multi-word value).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_cssparser [repeat]
+"""
+
+import sys
+import time
+
+from cssom.cssparser import CSSParser
+
+CORPUS = [
+    "display: block; margin: 0 auto; max-width: 1140px; padding: 0 15px",
+    "color: #212529; font-size: 1rem; font-weight: 400; line-height: 1.5",
+    "font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, "
+    "'Helvetica Neue', Arial, sans-serif",
+    "background-color: rgba(0, 0, 0, 0.05); border: 1px solid rgba(0, 0, 0, .125)",
+    "background: #fff url('/img/sprite.png') no-repeat 0 -32px",
+    "font: italic small-caps bold 12px/30px Georgia, serif",
+    "box-shadow: 0 0.5rem 1rem rgba(0, 0, 0, 0.15) !important",
+    "transition: color .15s ease-in-out, background-color .15s ease-in-out, "
+    "border-color .15s ease-in-out",
+    "-webkit-box-sizing: border-box; -moz-box-sizing: border-box; "
+    "box-sizing: border-box",
+    "width: calc(100% - 2 * var(--gutter)); height: 100vh; overflow: hidden",
+    "color: red; text-decoration: underline; cursor: pointer",
+    "position: absolute; top: 0; left: 0; z-index: 1000; display: none",
+    "content: \"\\201C\"; quotes: '\\201C' '\\201D'",
+    "background-image: linear-gradient(to right, #f6d365 0%, #fda085 100%)",
+    "margin-top: 10px; margin-bottom: 10px; padding-left: 20px",
+    "text-align: center; vertical-align: middle; white-space: nowrap",
+    "border-radius: .25rem; outline: 0; opacity: .65",
+    "display:flex;flex-wrap:wrap;justify-content:space-between;"
+    "align-items:center",
+    "filter: progid:DXImageTransform.Microsoft.gradient(enabled=false)",
+    "color: #333333 !important; background-color: transparent !important",
+]
+
+
+class OldCSSParser:
+    """CSSParser before the regex tokenizer, declaration blocks only."""
+
+    def __init__(self, s):
+        self.s = s
+        self.i = 0
+
+    def whitespace(self):
+        while self.i < len(self.s) and self.s[self.i].isspace():
+            self.i += 1
+
+    def word(self):
+        start = self.i
+        while self.i < len(self.s):
+            if self.s[self.i].isalnum() or self.s[self.i] in "#-.%":
+                self.i += 1
+            else:
+                break
+        if not (self.i > start):
+            raise Exception(
+                f"Parsing error: Expected a word at position {self.i} in '{self.s}'"
+            )
+        return self.s[start : self.i]
+
+    def literal(self, literal):
+        if not (self.i < len(self.s) and self.s[self.i] == literal):
+            raise Exception(
+                f"Parsing error: Expected '{literal}' "
+                f"at position {self.i} in '{self.s}'"
+            )
+        self.i += 1
+
+    def pair(self):
+        prop = self.word()
+        self.whitespace()
+        self.literal(":")
+        self.whitespace()
+        val = self.word()
+        return prop.casefold(), val
+
+    def body(self):
+        pairs = {}
+        while self.i < len(self.s):
+            try:
+                prop, val = self.pair()
+                pairs[prop.casefold()] = val
+                self.whitespace()
+                self.literal(";")
+                self.whitespace()
+            except Exception:
+                why = self.ignore_until([";"])
+                if why == ";":
+                    self.literal(";")
+                    self.whitespace()
+                else:
+                    break
+        return pairs
+
+    def ignore_until(self, chars):
+        while self.i < len(self.s):
+            if self.s[self.i] in chars:
+                return self.s[self.i]
+            else:
+                self.i += 1
+        return None
+
+
+def bench(repeat):
+    corpus = CORPUS * repeat
+    size = sum(len(block) for block in corpus)
+    expected = [CSSParser(block).body() for block in CORPUS]
+    declarations = sum(len(pairs) for pairs in expected)
+    print(f"{len(corpus)} blocks, {size / 1024:.0f} KB")
+
+    for name, parser in [("old parser", OldCSSParser), ("regex parser", CSSParser)]:
+        start = time.perf_counter()
+        for block in corpus:
+            parser(block).body()
+        elapsed = time.perf_counter() - start
+        complete = sum(
+            1
+            for block, pairs in zip(CORPUS, expected)
+            for property, value in parser(block).body().items()
+            if pairs.get(property) == value
+        )
+        print(
+            f"{name:12} {len(corpus) / elapsed:9.0f} blocks/s, "
+            f"{size / elapsed / 1024 / 1024:5.2f} MB/s, "
+            f"{complete} of {declarations} declarations complete"
+        )
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
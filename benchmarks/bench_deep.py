@@ -0,0 +1,54 @@
+"""Stress benchmark for deeply nested documents.
+
+Styles, lays out, paints and serializes a document nested `depth`
+elements deep, once as nested <div> blocks and once as nested inline
+<span>s, far past Python's recursion limit. Every pass walks the tree
+with an explicit stack, so each one should finish in time linear in the
+depth.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_deep [depth]
+"""
+
+import sys
+import time
+
+from browser import Browser, paint_tree
+from cssom.cssparser import build_rule_index, style
+from dom.fonts import TableFontMetrics
+from dom.htmlparser import HTMLParser
+from dom.layout import DocumentLayout
+
+
+def make_document(depth, tag):
+    return (
+        f"<html><body>{f'<{tag} class=level>' * depth}deep"
+        f"{f'</{tag}>' * depth}</body></html>"
+    )
+
+
+def timed(label, function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    print(f"  {label:9} {time.perf_counter() - start:.3f}s")
+    return result
+
+
+def bench(depth):
+    print(f"depth {depth}, recursion limit {sys.getrecursionlimit()}")
+    rules = build_rule_index([".level { color: #333333 } div span { color: red }"])
+    for tag in ["div", "span"]:
+        print(f"nested <{tag}>:")
+        nodes = timed("parse", HTMLParser(make_document(depth, tag)).parse)
+        timed("style", style, nodes, rules)
+        document = DocumentLayout(nodes, TableFontMetrics())
+        timed("layout", document.layout)
+        display_list = []
+        timed("paint", paint_tree, document, display_list)
+        html = timed("serialize", Browser.serialize_node, None, nodes)
+        assert html.count(f"<{tag} class") == depth
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
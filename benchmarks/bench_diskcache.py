@@ -0,0 +1,48 @@
+"""Store cost of the disk cache tier as its index grows.
+
+Stores small responses one after another into a fresh DiskCache, the way
+a crawl fills it, and reports the time per store() for each slice of
+entries. Storing should cost the same at any index size; rewriting the
+whole index on every store made it grow with the number of entries. The
+budget is small enough that the later stores also evict.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_diskcache [entries]
+"""
+
+import sys
+import tempfile
+import time
+
+from network.diskcache import DiskCache
+
+HEADERS = {
+    "content-type": "text/html; charset=utf-8",
+    "cache-control": "max-age=3600",
+    "etag": '"5f3a9c2e"',
+    "last-modified": "Wed, 21 Oct 2015 07:28:00 GMT",
+}
+
+
+def bench(entries):
+    with tempfile.TemporaryDirectory() as directory:
+        body_size = 512
+        cache = DiskCache(directory, max_bytes=entries // 2 * body_size)
+        step = max(entries // 5, 1)
+        start = time.perf_counter()
+        for i in range(entries):
+            body = f"<p>page {i}</p>".encode().ljust(body_size)
+            cache.store(f"https://example.com/page/{i}", body, HEADERS, "utf-8", 0)
+            if (i + 1) % step == 0:
+                elapsed = time.perf_counter() - start
+                print(
+                    f"entries {i + 1 - step:6}-{i + 1:6}: "
+                    f"{elapsed / step * 1e6:7.0f} us per store, "
+                    f"{len(cache.index)} in the index"
+                )
+                start = time.perf_counter()
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,90 @@
+"""Memory benchmark for DOM nodes.
+
+Parses a synthetic document, then rebuilds the tree twice under
+tracemalloc: once from the __slots__ Element and Text classes and once
+from the dict-based classes they replaced (every node with its own
+__dict__, children list, attributes dict and style dict). Both copies
+share the parsed strings, so the bytes per node are the nodes alone.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_dom [megabytes]
+"""
+
+import gc
+import sys
+import tracemalloc
+
+from dom.element import Element
+from dom.htmlparser import HTMLParser
+from dom.text import Text
+from tests.reference_parser import make_document
+
+
+class DictElement:
+    def __init__(self, tag, attributes, parent):
+        self.tag = tag
+        self.children = []
+        self.parent = parent
+        self.attributes = attributes
+        self.style = {}
+
+
+class DictText:
+    def __init__(self, text, parent):
+        self.text = text
+        self.children = []
+        self.parent = parent
+        self.style = {}
+
+
+def copy_tree(root, element_class, text_class):
+    copy = element_class(root.tag, dict(root.attributes), None)
+    stack = [(root, copy)]
+    while stack:
+        node, parent = stack.pop()
+        for child in node.children:
+            if isinstance(child, Text):
+                parent.children.append(text_class(child.text, parent))
+            else:
+                element = element_class(child.tag, dict(child.attributes), parent)
+                parent.children.append(element)
+                stack.append((child, element))
+    return copy
+
+
+def count_nodes(root):
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+def measure(root, element_class, text_class):
+    gc.collect()
+    tracemalloc.start()
+    copy = copy_tree(root, element_class, text_class)
+    size, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del copy
+    return size
+
+
+def bench(megabytes):
+    tree = HTMLParser(make_document(int(megabytes * 1024 * 1024))).parse()
+    count = count_nodes(tree)
+
+    before = measure(tree, DictElement, DictText)
+    after = measure(tree, Element, Text)
+
+    print(f"{count} nodes")
+    print(f"dict nodes:  {before / count:.0f} bytes per node")
+    print(f"slots nodes: {after / count:.0f} bytes per node")
+    print(f"saved:       {1 - after / before:.0%}")
+
+
+if __name__ == "__main__":
+    bench(float(sys.argv[1]) if len(sys.argv) > 1 else 1)
@@ -0,0 +1,87 @@
+"""Throughput benchmark for HTMLParser.
+
+Parses a synthetic document with the tokenizer-based parser and with the
+character-by-character parser it replaced, and reports MB/s for each.
+The old parser is quadratic-ish, so it gets a smaller slice of the
+document by default (`old_megabytes`). Then feeds long scripts, text
+runs, comments and quoted attributes in 4 KB pieces at two sizes: the
+time should double with the size, not quadruple.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_htmlparser [megabytes] [old_megabytes]
+"""
+
+import sys
+import time
+
+from dom.htmlparser import HTMLParser
+from tests.reference_parser import OldHTMLParser, make_document
+
+
+def count_nodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+def time_parse(parser_class, body, repeat):
+    megabytes = len(body.encode("utf8")) / (1024 * 1024)
+    best = float("inf")
+    root = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        root = parser_class(body).parse()
+        best = min(best, time.perf_counter() - start)
+    print(
+        f"{parser_class.__name__:13} {megabytes:.2f} MB, {count_nodes(root)} nodes: "
+        f"{best:.3f}s, {megabytes / best:.2f} MB/s"
+    )
+
+
+# Single tokens that arrive in many pieces, by what they are made of
+LONG_TOKENS = {
+    "script": ("<script>", "var s = 'a < b';\n", "</script>"),
+    "text run": ("<p>", "plain words &amp; more ", "</p>"),
+    "comment": ("<!--", "c -- > ", "-->"),
+    "quoted attribute": ("<a title='", "x > ", "'>y</a>"),
+}
+
+
+def time_chunked(body, chunk_size=4096):
+    parser = HTMLParser()
+    start = time.perf_counter()
+    for i in range(0, len(body), chunk_size):
+        parser.feed(body[i : i + chunk_size])
+    parser.close()
+    return time.perf_counter() - start
+
+
+def bench_chunked(size):
+    for name, (head, repeated, tail) in LONG_TOKENS.items():
+        times = []
+        for scale in [1, 2]:
+            body = head + repeated * (scale * size // len(repeated)) + tail
+            times.append(time_chunked(body))
+        megabytes = size / (1024 * 1024)
+        print(
+            f"{name:16} in 4 KB pieces: {megabytes:.1f} MB {times[0]:.3f}s, "
+            f"{2 * megabytes:.1f} MB {times[1]:.3f}s ({times[1] / times[0]:.1f}x)"
+        )
+
+
+def bench(size, old_size, repeat=3):
+    time_parse(OldHTMLParser, make_document(old_size), repeat)
+    time_parse(HTMLParser, make_document(old_size), repeat)
+    time_parse(HTMLParser, make_document(size), repeat)
+    bench_chunked(4 * size)
+
+
+if __name__ == "__main__":
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 1
+    old_megabytes = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+    bench(int(megabytes * 1024 * 1024), int(old_megabytes * 1024 * 1024))
@@ -0,0 +1,58 @@
+"""Line-building benchmark for BlockLayout.
+
+Lays out one long paragraph and one large <pre> block at growing sizes.
+With linear line building the time per word (or per character) stays flat
+as the input grows. Uses the headless table metrics unless "tk" is given,
+which needs a display.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_layout [table|tk]
+"""
+
+import sys
+import time
+import tkinter
+
+from dom.htmlparser import HTMLParser
+from dom.layout import DocumentLayout
+from dom.fonts import MeasureCache, TableFontMetrics, TK_FONTS
+
+SIZES = [2000, 4000, 8000, 16000]
+WORDS = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing"]
+
+
+def paragraph(n):
+    words = " ".join(WORDS[i % len(WORDS)] for i in range(n))
+    return f"<html><body><div>{words}</div></body></html>"
+
+
+def preformatted(n):
+    line = "2024-01-01 12:00:00 INFO worker-1 request served in 12ms " * 4
+    text = (line + "\n") * (n // len(line) + 1)
+    return f"<html><body><div><pre>{text[:n]}</pre></div></body></html>"
+
+
+def bench(name, make, unit, fonts):
+    for n in SIZES:
+        nodes = HTMLParser(make(n)).parse()
+        start = time.perf_counter()
+        DocumentLayout(nodes, fonts).layout()
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name} {n:>6} {unit}: {elapsed:.3f}s, "
+            f"{elapsed / n * 1e6:.2f} us/{unit[:-1]}"
+        )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["tk"]:
+        tkinter.Tk()
+        fonts = TK_FONTS
+    else:
+        fonts = TableFontMetrics()
+
+    bench("paragraph", paragraph, "words", fonts)
+    bench("pre", preformatted, "chars", fonts)
+    if fonts is TK_FONTS:
+        print("measure cache:", MeasureCache.stats())
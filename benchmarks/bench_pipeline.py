@@ -0,0 +1,97 @@
+"""Round-trip benchmark for fetch_many's HTTP/1.1 pipelining.
+
+The stand-in server simulates a network round trip: every time it reads
+from a connection it waits `rtt` before answering all the requests that
+arrived together. Fetching one URL at a time costs a round trip each;
+pipelined batches share one.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pipeline [requests] [rtt_ms]
+"""
+
+import socket
+import sys
+import threading
+import time
+
+from network.cache import Cache
+from network.pipeline import fetch_many
+from network.sockets import Sockets
+from network.url import URL
+
+
+def respond(path):
+    body = b"<p>page %s</p>" % path * 50
+    head = b"HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n"
+    head += b"Cache-Control: no-store\r\n"
+    if path.endswith(b"7"):
+        chunks = b"%x\r\n%s\r\n0\r\n\r\n" % (len(body), body)
+        return head + b"Transfer-Encoding: chunked\r\n\r\n" + chunks
+    return head + b"Content-Length: %d\r\n\r\n" % len(body) + body
+
+
+def serve_connection(conn, rtt, stats):
+    buffer = b""
+    with conn:
+        while True:
+            data = conn.recv(65536)
+            if not data:
+                return
+            stats["reads"] += 1
+            time.sleep(rtt)
+            buffer += data
+            responses = []
+            while b"\r\n\r\n" in buffer:
+                request, buffer = buffer.split(b"\r\n\r\n", 1)
+                responses.append(respond(request.split(b" ", 2)[1]))
+                stats["requests"] += 1
+            conn.sendall(b"".join(responses))
+
+
+def start_server(rtt):
+    stats = {"reads": 0, "requests": 0}
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(64)
+
+    def accept():
+        while True:
+            conn, _address = listener.accept()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(
+                target=serve_connection, args=(conn, rtt, stats), daemon=True
+            ).start()
+
+    threading.Thread(target=accept, daemon=True).start()
+    return listener.getsockname()[1], stats
+
+
+def bench(count, rtt):
+    port, stats = start_server(rtt)
+    urls = [f"http://127.0.0.1:{port}/page/{i}" for i in range(count)]
+    Cache.clear()
+    print(f"{count} requests, {rtt * 1000:.0f} ms round trip")
+
+    start = time.perf_counter()
+    serial = {url: URL(url).request() for url in urls}
+    elapsed = time.perf_counter() - start
+    print(f"one by one:      {elapsed:.2f} s, {stats['reads']} round trips")
+
+    for connections in (1, Sockets.max_per_host):
+        stats["reads"] = 0
+        start = time.perf_counter()
+        pipelined = dict(fetch_many(urls, max_connections=connections))
+        elapsed = time.perf_counter() - start
+        assert pipelined == serial
+        print(
+            f"fetch_many x{connections}:   {elapsed:.2f} s, "
+            f"{stats['reads']} round trips"
+        )
+
+
+if __name__ == "__main__":
+    bench(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+        float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.02,
+    )
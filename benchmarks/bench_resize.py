@@ -0,0 +1,51 @@
+"""Relayout benchmark for window resizes.
+
+Lays out a document of many paragraphs once, then replays a window drag
+the way Browser handles it: one viewport-limited relayout and repaint per
+frame, then a full relayout once the drag settles.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_resize [paragraphs]
+"""
+
+import sys
+import time
+
+from dom.htmlparser import HTMLParser
+from dom.layout import DocumentLayout
+from dom.fonts import TableFontMetrics
+from browser import paint_tree
+
+WORDS = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing"]
+WIDTHS = [800, 780, 760, 740, 720, 700, 720, 740, 760, 780]
+VIEWPORT = (0, 600)
+
+
+def make_document(paragraphs, words=40):
+    text = " ".join(WORDS[i % len(WORDS)] for i in range(words))
+    body = "".join(f"<div><b>{i}.</b> {text}</div>" for i in range(paragraphs))
+    return f"<html><body>{body}</body></html>"
+
+
+def bench(paragraphs):
+    nodes = HTMLParser(make_document(paragraphs)).parse()
+    document = DocumentLayout(nodes, TableFontMetrics())
+
+    start = time.perf_counter()
+    document.layout(WIDTHS[0])
+    print(f"{paragraphs} paragraphs, first layout: {time.perf_counter() - start:.3f}s")
+
+    start = time.perf_counter()
+    for width in WIDTHS[1:]:
+        document.layout(width, VIEWPORT)
+        paint_tree(document, [], VIEWPORT)
+    frame = (time.perf_counter() - start) / (len(WIDTHS) - 1)
+    print(f"resize frame: {frame * 1000:.1f}ms ({1 / frame:.0f} fps)")
+
+    start = time.perf_counter()
+    document.layout(WIDTHS[-1])
+    print(f"settle relayout: {time.perf_counter() - start:.3f}s")
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
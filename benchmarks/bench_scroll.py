@@ -0,0 +1,71 @@
+"""Viewport culling benchmark for DisplayList.
+
+Builds a display list of text commands with a few page-tall background
+rectangles, scrolls through it one SCROLL_STEP at a time and compares
+DisplayList.visible() with testing every command like Browser.draw used to.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_scroll [commands]
+"""
+
+import sys
+import time
+
+from dom.displaylist import DisplayList
+from dom.fonts import TableFontMetrics
+from dom.layout import DrawRect, DrawText
+
+HEIGHT = 600
+SCROLL_STEP = 10
+WORDS_PER_LINE = 10
+LINE_HEIGHT = 25
+
+
+def make_commands(count):
+    font = TableFontMetrics().get_font(16, "normal", "roman")
+    cmds = []
+    for i in range(count):
+        line, column = divmod(i, WORDS_PER_LINE)
+        y = line * LINE_HEIGHT
+        if column == 0 and line % 400 == 0:
+            cmds.append(DrawRect(0, y, 800, y + 400 * LINE_HEIGHT, "lightgray"))
+        cmds.append(DrawText(13 + column * 70, y, "word", font))
+    return cmds
+
+
+def linear_visible(cmds, top, bottom):
+    return [cmd for cmd in cmds if cmd.top <= bottom and cmd.bottom >= top]
+
+
+def bench(count):
+    cmds = make_commands(count)
+    start = time.perf_counter()
+    display_list = DisplayList(cmds)
+    print(f"{len(cmds)} commands, index built in {time.perf_counter() - start:.3f}s")
+
+    page_height = max(cmd.bottom for cmd in cmds)
+    scrolls = range(0, int(page_height) - HEIGHT, SCROLL_STEP)
+
+    start = time.perf_counter()
+    for scroll in scrolls:
+        display_list.visible(scroll, scroll + HEIGHT)
+    indexed = (time.perf_counter() - start) / len(scrolls)
+
+    sample = scrolls[:: max(1, len(scrolls) // 50)]
+    start = time.perf_counter()
+    for scroll in sample:
+        linear_visible(cmds, scroll, scroll + HEIGHT)
+    linear = (time.perf_counter() - start) / len(sample)
+
+    for scroll in sample:
+        assert display_list.visible(scroll, scroll + HEIGHT) == linear_visible(
+            cmds, scroll, scroll + HEIGHT
+        )
+
+    print(f"indexed: {indexed * 1e6:.1f} us per scroll step ({len(scrolls)} steps)")
+    print(f"linear:  {linear * 1e6:.1f} us per scroll step")
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,101 @@
+"""Throughput and memory benchmark for HTMLSerializer.
+
+Serializes a DOM of about 100k nodes to a temporary file. The first run
+uses the recursive `html +=` serializer that Browser.save_html used
+before, writing one big string at the end. The other runs use
+HTMLSerializer in compact and pretty mode. Reports the best time of five
+runs, output rate and tracemalloc peak for each; the streaming peak
+should stay about the size of one write buffer whatever the size of the
+document.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_serializer [megabytes]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from dom.element import Element
+from dom.htmlparser import HTMLParser
+from dom.serializer import HTMLSerializer
+from dom.text import Text
+from tests.reference_parser import make_document
+
+
+def old_serialize_node(node):
+    if isinstance(node, Text):
+        return node.text
+    elif isinstance(node, Element):
+        html = f"<{node.tag}"
+
+        if node.attributes:
+            for attr, value in node.attributes.items():
+                html += f' {attr}="{value}"'
+
+        html += ">"
+
+        for child in node.children:
+            html += old_serialize_node(child)
+
+        html += f"</{node.tag}>"
+
+        return html
+
+
+def old_save(nodes, file):
+    file.write(old_serialize_node(nodes))
+
+
+def compact(nodes, file):
+    HTMLSerializer(file).serialize(nodes)
+
+
+def pretty(nodes, file):
+    HTMLSerializer(file, pretty=True).serialize(nodes)
+
+
+def count_nodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+def bench(megabytes, repeat=5):
+    nodes = HTMLParser(make_document(int(megabytes * 1024 * 1024))).parse()
+    print(f"{count_nodes(nodes)} nodes")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "output.html")
+        runs = [("html +=", old_save), ("compact", compact), ("pretty", pretty)]
+        for name, save in runs:
+            elapsed = float("inf")
+            for _ in range(repeat):
+                with open(path, "w", encoding="utf-8") as file:
+                    start = time.perf_counter()
+                    save(nodes, file)
+                    elapsed = min(elapsed, time.perf_counter() - start)
+            size = os.path.getsize(path)
+
+            with open(path, "w", encoding="utf-8") as file:
+                tracemalloc.start()
+                save(nodes, file)
+                _current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+            print(
+                f"{name:8} {elapsed:.3f}s, {size / elapsed / 1024 / 1024:5.1f} MB/s "
+                f"({size / 1024 / 1024:.1f} MB written), "
+                f"peak {peak / 1024:.0f} KB"
+            )
+
+
+if __name__ == "__main__":
+    bench(float(sys.argv[1]) if len(sys.argv) > 1 else 1.4)
@@ -0,0 +1,112 @@
+"""Style sharing benchmark for StyleCache.
+
+Styles a generated page whose elements repeat a few dozen style=""
+attributes, first with a cascade that parses every attribute and gives
+every styled node its own dict (how style() worked before StyleCache),
+then with style(). Reports time, the memory the styles keep
+(tracemalloc) and the StyleCache hit rates.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_stylecache [rows]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+
+from cssom.cssparser import INHERITED_PROPERTIES, CSSParser, StyleCache, style
+from dom.element import EMPTY_MAPPING, Element
+from dom.htmlparser import HTMLParser
+
+STYLES = [
+    "color: #{0:02x}{0:02x}00; padding: 4px",
+    "background-color: #eee; font-weight: bold",
+    "margin-left: {0}px; font-size: 12px",
+]
+
+
+def make_document(rows):
+    parts = ["<html><body><div style='font-size: 14px'>"]
+    for i in range(rows):
+        parts.append(
+            f"<div style='{STYLES[0].format(i % 16)}'>"
+            f"<span style='{STYLES[1]}'>cell {i}</span>"
+            f"<span style='{STYLES[2].format(i % 4)}'>value</span>"
+            f"<span>plain</span></div>"
+        )
+    parts.append("</div></body></html>")
+    return "".join(parts)
+
+
+def uncached_style(node, inherited=EMPTY_MAPPING):
+    declarations = {}
+    if isinstance(node, Element) and "style" in node.attributes:
+        declarations = CSSParser(node.attributes["style"]).body()
+    if declarations:
+        computed = dict(inherited)
+        computed.update(declarations)
+        for property, default in INHERITED_PROPERTIES.items():
+            if computed.get(property) == default and property not in inherited:
+                del computed[property]
+        node.style = computed
+        inherited = {
+            property: computed[property]
+            for property in INHERITED_PROPERTIES
+            if property in computed
+        }
+    else:
+        node.style = inherited
+    for child in node.children:
+        uncached_style(child, inherited)
+
+
+def collect(node):
+    styles = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        styles.append(node.style)
+        stack.extend(reversed(node.children))
+    return styles
+
+
+def measure(source, cascade):
+    tree = HTMLParser(source).parse()
+    gc.collect()
+    tracemalloc.start()
+    cascade(tree)
+    size, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return tree, size
+
+
+def bench(rows):
+    source = make_document(rows)
+    StyleCache.clear()
+
+    before, before_size = measure(source, uncached_style)
+    after, after_size = measure(source, style)
+    styles = collect(after)
+    assert [dict(s) for s in collect(before)] == [dict(s) for s in styles]
+
+    timings = []
+    for cascade in (uncached_style, style):
+        tree = HTMLParser(source).parse()
+        start = time.perf_counter()
+        cascade(tree)
+        timings.append(time.perf_counter() - start)
+
+    stats = StyleCache.stats()
+    print(f"{len(styles)} nodes, {len({id(s) for s in styles})} distinct style objects")
+    print(f"per-node dicts: {timings[0]:.3f}s, {before_size / 1024:.0f} KB of styles")
+    print(f"StyleCache:     {timings[1]:.3f}s, {after_size / 1024:.0f} KB of styles")
+    print(
+        f"computed style hit rate {stats['hit_rate']:.1%}, "
+        f"style attribute hit rate {stats['parse_hit_rate']:.1%}"
+    )
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,119 @@
+"""Selector matching benchmark for the RuleIndex.
+
+Builds a DOM of about 10k nodes (nested divs and spans with classes and
+ids) and a 2k-rule stylesheet of class, id, tag and descendant
+selectors, then styles the tree with the indexed cascade and with a
+scan that tests every rule against every element. Reports the time and
+the number of selector tests of both, and checks they compute the same
+styles. Descendant rules ending in a bare tag all share that tag's
+bucket; the ancestor filter rejects most of them without a full test.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_stylesheet [rules]
+"""
+
+import random
+import sys
+import time
+
+from cssom.cssparser import CSSParser, style
+from cssom.selectors import RuleIndex
+from dom.element import Element
+from dom.htmlparser import HTMLParser
+
+CLASSES = 400
+IDS = 2000
+TAGS = ["div", "span", "a", "em", "section", "ul"]
+
+
+def make_document(sections=250):
+    random.seed(1)
+    parts = ["<html><body>"]
+    for i in range(sections):
+        parts.append(f"<section class='c{i % CLASSES}'>")
+        for j in range(8):
+            n = i * 8 + j
+            parts.append(
+                f"<div class='c{n % CLASSES} c{(n * 7) % CLASSES}' id='i{n % IDS}'>"
+                f"<span class='c{(n * 3) % CLASSES}'>text {n}</span>"
+                f"<a href='#'>link</a></div>"
+            )
+        parts.append("</section>")
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def make_sheet(count):
+    random.seed(2)
+    rules = []
+    for i in range(count):
+        kind = i % 5
+        if kind == 0:
+            selector = f".c{random.randrange(CLASSES)}"
+        elif kind == 1:
+            selector = f"#i{random.randrange(IDS)}"
+        elif kind == 2:
+            selector = f"section .c{random.randrange(CLASSES)} span"
+        elif kind == 3:
+            selector = f"div.c{random.randrange(CLASSES)}"
+        else:
+            selector = random.choice(TAGS) + f" .c{random.randrange(CLASSES)}"
+        rules.append(f"{selector} {{ color: #{i:06x}; margin-left: {i % 9}px; }}")
+    rules.append("body { font-size: 14px; }")
+    return "\n".join(rules)
+
+
+class ScanRules(RuleIndex):
+    """Tests every rule against every element, as without an index."""
+
+    def candidates(self, node):
+        rules = list(self.universal)
+        for buckets in (self.by_id, self.by_class, self.by_tag):
+            for bucket in buckets.values():
+                rules.extend(bucket)
+        return rules
+
+    def match(self, node, ancestors=None):
+        return super().match(node)
+
+
+def collect(node, out):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        out.append(dict(node.style))
+        stack.extend(reversed(node.children))
+    return out
+
+
+def bench(count):
+    source = make_document()
+    rules = CSSParser(make_sheet(count)).parse()
+    tree = HTMLParser(source).parse()
+    nodes = len(collect(tree, []))
+    elements = 0
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        elements += isinstance(node, Element)
+        stack.extend(node.children)
+    print(f"{nodes} nodes ({elements} elements), {len(rules)} rules")
+
+    results = []
+    for name, index in [("indexed", RuleIndex(rules)), ("scan all", ScanRules(rules))]:
+        tree = HTMLParser(source).parse()
+        start = time.perf_counter()
+        style(tree, index)
+        elapsed = time.perf_counter() - start
+        results.append(collect(tree, []))
+        print(
+            f"{name:9} {elapsed:7.3f}s, {index.tests} selector tests "
+            f"({index.tests / elements:.1f} per element), "
+            f"{index.filtered} rejected by the ancestor filter"
+        )
+    assert results[0] == results[1]
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,99 @@
+"""Subresource fetching benchmark for SubresourceFetcher.
+
+Serves a page with stylesheets, scripts and images from a local
+http.server that sleeps before every response, then fetches them one by
+one and with SubresourceFetcher. Also checks the request order the server
+saw: stylesheets first, images last.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_subresources [latency_ms] [images]
+"""
+
+import http.server
+import socketserver
+import sys
+import threading
+import time
+
+from dom.htmlparser import HTMLParser
+from network.cache import Cache
+from network.subresources import SubresourceFetcher, find_subresources
+from network.url import URL
+
+STYLESHEETS = 4
+SCRIPTS = 6
+
+
+def make_page(images):
+    head = "".join(
+        f"<link rel=stylesheet href='/css/{i}.css'>" for i in range(STYLESHEETS)
+    )
+    head += "".join(f"<script src='/js/{i}.js'></script>" for i in range(SCRIPTS))
+    body = "".join(f"<p>Image {i} <img src='/img/{i}.png'></p>" for i in range(images))
+    return f"<html><head>{head}</head><body>{body}</body></html>"
+
+
+def start_server(latency):
+    seen = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            seen.append(self.path)
+            time.sleep(latency)
+            if self.path.endswith(".png"):
+                content_type, body = "image/png", b"\x89PNG" + bytes(2048)
+            else:
+                content_type, body = "text/plain", b"x" * 2048
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+
+    class Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+        daemon_threads = True
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1], seen
+
+
+def bench(latency, images):
+    port, seen = start_server(latency)
+    base = URL(f"http://127.0.0.1:{port}/index.html")
+    nodes = HTMLParser(make_page(images)).parse()
+    resources = find_subresources(nodes, base)
+    Cache.clear()
+
+    start = time.perf_counter()
+    for _kind, url in resources:
+        url.try_request()
+    serial = time.perf_counter() - start
+
+    del seen[:]
+    start = time.perf_counter()
+    results = SubresourceFetcher().fetch_all(resources)
+    parallel = time.perf_counter() - start
+
+    assert len(results) == len(resources)
+    assert all(body is not None for body in results.values())
+    kinds = [path.split("/")[1] for path in seen]
+    assert kinds.index("img") >= STYLESHEETS, kinds
+    assert max(i for i, kind in enumerate(kinds) if kind == "css") < SCRIPTS
+
+    print(f"{len(resources)} resources, {latency * 1000:.0f} ms latency")
+    print(f"serial:   {serial:.2f} s")
+    print(f"parallel: {parallel:.2f} s ({serial / parallel:.1f}x)")
+    print(f"request order: {' '.join(kinds)}")
+
+
+if __name__ == "__main__":
+    latency = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.05
+    bench(latency, int(sys.argv[2]) if len(sys.argv) > 2 else 30)
@@ -0,0 +1,110 @@
+"""Reconnect benchmark for DNS caching and TLS session resumption.
+
+Starts a local HTTPS server with a throwaway self-signed certificate
+(made with the openssl command line tool) that closes the connection
+after every response, so every request connects, resolves and shakes
+hands again. Compares a fresh SSLContext and no saved session per
+connection (what Sockets used to do) with the shared context and the
+per-host session cache.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_tls [requests]
+"""
+
+import http.server
+import os
+import socketserver
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from network.cache import Cache
+from network.sockets import Resolver, Sockets
+from network.url import URL
+
+
+def make_certificate(directory):
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+            "-keyout", key, "-out", cert, "-days", "1",
+            "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return cert, key
+
+
+def start_server(cert, key):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            body = b"<p>secure</p>"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.wfile.write(body)
+
+    class Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+        daemon_threads = True
+
+    server = Server(("127.0.0.1", 0), Handler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1]
+
+
+def run(url, count, cert, fresh):
+    start = time.perf_counter()
+    for _ in range(count):
+        if fresh:
+            # One context per connection and nothing to resume
+            Sockets.configure(ssl_context=ssl.create_default_context(cafile=cert))
+            Resolver.clear()
+        assert URL(url).request() == "<p>secure</p>"
+    return (time.perf_counter() - start) / count
+
+
+def bench(count):
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = make_certificate(directory)
+        port = start_server(cert, key)
+        url = f"https://localhost:{port}/"
+        Cache.clear()
+
+        before = run(url, count, cert, fresh=True)
+
+        Sockets.configure(ssl_context=ssl.create_default_context(cafile=cert))
+        Resolver.clear()
+        Sockets.tls_handshakes = Sockets.tls_resumed = 0
+        after = run(url, count, cert, fresh=False)
+        stats = Sockets.stats()
+
+    print(f"{count} HTTPS requests, one connection each")
+    print(f"fresh context:  {before * 1000:.2f} ms per request")
+    print(f"shared context: {after * 1000:.2f} ms per request")
+    print(
+        f"resumed {stats['tls_resumed']} of {stats['tls_handshakes']} handshakes, "
+        f"{stats['dns_saved']} of {stats['dns_saved'] + stats['dns_lookups']} "
+        f"lookups answered from the cache"
+    )
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
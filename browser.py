@@ -1,22 +1,79 @@
+import threading
 import tkinter
-from dom.element import Element
 
 from dom.layout import DocumentLayout
+from dom.displaylist import DisplayList
 from dom.htmlparser import HTMLParser
-from cssom.cssparser import style
-from dom.text import Text
+from dom.serializer import HTMLSerializer, to_html
+from cssom.cssparser import build_rule_index, find_stylesheets, style
+from dom.traversal import walk
+from network.subresources import (
+    STYLESHEET,
+    SubresourceFetcher,
+    find_subresources,
+)
 
 WIDTH, HEIGHT = 800, 600
 HSTEP, VSTEP = 13, 18
 cursor_x, cursor_y = HSTEP, VSTEP
 SCROLL_STEP = 10
+RESIZE_FRAME_MS = 16
+RESIZE_SETTLE_MS = 200
 
 
-def paint_tree(layout_object, display_list):
-    display_list.extend(layout_object.paint())
+def paint_tree(layout_object, display_list, viewport=None):
+    def paint(layout_object):
+        y, height = layout_object.y, layout_object.height
+        if viewport and y is not None and height is not None:
+            top, bottom = viewport
+            if y > bottom or y + height < top:
+                return False
 
-    for child in layout_object.children:
-        paint_tree(child, display_list)
+        display_list.extend(layout_object.paint())
+
+    walk(layout_object, paint)
+
+
+class RetainedCanvas:
+    """Keeps one canvas item per visible display command between frames.
+
+    Scrolling moves the existing items with a single canvas call and only
+    creates or deletes the items of commands entering or leaving the
+    viewport, instead of clearing and redrawing the whole screen.
+    """
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.items = {}
+        self.display_list = None
+        self.scroll = 0
+
+    def draw(self, display_list, scroll, height):
+        if display_list is not self.display_list:
+            self.canvas.delete("all")
+            self.items = {}
+            self.display_list = display_list
+        elif self.items and scroll != self.scroll:
+            self.canvas.move("all", 0, self.scroll - scroll)
+        self.scroll = scroll
+
+        visible = display_list.visible(scroll, scroll + height)
+        items = {}
+        above = None
+        # Walk back from the topmost command so each new item can be slid
+        # under the nearest item that has to stay above it.
+        for cmd in reversed(visible):
+            item = self.items.pop(cmd, None)
+            if item is None:
+                item = cmd.execute(scroll, self.canvas)
+                if above is not None:
+                    self.canvas.tag_lower(item, above)
+            items[cmd] = item
+            above = item
+
+        if self.items:
+            self.canvas.delete(*self.items.values())
+        self.items = items
 
 
 class Browser:
@@ -24,8 +81,16 @@ class Browser:
         self.window = tkinter.Tk()
         self.canvas = tkinter.Canvas(self.window, width=WIDTH, height=HEIGHT)
         self.canvas.pack(fill="both", expand=True)
+        self.renderer = RetainedCanvas(self.canvas)
         self.scroll = 0
         self.nodes = None
+        self.document = None
+        self.resources = {}
+        self.rules = None
+        self.resize_size = None
+        self.resize_frame_job = None
+        self.resize_settle_job = None
+        self.partial_layout = False
         self.window.bind("<Down>", self.scrolldown)
         self.window.bind("<Up>", self.scrollup)
         self.window.bind("<MouseWheel>", self.wheelscroll)
@@ -33,20 +98,28 @@ class Browser:
 
     def load(self, url):
         if url == "about:blank":
-            self.display_list = []
+            self.display_list = DisplayList()
             self.draw()
             return True
 
         try:
-            body = url.request()
-            self.nodes = HTMLParser(body).parse()
+            self.document = None
+            self.nodes = url.stream(HTMLParser())
             # self.save_html()
-            style(self.nodes)
+            subresources = find_subresources(self.nodes, url)
+            # Only stylesheets are needed to style and paint the page
+            self.resources = SubresourceFetcher().fetch_all(
+                [item for item in subresources if item[0] == STYLESHEET]
+            )
+            self.rules = build_rule_index(
+                find_stylesheets(self.nodes, url, self.resources)
+            )
+            style(self.nodes, self.rules)
             self.document = DocumentLayout(self.nodes)
-            self.document.layout()
-            self.display_list = []
-            paint_tree(self.document, self.display_list)
+            self.document.layout(WIDTH)
+            self.paint()
             self.draw()
+            self.fetch_later([item for item in subresources if item[0] != STYLESHEET])
             return True
 
         except Exception as e:
@@ -54,54 +127,88 @@ class Browser:
             self.load("about:blank")
             return False
 
-    def serialize_node(self, node):
-        if isinstance(node, Text):
-            return node.text
-        elif isinstance(node, Element):
-            html = f"<{node.tag}"
-
-            if node.attributes:
-                for attr, value in node.attributes.items():
-                    html += f' {attr}="{value}"'
+    def fetch_later(self, subresources):
+        """Fetch scripts and images in the background after the first paint."""
+        if not subresources:
+            return
+        resources = self.resources  # a later load() starts a new dict
 
-            html += ">"
+        def fetch():
+            resources.update(SubresourceFetcher().fetch_all(subresources))
 
-            for child in node.children:
-                html += self.serialize_node(child)  # type: ignore
+        threading.Thread(target=fetch, daemon=True).start()
 
-            html += f"</{node.tag}>"
-
-            return html
+    def serialize_node(self, node):
+        return to_html(node)
 
-    def save_html(self):
+    def save_html(self, path="./output.html", pretty=False):
         if not self.nodes:
             return False
 
-        html_content = self.serialize_node(self.nodes)
-
-        with open("./output.html", "w", encoding="utf-8") as file:
-            file.write(html_content)  # type: ignore
+        with open(path, "w", encoding="utf-8") as file:
+            HTMLSerializer(file, pretty=pretty).serialize(self.nodes)
 
         return True
 
+    def paint(self, viewport=None):
+        cmds = []
+        paint_tree(self.document, cmds, viewport)
+        self.display_list = DisplayList(cmds)
+
     def draw(self):
-        self.canvas.delete("all")
-        for cmd in self.display_list:
-            if cmd.top > self.scroll + HEIGHT:
-                continue
-            if cmd.bottom < self.scroll:
-                continue
-            cmd.execute(self.scroll, self.canvas)
+        self.renderer.draw(self.display_list, self.scroll, HEIGHT)
 
     def on_resize(self, event):
+        # Tk sends a burst of <Configure> events while the window is being
+        # dragged. Coalesce them into at most one relayout per frame, and
+        # do the exact full relayout once they stop coming.
+        self.resize_size = (event.width, event.height)
+
+        if self.resize_frame_job is None:
+            self.resize_frame_job = self.window.after(
+                RESIZE_FRAME_MS, self.resize_frame
+            )
+
+        if self.resize_settle_job is not None:
+            self.window.after_cancel(self.resize_settle_job)
+        self.resize_settle_job = self.window.after(
+            RESIZE_SETTLE_MS, self.resize_settle
+        )
+
+    def resize_frame(self):
+        """Relayout only what is on screen for the latest window size."""
         global WIDTH, HEIGHT
-        WIDTH, HEIGHT = event.width, event.height
-        if self.nodes:
-            self.document = DocumentLayout(self.nodes)
-            self.document.layout()
-            self.display_list = []
-            paint_tree(self.document, self.display_list)
+        self.resize_frame_job = None
+
+        if self.resize_size == (WIDTH, HEIGHT):
+            return
+        WIDTH, HEIGHT = self.resize_size
+
+        if self.document:
+            viewport = (self.scroll, self.scroll + HEIGHT)
+            self.document.layout(WIDTH, viewport)
+            self.paint(viewport)
+            self.draw()
+            self.partial_layout = True
+
+    def resize_settle(self):
+        """Lay out the whole document once resizing has stopped."""
+        global WIDTH, HEIGHT
+        self.resize_settle_job = None
+
+        if self.resize_frame_job is not None:
+            self.window.after_cancel(self.resize_frame_job)
+            self.resize_frame_job = None
+
+        if self.resize_size == (WIDTH, HEIGHT) and not self.partial_layout:
+            return
+        WIDTH, HEIGHT = self.resize_size
+
+        if self.document:
+            self.document.layout(WIDTH)
+            self.paint()
             self.draw()
+        self.partial_layout = False
 
     def scrolldown(self, e):
         max_y = max(self.document.height or 0 + 2 * VSTEP - HEIGHT, 0)
@@ -1,84 +1,375 @@
-from dom.element import Element
+import re
+from types import MappingProxyType
 
+from dom.element import EMPTY_MAPPING, Element
+from dom.text import Text
+from dom.traversal import walk
+from cssom.selectors import (
+    AncestorFilter,
+    ImportantDeclarations,
+    RuleIndex,
+    parse_selector,
+)
 
-def style(node):
+# Properties a node takes from its parent unless a rule sets them; the
+# values are what the root starts from.
+INHERITED_PROPERTIES = {
+    "font-size": "16px",
+    "font-style": "normal",
+    "font-weight": "normal",
+    "color": "black",
+}
 
-    if isinstance(node, Element) and "style" in node.attributes:
-        try:
-            pairs = CSSParser(node.attributes["style"]).body()
-            for property, value in pairs.items():
-                node.style[property] = value
+COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+WHITESPACE_RE = re.compile(r"\s*")
+BRACE_RE = re.compile(r"[{}]")
 
-        except Exception as e:
-            print(f"Error parsing CSS for node: {e}")
+# A value is a run of plain text, strings and (possibly nested) brackets
+_STRING = r"""(?:"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')"""
+_BRACKETS = r"\((?:[^()\"']|" + _STRING + r"|\([^()]*\))*\)"
+# Runs of plain text only end where the text does, so a value that does
+# not match fails without trying every way of splitting it.
+_TEXT = r"[^;{}()\"'!\s]+(?![^;{}()\"'!\s])"
+_VALUE = r"(?:" + _TEXT + "|" + _STRING + "|" + _BRACKETS + r"|\s+(?=[^;{}!\s]))+"
 
-    for child in node.children:
-        style(child)
+DECLARATION_RE = re.compile(
+    r"(-?-?[A-Za-z_][-A-Za-z0-9_]*)\s*:\s*(" + _VALUE + r")\s*"
+    r"(!\s*important\s*)?(?:;|(?=\})|\Z)",
+    re.IGNORECASE,
+)
+# Everything up to the next ";" or "}" outside strings and brackets
+SKIP_RE = re.compile(r"(?:[^;{}()\"']+|" + _STRING + "|" + _BRACKETS + ")*")
+# A selector list or at-rule prelude, up to its "{" (or ";")
+PRELUDE_RE = re.compile(r"\s*([^{};]*?)\s*(?=[{;]|\Z)")
+
+
+class StyleCache:
+    """Shares parsed style attributes and computed styles between nodes.
+
+    Generated pages repeat the same style="" text and the same cascade
+    over and over. Each distinct style attribute is parsed once into a
+    read-only declaration block. Each distinct cascade (the parent's
+    inherited values, the matched rule blocks and the style attribute) is
+    computed once. Equal results are interned, so equivalent nodes share
+    one read-only style mapping instead of a dict each.
+
+    The tag is not part of the key: it only changes the result through
+    the rules it matches, which are.
+    """
+
+    max_entries = 10000  # per table; a full table is simply emptied
+
+    declarations = {}  # style attribute text -> read-only declarations
+    computed = {}  # cascade inputs -> (style, inherited, inputs kept alive)
+    styles = {}  # frozenset of items -> the one shared read-only mapping
+
+    hits = 0
+    misses = 0
+    parse_hits = 0
+    parse_misses = 0
+
+    @classmethod
+    def parse(cls, text):
+        """Return the read-only (normal, !important) declaration blocks of
+        a style attribute."""
+        declarations = cls.declarations.get(text)
+        if declarations is not None:
+            cls.parse_hits += 1
+            return declarations
+
+        cls.parse_misses += 1
+        normal, important = CSSParser(text).declarations()
+        if len(cls.declarations) >= cls.max_entries:
+            cls.declarations.clear()
+        declarations = cls.intern(normal), cls.intern(important)
+        cls.declarations[text] = declarations
+        return declarations
+
+    @classmethod
+    def intern(cls, style):
+        if not style:
+            return EMPTY_MAPPING
+        key = frozenset(style.items())
+        shared = cls.styles.get(key)
+        if shared is None:
+            if len(cls.styles) >= cls.max_entries:
+                cls.styles.clear()
+            shared = cls.styles[key] = MappingProxyType(style)
+        return shared
+
+    @classmethod
+    def compute(cls, inherited, matched, text):
+        """Return (style, inherited values for the children) of an element.
+
+        `inherited` is what its parent passed down, `matched` the rule
+        blocks RuleIndex.match() returned and `text` the style attribute.
+        """
+        # Objects are keyed by id(); the entry keeps them alive so no
+        # other object can take over one of those ids while it exists.
+        key = (id(inherited), tuple(map(id, matched)), text)
+        entry = cls.computed.get(key)
+        if entry is not None:
+            cls.hits += 1
+            return entry[0], entry[1]
+
+        cls.misses += 1
+        normal, important = cls.parse(text) if text else (EMPTY_MAPPING, EMPTY_MAPPING)
+        declarations = {}
+        # Rule blocks come normal first, then !important ones
+        for body in matched:
+            if isinstance(body, ImportantDeclarations):
+                declarations.update(normal)
+                normal = EMPTY_MAPPING
+            declarations.update(body)
+        declarations.update(normal)
+        declarations.update(important)
+
+        if declarations:
+            computed = dict(inherited)
+            computed.update(declarations)
+            for property, default in INHERITED_PROPERTIES.items():
+                if computed.get(property) == default and property not in inherited:
+                    del computed[property]
+            style = cls.intern(computed)
+            passed_down = cls.intern(
+                {
+                    property: computed[property]
+                    for property in INHERITED_PROPERTIES
+                    if property in computed
+                }
+            )
+        else:
+            style = passed_down = inherited
+
+        if len(cls.computed) >= cls.max_entries:
+            cls.computed.clear()
+        cls.computed[key] = (style, passed_down, (inherited, matched))
+        return style, passed_down
+
+    @classmethod
+    def stats(cls):
+        """Return hit/miss counters for computed styles and style attributes."""
+        lookups = cls.hits + cls.misses
+        parses = cls.parse_hits + cls.parse_misses
+        return {
+            "hits": cls.hits,
+            "misses": cls.misses,
+            "hit_rate": cls.hits / lookups if lookups else 0.0,
+            "parse_hits": cls.parse_hits,
+            "parse_misses": cls.parse_misses,
+            "parse_hit_rate": cls.parse_hits / parses if parses else 0.0,
+            "entries": len(cls.computed),
+            "styles": len(cls.styles),
+        }
+
+    @classmethod
+    def clear(cls):
+        """Drop every cached style and reset the counters."""
+        cls.declarations.clear()
+        cls.computed.clear()
+        cls.styles.clear()
+        cls.hits = cls.misses = 0
+        cls.parse_hits = cls.parse_misses = 0
+
+
+def style(node, rules=None, inherited=EMPTY_MAPPING):
+    """Compute node.style for the whole tree under `node`.
+
+    Each element gets the declarations of the matching rules of `rules` (a
+    RuleIndex) in cascade order, then those of its style attribute, on top
+    of the inherited properties its parent ended up with. Only inherited
+    values that differ from INHERITED_PROPERTIES are stored. Styles are
+    read-only mappings shared through StyleCache; nodes that add nothing
+    share their parent's inherited values.
+    """
+    ancestors = AncestorFilter() if rules is not None else None
+    passed_down = [inherited]  # by each open element to its children
+
+    def enter(node):
+        inherited = passed_down[-1]
+        if not isinstance(node, Element):
+            node.style = inherited
+            return False
+
+        matched = rules.match(node, ancestors) if rules is not None else ()
+        text = node.attributes.get("style")
+        if matched or text:
+            node.style, inherited = StyleCache.compute(inherited, matched, text)
+        else:
+            node.style = inherited
+        passed_down.append(inherited)
+        if ancestors is not None:
+            ancestors.push(node)
+
+    def leave(node):
+        passed_down.pop()
+        if ancestors is not None:
+            ancestors.pop(node)
+
+    walk(node, enter, leave)
+
+
+def find_stylesheets(node, base_url=None, resources=None):
+    """Return the text of every <style> block and linked stylesheet, in
+    document order.
+
+    Linked sheets are looked up in `resources`, the {url string: body}
+    dict SubresourceFetcher.fetch_all() returns.
+    """
+    sheets = []
+
+    def visit(node):
+        if not isinstance(node, Element):
+            return
+        if node.tag == "style":
+            texts = (child.text for child in node.children if isinstance(child, Text))
+            sheets.append("".join(texts))
+        elif (
+            node.tag == "link"
+            and resources
+            and "stylesheet" in node.attributes.get("rel", "").casefold().split()
+            and node.attributes.get("href")
+        ):
+            try:
+                body = resources.get(base_url.resolve(node.attributes["href"]).url)
+            except (AssertionError, ValueError):
+                body = None
+            if body:
+                sheets.append(body)
+
+    walk(node, visit)
+    return sheets
+
+
+def build_rule_index(sheets):
+    """Parse stylesheet texts into one RuleIndex."""
+    rules = RuleIndex()
+    for sheet in sheets:
+        rules.extend(CSSParser(sheet).parse())
+    return rules
 
 
 class CSSParser:
+    """Parses CSS with compiled regexes.
+
+    body() reads a declaration block such as a style attribute, parse() a
+    whole stylesheet. Values may be any run of tokens: several words,
+    strings, and parenthesised groups such as rgb(...). A declaration
+    that does not parse is skipped up to the next top-level ";" and the
+    rest of the block is still read; nothing here raises on bad input
+    except parse_selector() for selectors it does not support, which
+    drops just that rule.
+    """
+
     def __init__(self, s):
         self.s = s
         self.i = 0
 
     def whitespace(self):
-        while self.i < len(self.s) and self.s[self.i].isspace():
-            self.i += 1
+        self.i = WHITESPACE_RE.match(self.s, self.i).end()
 
-    def word(self):
-        start = self.i
-        while self.i < len(self.s):
-            if self.s[self.i].isalnum() or self.s[self.i] in "#-.%":
-                self.i += 1
-            else:
-                break
-        if not (self.i > start):
-            raise Exception(
-                f"Parsing error: Expected a word at position {self.i} in '{self.s}'"
-            )
-        return self.s[start : self.i]
-
-    def literal(self, literal):
-        if not (self.i < len(self.s) and self.s[self.i] == literal):
-            raise Exception(
-                f"Parsing error: Expected '{literal}' at position {self.i} in '{self.s}'"
-            )
-        self.i += 1
+    def declarations(self):
+        """Read declarations up to the next "}" or the end of the text.
 
-    def pair(self):
-        prop = self.word()
+        Returns two dicts, the normal declarations and those marked
+        !important (without the marker).
+        """
+        s = self.s
+        end = len(s)
+        normal = {}
+        important = {}
         self.whitespace()
-        self.literal(":")
-        self.whitespace()
-        val = self.word()
-        return prop.casefold(), val
+        while self.i < end and s[self.i] != "}":
+            match = DECLARATION_RE.match(s, self.i)
+            if match:
+                property, value, flag = match.groups()
+                if flag:
+                    important[property.casefold()] = value
+                else:
+                    normal[property.casefold()] = value
+                self.i = match.end()
+            else:
+                self.skip_declaration()
+            self.whitespace()
+        return normal, important
+
+    def skip_declaration(self):
+        """Move past a declaration that does not parse, keeping strings and
+        brackets together, and past the ";" that ends it."""
+        s = self.s
+        end = len(s)
+        while True:
+            self.i = SKIP_RE.match(s, self.i).end()
+            if self.i >= end or s[self.i] == "}":
+                return
+            self.i += 1
+            if s[self.i - 1] == ";":
+                return
+            # A lone quote or bracket: carry on after it
 
     def body(self):
-        pairs = {}
-        while self.i < len(self.s):
-            try:
-                prop, val = self.pair()
-                pairs[prop.casefold()] = val
-                self.whitespace()
-                self.literal(";")
-                self.whitespace()
+        """Return the declarations of a block as one dict, !important ones
+        overriding the others."""
+        normal, important = self.declarations()
+        normal.update(important)
+        return normal
 
-            # todo: handle errors more gracefully)
-            except Exception as e:
-                # print(f"Error at CSSParser body method: {e}")
-                why = self.ignore_until([";"])
-                if why == ";":
-                    self.literal(";")
-                    self.whitespace()
-                else:
-                    break
+    def skip_block(self):
+        """Move past the rest of a block whose "{" was just read, nested
+        blocks included."""
+        depth = 1
+        while depth:
+            match = BRACE_RE.search(self.s, self.i)
+            if not match:
+                self.i = len(self.s)
+                return
+            self.i = match.end()
+            depth += 1 if match.group() == "{" else -1
 
-        return pairs
+    def parse(self):
+        """Parse a stylesheet into (selector, declarations) rules.
 
-    def ignore_until(self, chars):
-        while self.i < len(self.s):
-            if self.s[self.i] in chars:
-                return self.s[self.i]
-            else:
+        A selector list such as `h1, h2` gives one rule per selector,
+        sharing the declarations; !important declarations come as a second
+        rule with an ImportantDeclarations block. At-rules and rules with
+        selectors that cannot be parsed are skipped.
+        """
+        self.s = COMMENT_RE.sub(" ", self.s)
+        s = self.s
+        rules = []
+        self.whitespace()
+        while self.i < len(s):
+            match = PRELUDE_RE.match(s, self.i)
+            self.i = match.end()
+            if self.i >= len(s):
+                break
+            if s[self.i] == ";":
+                # A statement at-rule such as @import or @charset
                 self.i += 1
-        return None
+                self.whitespace()
+                continue
+            self.i += 1  # the "{"
+
+            prelude = match.group(1)
+            selectors = None
+            if not prelude.startswith("@"):
+                try:
+                    selectors = [parse_selector(text) for text in prelude.split(",")]
+                except ValueError:
+                    pass
+            if selectors is None:
+                self.skip_block()
+                self.whitespace()
+                continue
+
+            normal, important = self.declarations()
+            if self.i < len(s):
+                self.i += 1  # the "}"
+            self.whitespace()
+            for selector in selectors:
+                if normal:
+                    rules.append((selector, normal))
+                if important:
+                    rules.append((selector, ImportantDeclarations(important)))
+
+        return rules
@@ -0,0 +1,242 @@
+import re
+
+from dom.element import Element
+
+# One compound selector: an optional tag (or *) followed by #id and .class parts
+COMPOUND_RE = re.compile(r"([A-Za-z][A-Za-z0-9-]*|\*)?((?:[#.][A-Za-z0-9_-]+)*)$")
+PART_RE = re.compile(r"([#.])([A-Za-z0-9_-]+)")
+
+
+def node_classes(node):
+    return node.attributes.get("class", "").split()
+
+
+def node_keys(node):
+    """The ("tag" | "id" | "class", name) keys an element can be matched by."""
+    keys = [("tag", node.tag)]
+    id = node.attributes.get("id")
+    if id:
+        keys.append(("id", id))
+    keys.extend(("class", name) for name in node_classes(node))
+    return keys
+
+
+class SimpleSelector:
+    """A tag, an id and classes that must all match the same element.
+
+    Any of them may be missing; with none at all it is `*`.
+    """
+
+    ancestor_keys = frozenset()
+
+    def __init__(self, tag=None, id=None, classes=()):
+        self.tag = tag
+        self.id = id
+        self.classes = tuple(classes)
+        self.specificity = (1 if id else 0, len(self.classes), 1 if tag else 0)
+
+    @classmethod
+    def parse(cls, text):
+        match = COMPOUND_RE.match(text)
+        if not text or not match:
+            raise ValueError(f"Unsupported selector: {text!r}")
+        tag = match.group(1)
+        id = None
+        classes = []
+        for kind, name in PART_RE.findall(match.group(2)):
+            if kind == "#":
+                id = name
+            else:
+                classes.append(name)
+        return cls(None if tag in (None, "*") else tag.casefold(), id, classes)
+
+    def keys(self):
+        keys = [("tag", self.tag)] if self.tag else []
+        if self.id:
+            keys.append(("id", self.id))
+        keys.extend(("class", name) for name in self.classes)
+        return keys
+
+    def key(self):
+        """The bucket a RuleIndex files this selector under: the rarest of
+        its id, first class and tag, or None for `*`."""
+        if self.id:
+            return ("id", self.id)
+        if self.classes:
+            return ("class", self.classes[0])
+        if self.tag:
+            return ("tag", self.tag)
+        return None
+
+    def matches(self, node):
+        if not isinstance(node, Element):
+            return False
+        if self.tag and node.tag != self.tag:
+            return False
+        if self.id and node.attributes.get("id") != self.id:
+            return False
+        if self.classes:
+            classes = node_classes(node)
+            return all(name in classes for name in self.classes)
+        return True
+
+    def __repr__(self):
+        return (
+            (self.tag or ("" if self.id or self.classes else "*"))
+            + ("#" + self.id if self.id else "")
+            + "".join("." + name for name in self.classes)
+        )
+
+
+class DescendantSelector:
+    """Compound selectors separated by whitespace, e.g. `div p.note`.
+
+    Matched right to left: the last part must match the node itself and
+    each earlier part some ancestor of the element the next part matched.
+    Taking the nearest such ancestor every time is enough for descendant
+    combinators, so there is no backtracking.
+    """
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.specificity = tuple(
+            sum(counts) for counts in zip(*(part.specificity for part in parts))
+        )
+        # Every key the ancestors must have between them, for AncestorFilter
+        self.ancestor_keys = frozenset(
+            key for part in parts[:-1] for key in part.keys()
+        )
+
+    def key(self):
+        return self.parts[-1].key()
+
+    def matches(self, node):
+        if not self.parts[-1].matches(node):
+            return False
+        node = node.parent
+        for part in reversed(self.parts[:-1]):
+            while node is not None and not part.matches(node):
+                node = node.parent
+            if node is None:
+                return False
+            node = node.parent
+        return True
+
+    def __repr__(self):
+        return " ".join(repr(part) for part in self.parts)
+
+
+class AncestorFilter:
+    """Counts the keys of the elements on the path from the root to the
+    node being styled.
+
+    A descendant selector can only match if every key of its ancestor
+    parts is among them, which rejects most candidates without walking up
+    the tree. push() an element before styling its children and pop() it
+    after.
+    """
+
+    def __init__(self):
+        self.counts = {}
+
+    def push(self, node):
+        counts = self.counts
+        for key in node_keys(node):
+            counts[key] = counts.get(key, 0) + 1
+
+    def pop(self, node):
+        counts = self.counts
+        for key in node_keys(node):
+            if counts[key] == 1:
+                del counts[key]
+            else:
+                counts[key] -= 1
+
+    def keys(self):
+        return self.counts.keys()
+
+
+def parse_selector(text):
+    parts = [SimpleSelector.parse(part) for part in text.split()]
+    if not parts:
+        raise ValueError("Empty selector")
+    return parts[0] if len(parts) == 1 else DescendantSelector(parts)
+
+
+class ImportantDeclarations(dict):
+    """A declaration block marked !important.
+
+    RuleIndex.match() puts these after every normal block, and the
+    cascade applies them after the style attribute too.
+    """
+
+
+class RuleIndex:
+    """Style rules bucketed by the key of their rightmost compound selector.
+
+    A node is only tested against the rules filed under its id, its
+    classes, its tag and the universal bucket, so a sheet of thousands of
+    rules costs a handful of selector tests per node. match() returns the
+    declaration blocks that apply, lowest cascade priority (importance,
+    specificity, then source order) first. With an AncestorFilter,
+    descendant selectors whose ancestors cannot be there are dropped
+    before they are tested.
+    """
+
+    def __init__(self, rules=()):
+        self.by_id = {}
+        self.by_class = {}
+        self.by_tag = {}
+        self.universal = []
+        self.count = 0
+        self.tests = 0  # selector tests made by match()
+        self.filtered = 0  # candidates the AncestorFilter rejected untested
+        self.extend(rules)
+
+    def __len__(self):
+        return self.count
+
+    def add(self, selector, body):
+        important = isinstance(body, ImportantDeclarations)
+        rule = ((important, selector.specificity, self.count), selector, body)
+        self.count += 1
+        key = selector.key()
+        if key is None:
+            self.universal.append(rule)
+            return
+        kind, name = key
+        if kind == "id":
+            bucket = self.by_id
+        elif kind == "class":
+            bucket = self.by_class
+        else:
+            bucket = self.by_tag
+        bucket.setdefault(name, []).append(rule)
+
+    def extend(self, rules):
+        for selector, body in rules:
+            self.add(selector, body)
+
+    def candidates(self, node):
+        candidates = list(self.universal)
+        candidates.extend(self.by_tag.get(node.tag, ()))
+        id = node.attributes.get("id")
+        if id:
+            candidates.extend(self.by_id.get(id, ()))
+        for name in set(node_classes(node)):
+            candidates.extend(self.by_class.get(name, ()))
+        return candidates
+
+    def match(self, node, ancestors=None):
+        if not isinstance(node, Element) or not self.count:
+            return []
+        candidates = self.candidates(node)
+        if ancestors is not None:
+            keys = ancestors.keys()
+            count = len(candidates)
+            candidates = [rule for rule in candidates if rule[1].ancestor_keys <= keys]
+            self.filtered += count - len(candidates)
+        self.tests += len(candidates)
+        matched = [rule for rule in candidates if rule[1].matches(node)]
+        matched.sort()
+        return [body for _priority, _selector, body in matched]
@@ -0,0 +1,213 @@
+from array import array
+
+from dom.element import EMPTY_MAPPING, Element, read_only
+from dom.text import Text
+
+NO_NODE = -1
+TEXT_TAG = 0  # tag id of text nodes
+
+
+class DOMArena:
+    """A whole document tree stored column by column.
+
+    Node i is described by entry i of each array: its tag id, its parent,
+    first child, last child and next sibling (NO_NODE if there is none)
+    and, for text nodes, where its text lies in the source. Text that
+    entity decoding changed, attributes and styles are kept in dicts for
+    the few nodes that have them. Nothing is stored per node as a Python
+    object; view() wraps an index in an ElementView or TextView, which
+    behave like Element and Text.
+    """
+
+    def __init__(self, source=""):
+        self.source = source
+        self.source_parts = []
+        self.tag_names = [""]
+        self.tag_ids = {"": TEXT_TAG}
+
+        self.tags = array("I")
+        self.parents = array("i")
+        self.first_children = array("i")
+        self.last_children = array("i")
+        self.next_siblings = array("i")
+        self.text_starts = array("i")
+        self.text_ends = array("i")
+
+        self.texts = {}
+        self.attributes = {}
+        self.styles = {}
+
+    def __len__(self):
+        return len(self.tags)
+
+    def feed(self, data):
+        """Keep a piece of the source; text offsets point into the joined
+        pieces."""
+        self.source_parts.append(data)
+
+    def close(self):
+        if self.source_parts:
+            self.source += "".join(self.source_parts)
+            self.source_parts = []
+
+    def add_node(self, tag_id, parent):
+        index = len(self.tags)
+        self.tags.append(tag_id)
+        self.parents.append(parent)
+        self.first_children.append(NO_NODE)
+        self.last_children.append(NO_NODE)
+        self.next_siblings.append(NO_NODE)
+        self.text_starts.append(0)
+        self.text_ends.append(0)
+        return index
+
+    def add_element(self, tag, attributes, parent):
+        """Add an element under `parent` (an index or NO_NODE) without
+        linking it into the parent's children yet."""
+        tag_id = self.tag_ids.get(tag)
+        if tag_id is None:
+            tag_id = self.tag_ids[tag] = len(self.tag_names)
+            self.tag_names.append(tag)
+        index = self.add_node(tag_id, parent)
+        if attributes:
+            self.attributes[index] = read_only(attributes)
+        return index
+
+    def add_text(self, parent, text, start=None):
+        """Append a text node to `parent`.
+
+        With a `start` offset the text is the source slice starting there
+        and only its position is kept.
+        """
+        index = self.add_node(TEXT_TAG, parent)
+        if start is None:
+            self.texts[index] = text
+        else:
+            self.text_starts[index] = start
+            self.text_ends[index] = start + len(text)
+        self.append_child(parent, index)
+        return index
+
+    def append_child(self, parent, index):
+        last = self.last_children[parent]
+        if last == NO_NODE:
+            self.first_children[parent] = index
+        else:
+            self.next_siblings[last] = index
+        self.last_children[parent] = index
+
+    def child_indices(self, index):
+        next_siblings = self.next_siblings
+        child = self.first_children[index]
+        while child != NO_NODE:
+            yield child
+            child = next_siblings[child]
+
+    def view(self, index):
+        if index == NO_NODE:
+            return None
+        if self.tags[index] == TEXT_TAG:
+            return TextView(self, index)
+        return ElementView(self, index)
+
+    def text(self, index):
+        text = self.texts.get(index)
+        if text is None:
+            text = self.source[self.text_starts[index] : self.text_ends[index]]
+        return text
+
+
+class ElementView(Element):
+    """Element interface over one node of a DOMArena.
+
+    Views are made on demand and hold nothing of their own but the arena,
+    the index and the (interned) tag name, so two views of the same node
+    compare equal.
+    """
+
+    __slots__ = ("arena", "index")
+
+    def __init__(self, arena, index):
+        self.arena = arena
+        self.index = index
+        self.tag = arena.tag_names[arena.tags[index]]
+
+    @property
+    def children(self):
+        view = self.arena.view
+        return [view(child) for child in self.arena.child_indices(self.index)]
+
+    @property
+    def parent(self):
+        return self.arena.view(self.arena.parents[self.index])
+
+    @property
+    def attributes(self):
+        return self.arena.attributes.get(self.index, EMPTY_MAPPING)
+
+    @attributes.setter
+    def attributes(self, attributes):
+        if attributes:
+            self.arena.attributes[self.index] = read_only(attributes)
+        else:
+            self.arena.attributes.pop(self.index, None)
+
+    @property
+    def style(self):
+        return self.arena.styles.get(self.index, EMPTY_MAPPING)
+
+    @style.setter
+    def style(self, style):
+        if style:
+            self.arena.styles[self.index] = read_only(style)
+        else:
+            self.arena.styles.pop(self.index, None)
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, ElementView)
+            and other.arena is self.arena
+            and other.index == self.index
+        )
+
+    def __hash__(self):
+        return hash((id(self.arena), self.index))
+
+
+class TextView(Text):
+    """Text interface over one text node of a DOMArena."""
+
+    __slots__ = ("arena", "index")
+
+    def __init__(self, arena, index):
+        self.arena = arena
+        self.index = index
+
+    @property
+    def text(self):
+        return self.arena.text(self.index)
+
+    @property
+    def parent(self):
+        return self.arena.view(self.arena.parents[self.index])
+
+    @property
+    def style(self):
+        return self.arena.styles.get(self.index, EMPTY_MAPPING)
+
+    @style.setter
+    def style(self, style):
+        if style:
+            self.arena.styles[self.index] = read_only(style)
+        else:
+            self.arena.styles.pop(self.index, None)
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, TextView)
+            and other.arena is self.arena
+            and other.index == self.index
+        )
+
+    def __hash__(self):
+        return hash((id(self.arena), self.index))
@@ -1,44 +1,3 @@
-HTML_ENTITIES = {
-    "&quot;": '"',
-    "&apos;": "'",
-    "&amp;": "&",
-    "&lt;": "<",
-    "&gt;": ">",
-    "&nbsp;": " ",
-    "&iexcl;": "¡",
-    "&cent;": "¢",
-    "&pound;": "£",
-    "&curren;": "¤",
-    "&yen;": "¥",
-    "&brvbar;": "¦",
-    "&sect;": "§",
-    "&uml;": "¨",
-    "&copy;": "©",
-    "&ordf;": "ª",
-    "&laquo;": "«",
-    "&not;": "¬",
-    "&shy;": "­",
-    "&reg;": "®",
-    "&macr;": "¯",
-    "&deg;": "°",
-    "&plusmn;": "±",
-    "&sup2;": "²",
-    "&sup3;": "³",
-    "&acute;": "´",
-    "&micro;": "µ",
-    "&para;": "¶",
-    "&middot;": "·",
-    "&cedil;": "¸",
-    "&sup1;": "¹",
-    "&ordm;": "º",
-    "&raquo;": "»",
-    "&frac14;": "¼",
-    "&frac12;": "½",
-    "&frac34;": "¾",
-    "&iquest;": "¿",
-}
-
-
 HEAD_TAGS = [
     "base",
     "basefont",
@@ -68,6 +27,8 @@ SELF_CLOSING_TAGS = [
     "wbr",
 ]
 
+HIDDEN_TAGS = ["head", "script", "style"]
+
 FORMATTING_TAGS = ["b", "i", "em", "strong", "u"]
 
 BLOCK_ELEMENTS = [
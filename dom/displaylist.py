@@ -0,0 +1,80 @@
+import bisect
+
+# Commands taller than this go into the interval index instead of the
+# sorted list, so the sorted list only has to look this far above the
+# viewport for commands that still reach into it.
+TALL_COMMAND = 64
+
+
+class DisplayList:
+    """Display commands indexed by their vertical extent.
+
+    visible() bisects to the commands overlapping a viewport instead of
+    testing every command, and returns them in paint order.
+    """
+
+    def __init__(self, commands=()):
+        self.commands = list(commands)
+
+        short = []
+        tall = []
+        for index, cmd in enumerate(self.commands):
+            if cmd.bottom - cmd.top > TALL_COMMAND:
+                tall.append((cmd.top, index))
+            else:
+                short.append((cmd.top, index))
+        short.sort()
+        tall.sort()
+
+        self.short_tops = [top for top, _index in short]
+        self.short_indices = [index for _top, index in short]
+
+        # Tall commands: sorted by top, plus a max-bottom segment tree over
+        # that order to skip whole ranges that end above the viewport.
+        self.tall_tops = [top for top, _index in tall]
+        self.tall_indices = [index for _top, index in tall]
+        size = 1
+        while size < len(tall):
+            size *= 2
+        self.tree_size = size
+        self.max_bottom = [float("-inf")] * (2 * size)
+        for position, index in enumerate(self.tall_indices):
+            self.max_bottom[size + position] = self.commands[index].bottom
+        for node in range(size - 1, 0, -1):
+            self.max_bottom[node] = max(
+                self.max_bottom[2 * node], self.max_bottom[2 * node + 1]
+            )
+
+    def __len__(self):
+        return len(self.commands)
+
+    def __iter__(self):
+        return iter(self.commands)
+
+    def visible(self, top, bottom):
+        """Return the commands overlapping [top, bottom], in paint order."""
+        commands = self.commands
+        indices = []
+
+        lo = bisect.bisect_left(self.short_tops, top - TALL_COMMAND)
+        hi = bisect.bisect_right(self.short_tops, bottom)
+        for index in self.short_indices[lo:hi]:
+            if commands[index].bottom >= top:
+                indices.append(index)
+
+        if self.tall_indices:
+            hi = bisect.bisect_right(self.tall_tops, bottom)
+            stack = [(1, 0, self.tree_size)]
+            while stack:
+                node, start, span = stack.pop()
+                if start >= hi or self.max_bottom[node] < top:
+                    continue
+                if span == 1:
+                    indices.append(self.tall_indices[start])
+                    continue
+                half = span // 2
+                stack.append((2 * node + 1, start + half, half))
+                stack.append((2 * node, start, half))
+
+        indices.sort()
+        return [commands[index] for index in indices]
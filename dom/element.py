@@ -1,10 +1,49 @@
+import sys
+from types import MappingProxyType
+
+# Shared by every node that has nothing of its own, instead of one empty
+# list or dict per node. Both are read-only.
+EMPTY_CHILDREN = ()
+EMPTY_MAPPING = MappingProxyType({})
+
+
+def read_only(mapping):
+    """Return `mapping` as a read-only view, None if it is empty."""
+    if not mapping:
+        return None
+    if isinstance(mapping, MappingProxyType):
+        return mapping
+    return MappingProxyType(mapping)
+
+
 class Element:
+    __slots__ = ("tag", "children", "parent", "_attributes", "_style")
+
     def __init__(self, tag, attributes, parent):
-        self.tag = tag
+        self.tag = sys.intern(tag)
         self.children = []
         self.parent = parent
-        self.attributes = attributes
-        self.style = {}
+        self._attributes = read_only(attributes)
+        self._style = None
+
+    # attributes and style are only allocated for nodes that have some, and
+    # are read-only on every node, shared empty or not; assign a whole dict
+    # to change them.
+    @property
+    def attributes(self):
+        return self._attributes or EMPTY_MAPPING
+
+    @attributes.setter
+    def attributes(self, attributes):
+        self._attributes = read_only(attributes)
+
+    @property
+    def style(self):
+        return self._style or EMPTY_MAPPING
+
+    @style.setter
+    def style(self, style):
+        self._style = read_only(style)
 
     def __repr__(self):
         return "<" + self.tag + ">"
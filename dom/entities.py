@@ -0,0 +1,109 @@
+import re
+from html.entities import html5
+
+# Named references, decimal references and hex references, one regex for all
+ENTITY_RE = re.compile(r"&(#[xX][0-9a-fA-F]+;?|#[0-9]+;?|[A-Za-z][A-Za-z0-9]*;?)")
+# The same, capturing the whole reference so split() keeps it, "&" included
+SPLIT_RE = re.compile(r"(&(?:#[xX][0-9a-fA-F]+;?|#[0-9]+;?|[A-Za-z][A-Za-z0-9]*;?))")
+
+# Names keyed without their "&", e.g. "lt;" and the legacy "lt"
+NAMED_ENTITIES = html5
+LONGEST_LEGACY_NAME = max(len(name) for name in html5 if not name.endswith(";"))
+
+# Numeric references to C1 controls mean the windows-1252 character there
+WINDOWS_1252 = {}
+for code in range(0x80, 0xA0):
+    try:
+        WINDOWS_1252[code] = bytes([code]).decode("cp1252")
+    except UnicodeDecodeError:
+        pass
+
+REPLACEMENT_CHARACTER = "�"
+
+
+def decode_number(reference):
+    if reference[1] in "xX":
+        code = int(reference[2:].rstrip(";"), 16)
+    else:
+        code = int(reference[1:].rstrip(";"))
+    if code in WINDOWS_1252:
+        return WINDOWS_1252[code]
+    if code == 0 or code > 0x10FFFF or 0xD800 <= code <= 0xDFFF:
+        return REPLACEMENT_CHARACTER
+    return chr(code)
+
+
+def decode_name(reference, attribute):
+    char = NAMED_ENTITIES.get(reference)
+    if char is not None:
+        return char
+
+    # Legacy names such as "&amp" or "&copy" work without the semicolon,
+    # even when letters follow ("&copyright" is "©right")
+    for end in range(min(len(reference), LONGEST_LEGACY_NAME), 1, -1):
+        char = NAMED_ENTITIES.get(reference[:end])
+        if char is not None:
+            if attribute and end < len(reference):
+                # In attributes "?a=1&copy=2" stays as it is
+                return None
+            return char + reference[end:]
+    return None
+
+
+def decode_reference(reference, attribute=False):
+    if reference[0] == "#":
+        return decode_number(reference)
+    return decode_name(reference, attribute)
+
+
+class DecodedReferences(dict):
+    """Outside attributes a reference decodes the same wherever it is.
+
+    Keyed by the whole reference ("&lt;"); references not seen yet are
+    decoded on lookup, and unknown ones map to themselves.
+    """
+
+    def __missing__(self, reference):
+        char = decode_reference(reference[1:])
+        if char is None:
+            char = reference
+        if len(self) < 10000:
+            self[reference] = char
+        return char
+
+
+decoded_references = DecodedReferences()
+lookup_reference = decoded_references.__getitem__
+
+
+def decode_attribute(text):
+    def replace(match):
+        reference = match.group(1)
+        char = decode_reference(reference, attribute=True)
+        if char is None:
+            return match.group(0)
+        if not reference.endswith(";") and text[match.end() : match.end() + 1] == "=":
+            return match.group(0)
+        return char
+
+    return ENTITY_RE.sub(replace, text)
+
+
+def decode_entities(text, attribute=False):
+    """Replace the character references in `text` in one pass.
+
+    Handles every HTML5 named reference (with the legacy forms that may
+    omit the semicolon), decimal and hex references. Each reference is
+    decoded once, so "&amp;lt;" gives "&lt;". With `attribute`, named
+    references without a semicolon are left alone when a letter, digit
+    or "=" follows, as browsers do in attribute values.
+    """
+    if "&" not in text:
+        return text
+    if attribute:
+        return decode_attribute(text)
+    # Split into [text, reference, text, ...] and map the references
+    # through the memo, so known ones never leave C code
+    parts = SPLIT_RE.split(text)
+    parts[1::2] = map(lookup_reference, parts[1::2])
+    return "".join(parts)
@@ -0,0 +1,223 @@
+import json
+import math
+import os
+from collections import OrderedDict
+
+FONTS = {}
+MEASURE_CACHE_FILE = os.path.join(
+    os.path.expanduser("~"), ".cache", "browser-py", "measurements.json"
+)
+
+
+class MeasureCache:
+    """Memoizes text widths and font metrics so Tk is asked only once."""
+
+    widths = OrderedDict()
+    metrics = {}
+    max_entries = 200_000
+    hits = 0
+    misses = 0
+
+    @classmethod
+    def measure(cls, key, font, text):
+        """Return the width of `text` in the font identified by `key`."""
+        width_key = key + (text,)
+        width = cls.widths.get(width_key)
+        if width is not None:
+            cls.hits += 1
+            cls.widths.move_to_end(width_key)
+            return width
+
+        cls.misses += 1
+        width = font.measure(text)
+        cls.widths[width_key] = width
+        if len(cls.widths) > cls.max_entries:
+            cls.widths.popitem(last=False)
+        return width
+
+    @classmethod
+    def get_metrics(cls, key, font):
+        """Return the metrics dict of the font identified by `key`."""
+        metrics = cls.metrics.get(key)
+        if metrics is not None:
+            cls.hits += 1
+            return metrics
+
+        cls.misses += 1
+        metrics = font.metrics()
+        cls.metrics[key] = metrics
+        return metrics
+
+    @classmethod
+    def stats(cls):
+        """Return hit/miss counters and the current size of the cache."""
+        lookups = cls.hits + cls.misses
+        return {
+            "hits": cls.hits,
+            "misses": cls.misses,
+            "hit_rate": cls.hits / lookups if lookups else 0.0,
+            "entries": len(cls.widths),
+        }
+
+    @classmethod
+    def clear(cls):
+        """Drop every cached measurement and reset the counters."""
+        cls.widths.clear()
+        cls.metrics.clear()
+        cls.hits = 0
+        cls.misses = 0
+
+    @classmethod
+    def save(cls, path=MEASURE_CACHE_FILE):
+        """Write the cache to disk, most recently used entries last."""
+        data = {
+            "widths": [list(key) + [width] for key, width in cls.widths.items()],
+            "metrics": [[list(key), metrics] for key, metrics in cls.metrics.items()],
+        }
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=MEASURE_CACHE_FILE):
+        """Warm the cache from a file written by save(), if there is one."""
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return False
+
+        for *key, width in data.get("widths", []):
+            cls.widths[tuple(key)] = width
+        for key, metrics in data.get("metrics", []):
+            cls.metrics[tuple(key)] = metrics
+
+        while len(cls.widths) > cls.max_entries:
+            cls.widths.popitem(last=False)
+        return True
+
+
+class CachedFont:
+    """Tk font whose measure() and metrics() go through MeasureCache."""
+
+    def __init__(self, key, font):
+        self.key = key
+        self.font = font
+
+    def measure(self, text):
+        return MeasureCache.measure(self.key, self.font, text)
+
+    def metrics(self, *options):
+        metrics = MeasureCache.get_metrics(self.key, self.font)
+        if options:
+            return metrics[options[0]]
+        return metrics
+
+
+class FontMetrics:
+    """Interface for the objects layout asks for fonts.
+
+    get_font() returns a font with measure(text), metrics(*options) (same
+    contract as tkinter.font.Font) and a `font` attribute the canvas can
+    draw with.
+    """
+
+    def get_font(self, size, weight, slant, family="Times"):
+        raise NotImplementedError
+
+
+class TkFontMetrics(FontMetrics):
+    """Measures text with real Tk fonts. Needs a display."""
+
+    def get_font(self, size, weight, slant, family="Times"):
+        key = (size, weight, slant, family)
+        if key not in FONTS:
+            import tkinter.font
+
+            font = tkinter.font.Font(
+                family=family, size=size, weight=weight, slant=slant
+            )
+            label = tkinter.Label(font=font)
+            FONTS[key] = (CachedFont(key, font), label)
+
+        return FONTS[key][0]
+
+
+# Advance widths in 1/1000 em (Adobe Times-Roman metrics); Courier is fixed.
+TIMES_WIDTHS = dict(
+    zip(
+        " !\"#$%&'()*+,-./0123456789:;<=>?@"
+        "ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^_`"
+        "abcdefghijklmnopqrstuvwxyz{|}~",
+        [
+            250, 333, 408, 500, 500, 833, 778, 333, 333, 333, 500, 564,
+            250, 333, 250, 278, 500, 500, 500, 500, 500, 500, 500, 500,
+            500, 500, 278, 278, 564, 564, 564, 444, 921, 722, 667, 667,
+            722, 611, 556, 722, 722, 333, 389, 722, 611, 889, 722, 722,
+            556, 722, 667, 556, 611, 722, 722, 944, 722, 722, 611, 333,
+            278, 333, 469, 500, 333, 444, 500, 444, 500, 444, 333, 500,
+            500, 278, 278, 500, 278, 778, 500, 500, 500, 500, 333, 389,
+            278, 500, 500, 722, 500, 500, 444, 480, 200, 480, 541,
+        ],
+    )
+)
+MONOSPACE_FAMILIES = ["Courier"]
+DEFAULT_WIDTH = 500
+MONOSPACE_WIDTH = 600
+BOLD_FACTOR = 1.05
+PIXELS_PER_POINT = 96 / 72
+
+
+class TableFont:
+    """Font measured from a fixed advance-width table, without Tk."""
+
+    def __init__(self, size, weight, slant, family):
+        self.font = (family, size, weight, slant)
+        self.scale = size * PIXELS_PER_POINT / 1000
+        if weight == "bold":
+            self.scale *= BOLD_FACTOR
+        self.monospace = family in MONOSPACE_FAMILIES
+
+        pixels = size * PIXELS_PER_POINT
+        ascent = math.ceil(pixels * 0.9)
+        descent = math.ceil(pixels * 0.22)
+        self.font_metrics = {
+            "ascent": ascent,
+            "descent": descent,
+            "linespace": ascent + descent,
+            "fixed": int(self.monospace),
+        }
+
+    def measure(self, text):
+        if self.monospace:
+            return round(len(text) * MONOSPACE_WIDTH * self.scale)
+        widths = TIMES_WIDTHS
+        return round(sum([widths.get(c, DEFAULT_WIDTH) for c in text]) * self.scale)
+
+    def metrics(self, *options):
+        if options:
+            return self.font_metrics[options[0]]
+        return self.font_metrics
+
+
+class TableFontMetrics(FontMetrics):
+    """Pure-Python metrics so parsing, styling and layout run headless."""
+
+    def __init__(self):
+        self.fonts = {}
+
+    def get_font(self, size, weight, slant, family="Times"):
+        key = (size, weight, slant, family)
+        font = self.fonts.get(key)
+        if font is None:
+            font = self.fonts[key] = TableFont(size, weight, slant, family)
+        return font
+
+
+TK_FONTS = TkFontMetrics()
+
+
+def get_font(size, weight, slant, family="Times"):
+    return TK_FONTS.get_font(size, weight, slant, family)
@@ -1,162 +1,91 @@
 from dom.text import Text
 from dom.element import Element
-from dom.constants import HTML_ENTITIES, HEAD_TAGS, SELF_CLOSING_TAGS, FORMATTING_TAGS
+from dom.arena import NO_NODE, DOMArena, ElementView
+from dom.entities import decode_entities
+from dom.constants import HEAD_TAGS, SELF_CLOSING_TAGS, FORMATTING_TAGS
+from dom.tokenizer import HTMLTokenizer, START_TAG, END_TAG, TEXT, RAW_TEXT
 
 
 class HTMLParser:
-    def __init__(self, body):
-        self.body = body
+    def __init__(self, body="", arena=False):
+        self.tokenizer = HTMLTokenizer(body)
         self.unfinished = []
 
-        self.tag_stack = []
+        # With arena=True the document is stored in a DOMArena and the
+        # parser returns an ElementView of its root.
+        self.arena = DOMArena(body) if arena else None
+
+        self.pre_depth = 0
+        self.code_depth = 0
         self.in_pre = False
         self.in_code = False
 
     def parse(self):
-        text = ""
-        in_tag = False
-        in_comment = False
-        in_script = False
-        in_quote = False
-        quote_char = None
-
-        for i in range(len(self.body)):
-            c = self.body[i]
-
-            if in_quote:
-                if c == quote_char:
-                    in_quote = False
-                text += c
-                continue
-
-            if c == "<" and not in_script and not in_tag:
-                if self.body[i : i + 7].lower() == "<script":
-                    in_script = True
-                    self.add_tag("script")
-                    continue
-
-            if in_script:
-                if c == "<" and self.body[i : i + 9].lower() == "</script>":
-                    in_script = False
-                    self.add_tag("/script")
-                    i += 8
-                    continue
-                else:
-                    text += c
-                    continue
-
-            if c == "<" and not in_comment:
-                next_chars = self.body[i : i + 4]
-                if next_chars == "<!--":
-                    in_comment = True
-                    i += 3
-                    continue
-
-            if in_comment:
-                next_chars = self.body[i : i + 3]
-                if next_chars == "-->":
-                    in_comment = False
-                    i += 2
-                    continue
-                continue
-
-            if in_tag:
-                if c == ">" and not in_quote:
-                    in_tag = False
-                    self.add_tag(text)
-                    text = ""
-                elif c in ['"', "'"]:
-                    in_quote = True
-                    quote_char = c
-                    text += c
-                else:
-                    text += c
-                continue
-
-            if c == "<":
-                in_tag = True
-                if text:
-                    self.add_text(text)
-                text = ""
-            else:
-                text += c
-
-        if not in_tag and text:
-            self.add_text(text)
-
+        return self.close()
+
+    def feed(self, data):
+        """Parse the next piece of the document as it arrives."""
+        if self.arena is not None:
+            self.arena.feed(data)
+        self.add_tokens(self.tokenizer.feed(data))
+
+    def close(self):
+        """Flush whatever is still buffered and return the document root."""
+        self.add_tokens(self.tokenizer.close())
+        if self.arena is not None:
+            self.arena.close()
         return self.finish()
 
-    def get_attributes(self, text):
-        parts = text.split()
-
-        if not parts:
-            return "", {}
-
-        tag = parts[0].casefold()
-        attributes = {}
-
-        for attrpair in parts[1:]:
-            if "=" in attrpair:
-                key, value = attrpair.split("=", 1)
-
-                if len(value) > 2 and value[0] in ["'", '"']:
-                    value = value[1:-1]
-
-                attributes[key.casefold()] = value
-
-            else:
-                attributes[attrpair.casefold()] = ""
-
-        # with open("./attr.txt", "a", encoding="utf-8") as file:
-        #     file.write(tag + "\n")
-        #     file.write(str(attributes) + "\n")
-
-        return tag, attributes
-
-    def add_text(self, text):
-        if self.in_pre or self.in_code:
-            self.append_text(text)
-
-        else:
-            text = self.decode_html_entities(text)
-
-            if text.isspace():
-                return
-
-            self.append_text(text)
+    def add_tokens(self, tokens):
+        for kind, data, extra in tokens:
+            if kind == TEXT:
+                self.add_text(data, extra)
+            elif kind == START_TAG:
+                self.add_tag(data, extra)
+            elif kind == END_TAG:
+                self.add_tag("/" + data)
+            elif kind == RAW_TEXT:
+                self.append_text(data, extra)
+
+    def add_text(self, text, start=None):
+        decoded = decode_entities(text)
+
+        if not (self.in_pre or self.in_code) and decoded.isspace():
+            return
 
-    @staticmethod
-    def decode_html_entities(text):
-        for entity, char in HTML_ENTITIES.items():
-            text = text.replace(entity, char)
-        return text
+        # Only text that decoding left alone is a slice of the source.
+        self.append_text(decoded, start if decoded is text else None)
 
-    def append_text(self, text):
+    def append_text(self, text, start=None):
         try:
             self.implicit_tags(None)
             if self.unfinished:
                 parent = self.unfinished[-1]
-                node = Text(text, parent)
-                parent.children.append(node)
+                if self.arena is not None:
+                    self.arena.add_text(parent.index, text, start)
+                else:
+                    node = Text(text, parent)
+                    parent.children.append(node)
             else:
                 print("No unfinished tags to add text to.")
         except Exception as e:
             print("Error in HTMLParser append_text method: ", e)
 
-    def add_tag(self, tag):
-        tag, attributes = self.get_attributes(tag)
+    def add_tag(self, tag, attributes=None):
+        if attributes is None:
+            attributes = {}
 
-        if tag.startswith("!"):
-            return
-
-        if not tag.startswith("/"):
-            self.tag_stack.append(tag)
-        else:
-            if self.tag_stack and self.tag_stack[-1] == tag[1:]:
-                self.tag_stack.pop()
+        if tag == "pre":
+            self.pre_depth += 1
+        elif tag == "/pre":
+            self.pre_depth = max(0, self.pre_depth - 1)
+        elif tag == "code":
+            self.code_depth += 1
+        elif tag == "/code":
+            self.code_depth = max(0, self.code_depth - 1)
 
-        self.in_pre = "pre" in self.tag_stack
-        self.in_code = "code" in self.tag_stack
+        self.in_pre = self.pre_depth > 0
+        self.in_code = self.code_depth > 0
 
         self.implicit_tags(tag)
 
@@ -169,8 +98,8 @@ class HTMLParser:
         elif tag in SELF_CLOSING_TAGS:
             if self.unfinished:
                 parent = self.unfinished[-1]
-                node = Element(tag, attributes, parent)
-                parent.children.append(node)
+                node = self.new_element(tag, attributes, parent)
+                self.append_child(parent, node)
             else:
                 pass
 
@@ -179,9 +108,22 @@ class HTMLParser:
                 parent = self.unfinished[-1]
             else:
                 parent = None
-            node = Element(tag, attributes, parent)
+            node = self.new_element(tag, attributes, parent)
             self.unfinished.append(node)
 
+    def new_element(self, tag, attributes, parent):
+        if self.arena is None:
+            return Element(tag, attributes, parent)
+        parent_index = NO_NODE if parent is None else parent.index
+        index = self.arena.add_element(tag, attributes, parent_index)
+        return ElementView(self.arena, index)
+
+    def append_child(self, parent, node):
+        if self.arena is None:
+            parent.children.append(node)
+        else:
+            self.arena.append_child(parent.index, node.index)
+
     def close_open_tags(self, new_tag):
         last_tag = self.unfinished[-1].tag
         while self.unfinished and last_tag in ["p", "li"]:
@@ -202,7 +144,7 @@ class HTMLParser:
             node = self.unfinished.pop()
             if self.unfinished:
                 parent = self.unfinished[-1]
-                parent.children.append(node)
+                self.append_child(parent, node)
 
     def handle_misnested_tags(self, expected_tag):
         if not self.unfinished:
@@ -214,12 +156,12 @@ class HTMLParser:
                     node = self.unfinished.pop()
                     if self.unfinished:
                         parent = self.unfinished[-1]
-                        parent.children.append(node)
+                        self.append_child(parent, node)
                 return
 
     def implicit_tags(self, tag):
         try:
-            while True:
+            while len(self.unfinished) <= 2:
                 open_tags = [node.tag for node in self.unfinished]
                 if open_tags == [] and tag != "html":
                     self.add_tag("html")
@@ -244,7 +186,7 @@ class HTMLParser:
                 node = self.unfinished.pop()
                 if self.unfinished:
                     parent = self.unfinished[-1]
-                    parent.children.append(node)
+                    self.append_child(parent, node)
 
             if self.unfinished:
                 return self.unfinished.pop()
@@ -1,22 +1,12 @@
-import tkinter.font
 from dom.text import Text
 from dom.element import Element
-from dom.constants import BLOCK_ELEMENTS
+from dom.constants import BLOCK_ELEMENTS, HIDDEN_TAGS
+from dom.fonts import TK_FONTS
+from dom.traversal import walk
 
 WIDTH, HEIGHT = 800, 600
 HSTEP, VSTEP = 13, 18
 cursor_x, cursor_y = HSTEP, VSTEP
-FONTS = {}
-
-
-def get_font(size, weight, slant, family="Times"):
-    key = (size, weight, slant, family)
-    if key not in FONTS:
-        font = tkinter.font.Font(family=family, size=size, weight=weight, slant=slant)
-        label = tkinter.Label(font=font)
-        FONTS[key] = (font, label)
-
-    return FONTS[key][0]
 
 
 class DrawText:
@@ -28,8 +18,12 @@ class DrawText:
         self.bottom = y1 + font.metrics("linespace")
 
     def execute(self, scroll, canvas):
-        canvas.create_text(
-            self.left, self.top - scroll, text=self.text, font=self.font, anchor="nw"
+        return canvas.create_text(
+            self.left,
+            self.top - scroll,
+            text=self.text,
+            font=self.font.font,
+            anchor="nw",
         )
 
 
@@ -42,7 +36,7 @@ class DrawRect:
         self.color = color
 
     def execute(self, scroll, canvas):
-        canvas.create_rectangle(
+        return canvas.create_rectangle(
             self.left,
             self.top - scroll,
             self.right,
@@ -53,30 +47,36 @@ class DrawRect:
 
 
 class DocumentLayout:
-    def __init__(self, node):
+    def __init__(self, node, fonts=None):
         self.node = node
+        self.fonts = fonts or TK_FONTS
         self.parent = None
         self.previous = None
         self.children = []
 
-    def layout(self):
-        child = BlockLayout(self.node, self, None)
-        self.children.append(child)
+    def layout(self, width=WIDTH, viewport=None):
+        """Lay the document out, reusing the tree built by earlier calls.
+
+        With a (top, bottom) viewport only the blocks it overlaps are laid
+        out exactly; the others keep their lines and get an estimated
+        height until the next layout without a viewport.
+        """
+        if not self.children:
+            self.children.append(BlockLayout(self.node, self, None))
+        child = self.children[0]
 
-        self.width = WIDTH - 2 * HSTEP
+        self.width = width - 2 * HSTEP
         self.x = HSTEP
         self.y = VSTEP
-        child.layout()
+        child.layout(viewport)
         self.height = child.height
 
-        self.display_list = child.display_list
-
     def paint(self):
         return []
 
 
 class BlockLayout:
-    def __init__(self, node, parent, previous):
+    def __init__(self, node, parent, previous, fonts=None):
         self.x = None
         self.y = None
         self.width = None
@@ -85,8 +85,20 @@ class BlockLayout:
         self.node = node
         self.parent = parent
         self.previous = previous
+        self.fonts = fonts or parent.fonts
         self.children = []
-        self.display_list = []
+        self.mode = None
+
+        # Inline content as measured words and line-breaking instructions,
+        # recorded once so a new width only has to re-break the lines.
+        # Lines hold positions relative to the block's top-left corner.
+        self.items = None
+        self.lines = []
+        self.lines_width = None
+
+        # Width and height of the last exact (viewport-less) layout.
+        self.exact_width = None
+        self.exact_height = None
 
         self.cursor_x = 0
         self.cursor_y = 0
@@ -98,9 +110,19 @@ class BlockLayout:
         self.in_pre = False
         self.in_code = False
 
-    def layout(self):
-        if isinstance(self.node, Element) and self.node.tag == "head":
-            return
+    def layout(self, viewport=None):
+        """Lay out this block and the blocks under it, without recursion."""
+        walk(
+            self,
+            lambda block: block.start_layout(viewport),
+            lambda block: block.finish_layout(viewport),
+        )
+
+    def start_layout(self, viewport):
+        """Position the block and build its children or lines; False if
+        its children need no layout."""
+        if isinstance(self.node, Element) and self.node.tag in HIDDEN_TAGS:
+            return False
 
         self.x = self.parent.x
         self.width = self.parent.width
@@ -113,42 +135,60 @@ class BlockLayout:
         else:
             self.y = self.parent.y
 
+        if (
+            viewport
+            and self.exact_width
+            and self.width > 0
+            and self.exact_width != self.width
+        ):
+            # Off-screen during a resize: scale the old height instead of
+            # laying the subtree out again.
+            estimate = self.exact_height * self.exact_width / self.width
+            top, bottom = viewport
+            if self.y > bottom or self.y + estimate < top:
+                self.height = estimate
+                return False
+
         mode = self.layout_mode()
         if mode == "block":
-            previous = None
-            for child in self.node.children:
-                next = BlockLayout(child, self, previous)
-                self.children.append(next)
-                previous = next
+            if not self.children:
+                self.layout_intermediate()
         else:
-            self.line = []
-            self.recurse(self.node)
-            self.flush()
-
-        for child in self.children:
-            child.layout()
-
-        if mode == "block":
+            if self.items is None:
+                self.items = []
+                self.recurse(self.node)
+            if self.lines_width != self.width:
+                self.break_lines()
+
+    def finish_layout(self, viewport):
+        """Size the block once its children are laid out."""
+        if self.layout_mode() == "block":
             self.height = sum(
                 child.height for child in self.children if child.height is not None
             )  # type: ignore
         else:
             self.height = self.cursor_y
 
+        if viewport is None:
+            self.exact_width = self.width
+            self.exact_height = self.height
+
     def layout_mode(self):
-        if isinstance(self.node, Text):
-            return "inline"
-        elif any(
-            [
-                isinstance(child, Element) and child.tag in BLOCK_ELEMENTS
-                for child in self.node.children
-            ]
-        ):
-            return "block"
-        elif self.node.children:
-            return "inline"
-        else:
-            return "block"
+        if self.mode is None:
+            if isinstance(self.node, Text):
+                self.mode = "inline"
+            elif any(
+                [
+                    isinstance(child, Element) and child.tag in BLOCK_ELEMENTS
+                    for child in self.node.children
+                ]
+            ):
+                self.mode = "block"
+            elif self.node.children:
+                self.mode = "inline"
+            else:
+                self.mode = "block"
+        return self.mode
 
     def layout_intermediate(self):
         previous = None
@@ -158,53 +198,87 @@ class BlockLayout:
             previous = next
 
     def recurse(self, tree):
-        if isinstance(tree, Text):
+        walk(tree, self.enter_node, self.leave_node)
+
+    def enter_node(self, node):
+        if isinstance(node, Text):
             if self.in_pre or self.in_code:
-                for char in tree.text:
+                for char in node.text:
                     if char == "\n":
-                        self.flush()
+                        self.items.append(("break",))
                     else:
-                        self.word(char)
+                        self.add_word(char)
 
             else:
-                for word in tree.text.split():
-                    self.word(word)
+                for word in node.text.split():
+                    self.add_word(word)
+            return False
+        elif node.tag in HIDDEN_TAGS:
+            return False
+        self.open_tag(node.tag)
+
+    def leave_node(self, node):
+        self.close_tag(node.tag)
+
+    def add_word(self, word):
+        font = self.fonts.get_font(
+            self.size, self.weight, self.style, self.font_family
+        )
+        word_width = font.measure(word)
+
+        if self.in_pre or self.in_code:
+            advance = word_width
         else:
-            self.open_tag(tree.tag)
-            for child in tree.children:
-                self.recurse(child)
-            self.close_tag(tree.tag)
+            advance = word_width + font.measure(" ")
+
+        self.items.append(("word", word, font, word_width, advance))
+
+    def break_lines(self):
+        """Place the recorded words into lines for the current width."""
+        self.lines = []
+        self.line = []
+        self.cursor_x = 0
+        self.cursor_y = 0
+        self.centering = False
+
+        for item in self.items:
+            kind = item[0]
+            if kind == "word":
+                self.word(*item[1:])
+            elif kind == "break":
+                self.flush()
+            elif kind == "space":
+                self.cursor_y += VSTEP
+            elif kind == "center":
+                self.centering = item[1]
+        self.flush()
+
+        self.lines_width = self.width
 
     def flush(self):
         if not self.line:
             return
 
-        font = get_font(self.size, self.weight, self.style, self.font_family)
-        metrics = [font.metrics() for x, word, font in self.line]
-        max_ascent = max([metric["ascent"] for metric in metrics])
+        fonts = {font for _x, _word, font, _width in self.line}
+        metrics = {font: font.metrics() for font in fonts}
+        max_ascent = max([metric["ascent"] for metric in metrics.values()])
         baseline = self.cursor_y + 1.25 * max_ascent
-        line_width = sum(font.measure(word) for x, word, font in self.line) + (
-            len(self.line) - 1
-        ) * font.measure(" ")
 
         if self.centering:
+            last_x, _word, _font, last_width = self.line[-1]
+            line_width = last_x + last_width
             centered_x = (self.width - line_width) // 2
-            x_offset = max(HSTEP, centered_x)
-
-            for x, word, font in self.line:
-                y = self.y + baseline - font.metrics("ascent")
-                self.display_list.append((x_offset, y, word, font))
-                x_offset += font.measure(word) + font.measure(" ")
-
+            x_offset = max(HSTEP, centered_x) - self.x
         else:
-            for rel_x, word, font in self.line:
-                x = self.x + rel_x
-                y = self.y + baseline - font.metrics("ascent")
-                self.display_list.append((x, y, word, font))
+            x_offset = 0
+
+        for rel_x, word, font, _width in self.line:
+            y = baseline - metrics[font]["ascent"]
+            self.lines.append((x_offset + rel_x, y, word, font))
 
         self.cursor_x = 0
         self.line = []
-        max_descent = max([metric["descent"] for metric in metrics])
+        max_descent = max([metric["descent"] for metric in metrics.values()])
         self.cursor_y = baseline + 1.25 * max_descent
 
     def open_tag(self, tag):
@@ -217,13 +291,13 @@ class BlockLayout:
         elif tag == "big":
             self.size += 4
         elif tag == "p":
-            self.flush()
-            self.cursor_y += VSTEP
+            self.items.append(("break",))
+            self.items.append(("space",))
         elif tag == "br":
-            self.flush()
+            self.items.append(("break",))
         elif tag == "h1":
-            self.flush()
-            self.centering = True
+            self.items.append(("break",))
+            self.items.append(("center", True))
             self.size += 10
         elif tag == "pre":
             self.in_pre = True
@@ -242,11 +316,11 @@ class BlockLayout:
         elif tag == "big":
             self.size -= 4
         elif tag == "p":
-            self.flush()
-            self.cursor_y += VSTEP
+            self.items.append(("break",))
+            self.items.append(("space",))
         elif tag == "h1":
-            self.centering = False
-            self.flush()
+            self.items.append(("center", False))
+            self.items.append(("break",))
             self.size -= 10
         elif tag == "pre":
             self.in_pre = False
@@ -255,31 +329,14 @@ class BlockLayout:
             self.in_code = False
             self.font_family = "Times"
 
-    def word(self, word):
-        font = get_font(self.size, self.weight, self.style, self.font_family)
-        word_width = font.measure(word)
-        space_width = font.measure(" ")
-        line_width = (
-            sum(font.measure(word) for _x, word, font in self.line)
-            + len(self.line) * space_width
-        )
-
-        if self.in_pre or self.in_code:
-            char = word
-            char_width = font.measure(char)
-
-            if self.line and line_width + char_width > self.width:
-                self.flush()
-
-            self.line.append((self.cursor_x, char, font))
-            self.cursor_x += char_width
-        else:
-
-            if self.line and line_width + word_width > self.width:
-                self.flush()
+    def word(self, word, font, word_width, advance):
+        # cursor_x is the running width of the current line, so there is no
+        # need to measure the words already on it again.
+        if self.line and self.cursor_x + word_width > self.width:
+            self.flush()
 
-            self.line.append((self.cursor_x, word, font))
-            self.cursor_x += word_width + space_width
+        self.line.append((self.cursor_x, word, font, word_width))
+        self.cursor_x += advance
 
     def paint(self):
         cmds = []
@@ -291,8 +348,8 @@ class BlockLayout:
         #     cmds.append(rect)
 
         if self.layout_mode() == "inline":
-            for x, y, word, font in self.display_list:
-                text_cmd = DrawText(x, y, word, font)
+            for rel_x, rel_y, word, font in self.lines:
+                text_cmd = DrawText(self.x + rel_x, self.y + rel_y, word, font)
                 cmds.append(text_cmd)
 
         bgcolor = "transparent"
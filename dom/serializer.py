@@ -0,0 +1,187 @@
+import io
+
+from dom.constants import SELF_CLOSING_TAGS
+from dom.element import Element
+from dom.text import Text
+from dom.tokenizer import RAW_TEXT_TAGS
+
+BUFFER_SIZE = 64 * 1024  # characters collected before each write
+
+# Elements whose text is written as is, and whose whitespace pretty
+# printing must not touch.
+PRESERVE_TAGS = frozenset(["pre", "textarea"] + RAW_TEXT_TAGS)
+RAW_TAGS = frozenset(RAW_TEXT_TAGS)
+VOID_TAGS = frozenset(SELF_CLOSING_TAGS)
+
+
+def escape_text(text):
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+
+def escape_attribute(value):
+    if "&" in value:
+        value = value.replace("&", "&amp;")
+    if '"' in value:
+        value = value.replace('"', "&quot;")
+    if "<" in value:
+        value = value.replace("<", "&lt;")
+    return value
+
+
+class HTMLSerializer:
+    """Writes a DOM tree out as HTML while walking it.
+
+    `out` is anything with a write() method taking str (a text file, a
+    StringIO) or a socket, which gets the output encoded with `encoding`.
+    Output is collected in a list of strings that is joined and written
+    out every `buffer_size` characters or so, so memory use does not grow
+    with the document.
+
+    Text and attribute values are escaped, except the contents of
+    <script> and <style>. Void elements such as <br> get no end tag.
+    With `pretty`, every element and text node goes on its own line,
+    indented by depth, and text is stripped of leading and trailing
+    whitespace; the insides of <pre>, <textarea>, <script> and <style>
+    are written untouched.
+    """
+
+    def __init__(
+        self,
+        out,
+        pretty=False,
+        indent="  ",
+        buffer_size=BUFFER_SIZE,
+        encoding="utf-8",
+    ):
+        if hasattr(out, "write"):
+            self.write = out.write
+        else:
+            self.write = lambda data: out.sendall(data.encode(encoding))
+        self.pretty = pretty
+        self.indent = indent
+        self.buffer_size = buffer_size
+
+        self.parts = []
+        self.size = 0  # characters in self.parts
+        self.started = False  # whether a pretty line has been written yet
+
+    def flush(self):
+        if self.parts:
+            self.write("".join(self.parts))
+            self.parts = []
+            self.size = 0
+
+    def newline(self, depth):
+        """The line break and indentation that start a pretty line."""
+        if self.started:
+            return "\n" + self.indent * depth
+        self.started = True
+        return ""
+
+    def serialize(self, node):
+        """Write the tree under `node` and flush it out.
+
+        Walks the tree like dom.traversal.walk, with a stack holding an
+        iterator over the remaining children of every open element, but
+        inline: serialization runs once per node, so it does without the
+        enter/leave calls.
+        """
+        parts = self.parts
+        append = parts.append
+        pretty = self.pretty
+        buffer_size = self.buffer_size
+        size = self.size
+        preserve = 0  # open elements whose content is written as is
+        raw = 0  # open <script> and <style> elements
+
+        start_tags = {}  # "<tag>" strings, made once per tag name
+        end_tags = {}
+        open_elements = []  # (element, iterator over its parent's children)
+        children = iter((node,))
+        while True:
+            for child in children:
+                if isinstance(child, Text):
+                    text = child.text
+                    if not raw and ("&" in text or "<" in text or ">" in text):
+                        text = escape_text(text)
+                    if pretty and not preserve:
+                        text = text.strip()
+                        if not text:
+                            continue
+                        text = self.newline(len(open_elements)) + text
+                    append(text)
+                    size += len(text)
+                    if size >= buffer_size:
+                        self.flush()
+                        parts, size = self.parts, 0
+                        append = parts.append
+                    continue
+
+                if not isinstance(child, Element):
+                    continue
+
+                tag = child.tag
+                attributes = child.attributes
+                if attributes:
+                    start = "<" + tag
+                    for name, value in attributes.items():
+                        start += " " + name + '="' + escape_attribute(value) + '"'
+                    start += ">"
+                else:
+                    start = start_tags.get(tag)
+                    if start is None:
+                        start = start_tags[tag] = "<" + tag + ">"
+                if pretty and not preserve:
+                    start = self.newline(len(open_elements)) + start
+                append(start)
+                size += len(start)
+
+                if tag in VOID_TAGS:
+                    continue
+                if tag in PRESERVE_TAGS:
+                    preserve += 1
+                    if tag in RAW_TAGS:
+                        raw += 1
+                open_elements.append((child, children))
+                children = iter(child.children)
+                break
+
+            else:
+                if not open_elements:
+                    break
+                element, children = open_elements.pop()
+                tag = element.tag
+                end = end_tags.get(tag)
+                if end is None:
+                    end = end_tags[tag] = "</" + tag + ">"
+                if pretty and not preserve and element.children:
+                    end = self.newline(len(open_elements)) + end
+                if tag in PRESERVE_TAGS:
+                    preserve -= 1
+                    if tag in RAW_TAGS:
+                        raw -= 1
+                append(end)
+                size += len(end)
+
+            if size >= buffer_size:
+                self.flush()
+                parts, size = self.parts, 0
+                append = parts.append
+
+        self.size = size
+        if pretty:
+            append("\n")
+        self.flush()
+
+
+def to_html(node, pretty=False):
+    """Return the tree under `node` serialized as one string."""
+    out = io.StringIO()
+    HTMLSerializer(out, pretty=pretty).serialize(node)
+    return out.getvalue()
@@ -1,9 +1,23 @@
+from dom.element import EMPTY_CHILDREN, EMPTY_MAPPING, read_only
+
+
 class Text:
+    __slots__ = ("text", "parent", "_style")
+
+    children = EMPTY_CHILDREN  # text nodes are always leaves
+
     def __init__(self, text, parent):
         self.text = text
-        self.children = []
         self.parent = parent
-        self.style = {}
+        self._style = None
+
+    @property
+    def style(self):
+        return self._style or EMPTY_MAPPING
+
+    @style.setter
+    def style(self, style):
+        self._style = read_only(style)
 
     def __repr__(self):
         return repr(self.text)
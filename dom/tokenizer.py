@@ -0,0 +1,231 @@
+import re
+
+from dom.entities import decode_entities
+
+START_TAG = "start"
+END_TAG = "end"
+TEXT = "text"
+COMMENT = "comment"
+RAW_TEXT = "raw"
+
+RAW_TEXT_TAGS = ["script", "style"]
+
+TAG_OPEN_RE = re.compile(r"<(/?)([A-Za-z][^\t\n\f\r />]*)")
+TAG_REST_RE = re.compile(r"""((?:[^>"']|"[^"]*"|'[^']*')*)>""")
+# The same without the ">": where it stops is an unclosed quote, or the end
+TAG_QUOTE_RE = re.compile(r"""(?:[^>"']|"[^"]*"|'[^']*')*""")
+ATTRIBUTE_RE = re.compile(
+    r"""([^\t\n\f\r />"'=][^\t\n\f\r />"'=]*)"""
+    r"""(?:[\t\n\f\r ]*=[\t\n\f\r ]*(?:"([^"]*)"|'([^']*)'|([^\t\n\f\r >]+)))?"""
+)
+RAW_TEXT_END_RE = {
+    tag: re.compile(r"</" + tag + r"[\t\n\f\r />]", re.IGNORECASE)
+    for tag in RAW_TEXT_TAGS
+}
+
+
+def parse_attributes(text):
+    attributes = {}
+    for key, double, single, bare in ATTRIBUTE_RE.findall(text):
+        value = double or single or bare
+        if "&" in value:
+            value = decode_entities(value, attribute=True)
+        attributes[key.casefold()] = value
+    return attributes
+
+
+class HTMLTokenizer:
+    """Splits HTML into (kind, data, attributes) tokens.
+
+    The scanner jumps between interesting characters with str.find and
+    compiled regexes instead of walking the body one character at a time.
+    `attributes` is a dict for START_TAG tokens, the offset of the text in
+    the whole input for TEXT and RAW_TEXT tokens, and None for the rest.
+
+    Input can be pushed in pieces with feed(); anything that might continue
+    in the next piece (a text run, a half-received tag, comment or script
+    body) stays buffered until it is complete or close() is called.
+    The token generators must be consumed before feeding more data.
+
+    Pieces are kept in a list and only joined once a piece brings what the
+    buffered token waits for (the end of a script, "-->", the next "<"),
+    and the search then resumes where the last one stopped, so a long
+    token arriving in many small pieces costs linear time.
+    """
+
+    def __init__(self, body=""):
+        self.parts = [body] if body else []
+        self.length = len(body)
+        self.offset = 0  # position of the buffer in the whole input
+        self.raw_tag = None
+
+        # What the buffered token needs before it can end: a string or a
+        # compiled regex, and how many characters a match of it may span
+        # before the end of the buffer. Below `resume` there is none, if
+        # the search for it can resume at all.
+        self.wait = None
+        self.overlap = 0
+        self.resumable = False
+        self.resume = 0
+
+    def __iter__(self):
+        return self.close()
+
+    def feed(self, data):
+        waiting = self.wait is not None and not self.arrived(data)
+        self.parts.append(data)
+        self.length += len(data)
+        if waiting:
+            self.resume = max(self.length - self.overlap, 0)
+            return iter(())
+        return self.tokens(final=False)
+
+    def close(self):
+        return self.tokens(final=True)
+
+    def arrived(self, data):
+        """Whether `data` may hold what the buffered token waits for."""
+        if self.overlap:
+            tail = ""
+            for part in reversed(self.parts):
+                tail = part[-self.overlap :] + tail
+                if len(tail) >= self.overlap:
+                    break
+            data = tail[-self.overlap :] + data
+        if isinstance(self.wait, str):
+            return self.wait in data
+        return self.wait.search(data) is not None
+
+    def wait_for(self, needle, overlap=0, resumable=True):
+        self.wait = needle
+        self.overlap = overlap
+        self.resumable = resumable
+
+    def tokens(self, final):
+        body = "".join(self.parts)
+        base = self.offset
+        end = len(body)
+        pos = 0
+        text_start = 0
+
+        # Nothing of what the buffer waited for lies before `resume`
+        wait = self.wait if self.resumable else None
+        resume = self.resume if wait is not None else 0
+        if wait == "<":
+            pos = resume
+        self.wait = None
+
+        try:
+            if self.raw_tag is not None:
+                close_match = RAW_TEXT_END_RE[self.raw_tag].search(body, resume)
+                if not close_match and not final:
+                    self.wait_for(RAW_TEXT_END_RE[self.raw_tag], len(self.raw_tag) + 2)
+                    return
+                close = close_match.start() if close_match else end
+                if close:
+                    yield RAW_TEXT, body[:close], base
+                self.raw_tag = None
+                pos = text_start = close
+
+            while pos < end:
+                lt = body.find("<", pos)
+                if lt == -1:
+                    if not final:
+                        self.wait_for("<")
+                    break
+
+                if body.startswith("<!--", lt):
+                    start = max(lt + 4, resume) if wait == "-->" else lt + 4
+                    close = body.find("-->", start)
+                    if close == -1 and not final:
+                        self.wait_for("-->", 2)
+                        return
+                    if text_start < lt:
+                        yield TEXT, body[text_start:lt], base + text_start
+                    if close == -1:
+                        yield COMMENT, body[lt + 4 :], None
+                        pos = text_start = end
+                        return
+                    yield COMMENT, body[lt + 4 : close], None
+                    pos = text_start = close + 3
+                    continue
+
+                if body.startswith("<!", lt) or body.startswith("<?", lt):
+                    start = max(lt + 2, resume) if wait == ">" else lt + 2
+                    close = body.find(">", start)
+                    if close == -1:
+                        if not final:
+                            self.wait_for(">")
+                            return
+                        close = end
+                    if text_start < lt:
+                        yield TEXT, body[text_start:lt], base + text_start
+                    yield COMMENT, body[lt + 2 : close], None
+                    pos = text_start = min(close + 1, end)
+                    continue
+
+                match = TAG_OPEN_RE.match(body, lt)
+                if not match:
+                    if not final and end - lt < 3:
+                        # "<" or "</" cut off at the end of the chunk.
+                        return
+                    # A lone "<" is just text.
+                    pos = lt + 1
+                    continue
+
+                rest = TAG_REST_RE.match(body, match.end())
+                if rest:
+                    attribute_text = rest.group(1)
+                    tag_end = rest.end()
+                else:
+                    # Wait for the rest of the tag (or for a closing quote);
+                    # at the end fall back to the next ">".
+                    if not final:
+                        # An unclosed quote, or no ">" yet; the tag itself
+                        # is matched again from its start
+                        quote = TAG_QUOTE_RE.match(body, match.end()).end()
+                        needle = body[quote] if quote < end else ">"
+                        self.wait_for(needle, resumable=False)
+                        return
+                    close = body.find(">", match.end())
+                    if close == -1:
+                        # The document ended inside a tag: drop it.
+                        if text_start < lt:
+                            yield TEXT, body[text_start:lt], base + text_start
+                        pos = text_start = end
+                        break
+                    attribute_text = body[match.end() : close]
+                    tag_end = close + 1
+
+                if text_start < lt:
+                    yield TEXT, body[text_start:lt], base + text_start
+                pos = text_start = tag_end
+
+                tag = match.group(2).casefold()
+                if match.group(1):
+                    yield END_TAG, tag, None
+                    continue
+
+                yield START_TAG, tag, parse_attributes(attribute_text)
+
+                if tag in RAW_TEXT_END_RE:
+                    close_match = RAW_TEXT_END_RE[tag].search(body, pos)
+                    if not close_match and not final:
+                        self.raw_tag = tag
+                        self.wait_for(RAW_TEXT_END_RE[tag], len(tag) + 2)
+                        return
+                    close = close_match.start() if close_match else end
+                    if pos < close:
+                        yield RAW_TEXT, body[pos:close], base + pos
+                    pos = text_start = close
+
+            if final and text_start < end:
+                yield TEXT, body[text_start:], base + text_start
+                text_start = end
+
+        finally:
+            rest = body[text_start:]
+            self.parts = [rest] if rest else []
+            self.length = len(rest)
+            self.offset = base + text_start
+            self.resume = max(self.length - self.overlap, 0)
@@ -0,0 +1,25 @@
+def walk(root, enter=None, leave=None):
+    """Visit the tree under `root` depth-first with an explicit stack.
+
+    Works for any tree whose nodes have a `children` list: the DOM as well
+    as the layout tree. enter(node) runs before a node's children and
+    leave(node) after them; when enter returns False the node's children
+    are skipped and leave is not called for it. Deep documents neither
+    hit the recursion limit nor pay for a Python frame per node, and the
+    stack only holds the path to the current node.
+    """
+    if enter is not None and enter(root) is False:
+        return
+    stack = [(root, iter(root.children))]
+    while stack:
+        node, children = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            if leave is not None:
+                leave(node)
+            continue
+
+        if enter is not None and enter(child) is False:
+            continue
+        stack.append((child, iter(child.children)))
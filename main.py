@@ -3,6 +3,12 @@ if __name__ == "__main__":
     import tkinter
     from network.url import URL
     from browser import Browser
+    from dom.fonts import MeasureCache
+    from network.cache import Cache
+    from network.diskcache import DiskCache
+
+    MeasureCache.load()
+    Cache.configure(disk=DiskCache())
 
     if len(sys.argv) > 1:
         Browser().load(URL(sys.argv[1]))
@@ -10,3 +16,5 @@ if __name__ == "__main__":
         Browser().load(URL())
 
     tkinter.mainloop()
+
+    MeasureCache.save()
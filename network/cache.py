@@ -1,34 +1,334 @@
+import threading
 import time
+import email.utils
+from collections import OrderedDict
 
 
 class Cache:
-    """Cache class to store the responses."""
+    """Cache class to store the responses.
 
-    cache = {}
+    Entries are kept in least-recently-used order and evicted once the
+    stored bodies and headers exceed `max_bytes`. Stale entries that carry
+    an ETag or Last-Modified validator are kept so they can be revalidated
+    with a conditional request instead of being downloaded again.
+    """
+
+    cache = OrderedDict()
+    lock = threading.RLock()
+    disk = None  # optional DiskCache tier under the in-memory one
+
+    max_bytes = 32 * 1024 * 1024
+    size = 0
+    shared = False  # a shared cache honours s-maxage and skips private responses
+    sweep_interval = 60  # seconds between expiry sweeps
+    last_sweep = 0.0
+
+    hits = 0
+    misses = 0
+    evictions = 0
+    expirations = 0
+    revalidations = 0
 
     @staticmethod
-    def get_max_age(cache_control):
+    def parse_cache_control(cache_control):
+        """Parse a cache-control header into a dict of directives."""
+        directives = {}
+        for part in cache_control.split(","):
+            name, _, value = part.strip().partition("=")
+            if name:
+                directives[name.strip().casefold()] = value.strip().strip('"')
+        return directives
+
+    @classmethod
+    def get_max_age(cls, cache_control):
         """Get the max-age value from the cache-control header."""
-        if "max-age=" in cache_control:
-            parts = cache_control.split(",")
-            for part in parts:
-                if part.startswith("max-age="):
-                    return int(part.split("=")[1])
-        return None
+        value = cls.parse_cache_control(cache_control).get("max-age")
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def parse_http_date(value):
+        """Parse an HTTP date into a timestamp, None if it is invalid."""
+        try:
+            return email.utils.parsedate_to_datetime(value).timestamp()
+        except (TypeError, ValueError, IndexError):
+            return None
+
+    @classmethod
+    def freshness_lifetime(cls, headers):
+        """Seconds the response stays fresh, or None without any hint."""
+        directives = cls.parse_cache_control(headers.get("cache-control", ""))
+
+        names = ["s-maxage", "max-age"] if cls.shared else ["max-age"]
+        for name in names:
+            if name in directives:
+                try:
+                    lifetime = int(directives[name])
+                except ValueError:
+                    return 0
+                break
+        else:
+            if "expires" not in headers:
+                return None
+            expires = cls.parse_http_date(headers["expires"])
+            if expires is None:
+                return 0  # invalid dates such as "0" mean already expired
+            date = cls.parse_http_date(headers.get("date", ""))
+            lifetime = expires - (date if date is not None else time.time())
+
+        try:
+            lifetime -= int(headers.get("age", 0))
+        except ValueError:
+            pass
+        return max(lifetime, 0)
+
+    @classmethod
+    def is_storable(cls, headers, status_code=200):
+        """Check whether a response may be stored at all."""
+        if status_code != 200:
+            return False
+
+        directives = cls.parse_cache_control(headers.get("cache-control", ""))
+        if "no-store" in directives:
+            return False
+        if cls.shared and "private" in directives:
+            return False
+
+        return (
+            cls.freshness_lifetime(headers) is not None
+            or "no-cache" in directives
+            or "etag" in headers
+            or "last-modified" in headers
+        )
 
     @classmethod
-    def store_in_cache(cls, cache, max_age, url):
+    def make_entry(cls, url, body, headers, encoding, text=None):
+        """Build a cache entry, computing its expiry and size."""
+        directives = cls.parse_cache_control(headers.get("cache-control", ""))
+        lifetime = cls.freshness_lifetime(headers)
+
+        size = len(body) + sum(len(k) + len(v) for k, v in headers.items())
+        if text is not None:
+            size += len(text)
+        return {
+            "body": body,
+            "text": text,  # decoded body, kept so hits need not decode again
+            "headers": headers,
+            "url": url,
+            "encoding": encoding,
+            "expires": time.time() + (lifetime or 0),
+            "no_cache": "no-cache" in directives,
+            "must_revalidate": "must-revalidate" in directives
+            or "proxy-revalidate" in directives,
+            "etag": headers.get("etag"),
+            "last_modified": headers.get("last-modified"),
+            "size": size,
+        }
+
+    @classmethod
+    def store_in_cache(cls, url, body, headers, encoding, text=None):
         """Store the response in the cache."""
-        if max_age is not None:
-            expiry_time = time.time() + max_age
-            cls.cache[url] = (cache, expiry_time)
+        entry = cls.make_entry(url, body, headers, encoding, text)
+        if cls.disk:
+            cls.disk.store(url, body, headers, encoding, entry["expires"])
+        if entry["size"] > cls.max_bytes:
+            return False
+
+        with cls.lock:
+            cls.insert(entry)
+            cls.maybe_sweep()
+        return True
+
+    @classmethod
+    def insert(cls, entry):
+        """Put an entry in the memory tier and keep it within budget."""
+        with cls.lock:
+            cls.remove(entry["url"])
+            cls.cache[entry["url"]] = entry
+            cls.size += entry["size"]
+            cls.evict()
+
+    @classmethod
+    def lookup(cls, url):
+        """Find an entry in memory, falling back to the disk tier.
+
+        The disk is read without holding the lock, so other threads keep
+        using the memory tier meanwhile.
+        """
+        with cls.lock:
+            entry = cls.cache.get(url)
+        if entry or not cls.disk:
+            return entry
+
+        stored = cls.disk.get(url)
+        if stored is None:
+            return None
+        body, headers, encoding, expires = stored
+        entry = cls.make_entry(url, body, headers, encoding)
+        entry["expires"] = expires
+        with cls.lock:
+            current = cls.cache.get(url)
+            if current:
+                return current  # another thread got there first
+            if entry["size"] <= cls.max_bytes:
+                cls.insert(entry)
+        return entry
 
     @classmethod
     def get_cached_response(cls, url):
-        """Check if the response is in the cache and if it's not expired."""
-        cached_data = cls.cache.get(url)
-        if cached_data:
-            cache, expiry_time = cached_data
-            if time.time() < expiry_time:
-                return cache
+        """Return the entry if it can be used without asking the server."""
+        entry = cls.lookup(url)
+        with cls.lock:
+            if entry and not entry["no_cache"] and time.time() < entry["expires"]:
+                if cls.cache.get(url) is entry:
+                    cls.cache.move_to_end(url)
+                cls.hits += 1
+                return entry
+            cls.misses += 1
         return None
+
+    @classmethod
+    def get_stale_entry(cls, url):
+        """Return the stored entry, fresh or not, e.g. to revalidate it."""
+        return cls.lookup(url)
+
+    @staticmethod
+    def can_serve_stale(entry):
+        """Whether a stale entry may stand in when the origin is unreachable."""
+        return not (entry["must_revalidate"] or entry["no_cache"])
+
+    @staticmethod
+    def conditional_headers(entry):
+        """Request headers that turn a GET into a revalidation of `entry`."""
+        headers = {}
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    @classmethod
+    def revalidated(cls, entry, headers):
+        """Refresh `entry` after a 304 and return it with its stored body.
+
+        `entry` is the stale entry the conditional request was built from,
+        so the response is rebuilt even if it was evicted in the meantime.
+        """
+        merged = dict(entry["headers"])
+        for name, value in headers.items():
+            if name not in ("content-length", "transfer-encoding"):
+                merged[name] = value
+
+        url = entry["url"]
+        entry = cls.make_entry(
+            url, entry["body"], merged, entry["encoding"], entry["text"]
+        )
+        with cls.lock:
+            if entry["size"] <= cls.max_bytes:
+                cls.insert(entry)
+            cls.revalidations += 1
+        if cls.disk:
+            body, encoding, expires = entry["body"], entry["encoding"], entry["expires"]
+            cls.disk.store(url, body, merged, encoding, expires)
+        return entry
+
+    @classmethod
+    def remember_text(cls, entry, text):
+        """Keep the decoded body of an entry for the next hits."""
+        with cls.lock:
+            if entry["text"] is not None:
+                return
+            entry["text"] = text
+            entry["size"] += len(text)
+            if cls.cache.get(entry["url"]) is entry:
+                cls.size += len(text)
+                cls.evict()
+
+    @classmethod
+    def remove(cls, url):
+        """Drop a single entry."""
+        with cls.lock:
+            entry = cls.cache.pop(url, None)
+            if entry:
+                cls.size -= entry["size"]
+
+    @classmethod
+    def evict(cls):
+        """Evict least recently used entries until the budget is met."""
+        with cls.lock:
+            while cls.size > cls.max_bytes and cls.cache:
+                _url, entry = cls.cache.popitem(last=False)
+                cls.size -= entry["size"]
+                cls.evictions += 1
+
+    @classmethod
+    def maybe_sweep(cls):
+        """Run sweep() if the last one was long enough ago."""
+        if time.time() - cls.last_sweep >= cls.sweep_interval:
+            cls.sweep()
+
+    @classmethod
+    def sweep(cls):
+        """Drop expired entries that have no validator to revalidate with."""
+        now = time.time()
+        with cls.lock:
+            cls.last_sweep = now
+            for url, entry in list(cls.cache.items()):
+                if now >= entry["expires"] and not (
+                    entry["etag"] or entry["last_modified"]
+                ):
+                    cls.remove(url)
+                    cls.expirations += 1
+
+    @classmethod
+    def start_cache_sweeper(cls, interval=None):  # interval in seconds
+        """Method that sweeps expired entries in the background."""
+        interval = interval or cls.sweep_interval
+
+        def sweeper():
+            while True:
+                time.sleep(interval)
+                cls.sweep()
+
+        thread = threading.Thread(target=sweeper, daemon=True)
+        thread.start()
+
+    @classmethod
+    def configure(cls, max_bytes=None, shared=None, disk=None):
+        """Change the byte budget, shared/private semantics or disk tier."""
+        with cls.lock:
+            if max_bytes is not None:
+                cls.max_bytes = max_bytes
+                cls.evict()
+            if shared is not None:
+                cls.shared = shared
+            if disk is not None:
+                cls.disk = disk
+
+    @classmethod
+    def clear(cls):
+        """Drop every entry and reset the statistics."""
+        with cls.lock:
+            cls.cache.clear()
+            cls.size = 0
+            cls.hits = cls.misses = cls.evictions = 0
+            cls.expirations = cls.revalidations = 0
+
+    @classmethod
+    def stats(cls):
+        """Return hit, miss and eviction statistics."""
+        with cls.lock:
+            lookups = cls.hits + cls.misses
+            return {
+                "entries": len(cls.cache),
+                "bytes": cls.size,
+                "max_bytes": cls.max_bytes,
+                "hits": cls.hits,
+                "misses": cls.misses,
+                "hit_rate": cls.hits / lookups if lookups else 0.0,
+                "evictions": cls.evictions,
+                "expirations": cls.expirations,
+                "revalidations": cls.revalidations,
+            }
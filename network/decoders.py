@@ -0,0 +1,226 @@
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:  # brotli is optional: "br" is then simply not offered
+        brotli = None
+
+MAX_DECODED_SIZE = 256 * 1024 * 1024  # bytes a single body may expand to
+
+
+class DecompressionError(Exception):
+    """Corrupt compressed data, or a body expanding past the size cap."""
+
+
+class ZlibDecoder:
+    """Incremental zlib/gzip decoder that never inflates past `max_length`.
+
+    A stream that stops before its end raises DecompressionError at
+    flush(); an empty body is left alone.
+    """
+
+    def __init__(self, wbits):
+        self.decompressor = zlib.decompressobj(wbits)
+        self.started = False
+
+    def decompress(self, data, max_length):
+        self.started = True
+        try:
+            return self.decompressor.decompress(data, max_length)
+        except zlib.error as e:
+            raise DecompressionError(str(e)) from e
+
+    def flush(self):
+        try:
+            output = self.decompressor.flush()
+        except zlib.error as e:
+            raise DecompressionError(str(e)) from e
+        if self.started and not self.decompressor.eof:
+            raise DecompressionError("Compressed body is truncated")
+        return output
+
+
+class GzipDecoder(ZlibDecoder):
+    """Content-Encoding: gzip, which may hold several members in a row."""
+
+    def __init__(self):
+        super().__init__(16 + zlib.MAX_WBITS)
+
+    def decompress(self, data, max_length):
+        output = super().decompress(data, max_length)
+        # Whatever follows the end of a member is the start of the next one
+        while (
+            self.decompressor.eof
+            and self.decompressor.unused_data
+            and len(output) < max_length
+        ):
+            data = self.decompressor.unused_data
+            self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            output += super().decompress(data, max_length - len(output))
+        return output
+
+
+class DeflateDecoder(ZlibDecoder):
+    """Content-Encoding: deflate.
+
+    The encoding means zlib-wrapped data, but some servers send raw deflate
+    streams, so fall back to those if the body has no zlib header. The
+    two header bytes are collected first, as a body may arrive a byte at
+    a time.
+    """
+
+    def __init__(self):
+        super().__init__(zlib.MAX_WBITS)
+        self.head = b""
+
+    def decompress(self, data, max_length):
+        if not self.started:
+            data = self.head + data
+            if len(data) < 2:
+                self.head = data
+                return b""
+            self.head = b""
+            self.started = True
+            try:
+                return self.decompressor.decompress(data, max_length)
+            except zlib.error:
+                self.decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        return super().decompress(data, max_length)
+
+    def flush(self):
+        if self.head:
+            raise DecompressionError("Compressed body is truncated")
+        return super().flush()
+
+
+BROTLI_SLICE = 1024  # input bytes per step when output cannot be limited
+
+
+class BrotliDecoder:
+    """Content-Encoding: br, through the optional brotli module.
+
+    Recent versions of brotli and brotlicffi take an output_buffer_limit,
+    so at most `max_length` bytes are ever produced. With older ones the
+    input is fed in slices of BROTLI_SLICE bytes, and decoding stops at
+    the first slice that goes over the limit. A stream that stops before
+    its end raises DecompressionError at flush() where the module can tell.
+    """
+
+    def __init__(self):
+        self.decompressor = brotli.Decompressor()
+        self.limited = hasattr(self.decompressor, "can_accept_more_data")
+        self.started = False
+
+    def decompress(self, data, max_length):
+        self.started = True
+        try:
+            if self.limited:
+                return self.decompress_limited(data, max_length)
+            return self.decompress_slices(data, max_length)
+        except brotli.error as e:
+            raise DecompressionError(str(e)) from e
+
+    def decompress_limited(self, data, max_length):
+        process = self.decompressor.process
+        output = process(data, output_buffer_limit=max_length)
+        while (
+            len(output) < max_length and not self.decompressor.can_accept_more_data()
+        ):
+            output += process(b"", output_buffer_limit=max_length - len(output))
+        return output
+
+    def decompress_slices(self, data, max_length):
+        process = self.decompressor.process
+        output = b""
+        for start in range(0, len(data), BROTLI_SLICE):
+            output += process(data[start : start + BROTLI_SLICE])
+            if len(output) >= max_length:
+                break
+        return output
+
+    def flush(self):
+        is_finished = getattr(self.decompressor, "is_finished", None)
+        if self.started and is_finished is not None and not is_finished():
+            raise DecompressionError("Compressed body is truncated")
+        return b""
+
+
+DECODERS = {
+    "gzip": GzipDecoder,
+    "x-gzip": GzipDecoder,
+    "deflate": DeflateDecoder,
+}
+if brotli is not None:
+    DECODERS["br"] = BrotliDecoder
+
+
+def register_decoder(name, factory):
+    """Add a content coding; `factory()` returns a decoder object."""
+    DECODERS[name.casefold()] = factory
+
+
+def accept_encoding():
+    """Value for the Accept-Encoding request header."""
+    return ", ".join(name for name in DECODERS if name != "x-gzip")
+
+
+class ContentDecoder:
+    """Decodes a response body as it arrives, whatever its Content-Encoding.
+
+    Codings listed in the header are undone in reverse order. Every stage
+    is limited to `max_size` bytes of output in total, so a small
+    compressed body cannot expand into gigabytes: zlib stages stop
+    inflating at the limit and DecompressionError is raised. So is it
+    when a compressed body ends before its stream does.
+    """
+
+    def __init__(self, encodings, max_size=MAX_DECODED_SIZE):
+        self.max_size = max_size
+        self.stages = []
+        for name in reversed(encodings):
+            if name not in DECODERS:
+                raise DecompressionError(f"Unsupported content encoding: {name}")
+            self.stages.append([DECODERS[name](), 0])
+
+    @classmethod
+    def for_headers(cls, response_headers, max_size=MAX_DECODED_SIZE):
+        """Return a decoder for the response, None if it is not encoded."""
+        encodings = [
+            name.strip().casefold()
+            for name in response_headers.get("content-encoding", "").split(",")
+        ]
+        encodings = [name for name in encodings if name and name != "identity"]
+        if not encodings:
+            return None
+        return cls(encodings, max_size)
+
+    def decompress(self, data):
+        """Return the decoded bytes for the next piece of the body."""
+        for stage in self.stages:
+            data = self.run(stage, data)
+        return data
+
+    def flush(self):
+        """Return whatever the stages still hold at the end of the body."""
+        data = b""
+        for stage in self.stages:
+            decoder = stage[0]
+            data = self.run(stage, data) + self.checked(stage, decoder.flush())
+        return data
+
+    def run(self, stage, data):
+        if not data:
+            return b""
+        decoder, produced = stage
+        # One byte more than allowed tells a full budget from an overflow.
+        output = decoder.decompress(data, self.max_size - produced + 1)
+        return self.checked(stage, output)
+
+    def checked(self, stage, output):
+        stage[1] += len(output)
+        if stage[1] > self.max_size:
+            raise DecompressionError(f"Decoded body exceeds {self.max_size} bytes")
+        return output
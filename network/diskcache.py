@@ -0,0 +1,259 @@
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # no advisory locks (Windows): single-process use only
+    fcntl = None
+
+DISK_CACHE_DIRECTORY = os.path.join(
+    os.path.expanduser("~"), ".cache", "browser-py", "http"
+)
+DISK_CACHE_BYTES = 256 * 1024 * 1024
+MMAP_THRESHOLD = 64 * 1024
+COMPACT_MIN_LINES = 1000  # log lines before rewriting it is worth it
+
+
+class DiskCache:
+    """Persistent tier under Cache, shared by every process on the host.
+
+    Bodies are stored once per content hash under bodies/. The index is an
+    append-only log with one JSON line per change: a store maps a URL to
+    its body digest, length, expiry, encoding and headers, and a line with
+    the URL alone removes it. Each process replays only the lines added
+    since it last looked, and keeps the records in least-recently-stored
+    order with a reference count per body, so storing and evicting cost
+    the same however many entries there are. Appends happen under a file
+    lock, so several browser or crawler processes can use the same
+    directory; once most lines are obsolete the log is rewritten with the
+    live records and renamed into place. Bodies of MMAP_THRESHOLD bytes or
+    more are memory-mapped rather than read into Python bytes.
+    """
+
+    def __init__(self, directory=DISK_CACHE_DIRECTORY, max_bytes=DISK_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, "index.log")
+        self.lock_path = os.path.join(directory, "lock")
+        os.makedirs(os.path.join(directory, "bodies"), exist_ok=True)
+
+        self.thread_lock = threading.RLock()
+        self.reset_index()
+
+    def reset_index(self):
+        self.index = OrderedDict()  # url -> record, oldest stored first
+        self.references = {}  # digest -> number of records using it
+        self.total = 0  # bytes of the distinct bodies referenced
+        self.log_inode = None
+        self.log_offset = 0  # end of the last complete line replayed
+        self.log_lines = 0
+
+    @contextmanager
+    def locked(self, exclusive):
+        """Hold the cross-process lock (and the in-process one)."""
+        with self.thread_lock:
+            with open(self.lock_path, "a+b") as lock_file:
+                if fcntl:
+                    fcntl.flock(
+                        lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+                    )
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def body_path(self, digest):
+        return os.path.join(self.directory, "bodies", digest[:2], digest)
+
+    def write_atomic(self, path, data):
+        """Write `data` to a temporary file and rename it over `path`."""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def load_index(self):
+        """Replay the log lines other processes appended since last time.
+
+        Reads everything again only when the log was rewritten.
+        """
+        try:
+            stat = os.stat(self.index_path)
+        except FileNotFoundError:
+            self.reset_index()
+            return self.index
+
+        if stat.st_ino != self.log_inode or stat.st_size < self.log_offset:
+            self.reset_index()
+            self.log_inode = stat.st_ino
+        if stat.st_size == self.log_offset:
+            return self.index
+
+        with open(self.index_path, "rb") as file:
+            file.seek(self.log_offset)
+            data = file.read()
+        complete = data.rfind(b"\n") + 1
+        for line in data[:complete].splitlines():
+            try:
+                self.apply(json.loads(line))
+            except ValueError:
+                pass  # a line torn by a crashed writer
+            self.log_lines += 1
+        self.log_offset += complete
+        return self.index
+
+    def apply(self, change):
+        """Apply one log line: [url, *record] stores, [url] removes.
+
+        Returns the digest of a body no record uses any more, or None.
+        """
+        url, record = change[0], change[1:]
+        old = self.index.pop(url, None)
+        if record:
+            self.index[url] = record
+            self.reference(record)
+        if old and self.release(old):
+            return old[0]
+        return None
+
+    def reference(self, record):
+        digest, length = record[0], record[1]
+        count = self.references.get(digest, 0)
+        if not count:
+            self.total += length
+        self.references[digest] = count + 1
+
+    def release(self, record):
+        """Drop a reference to a body, deleting the file with the last one."""
+        digest, length = record[0], record[1]
+        count = self.references[digest] - 1
+        if count:
+            self.references[digest] = count
+            return False
+        del self.references[digest]
+        self.total -= length
+        return True
+
+    def append(self, changes):
+        """Apply `changes` and append them to the log; hold the lock."""
+        lines = b"".join(
+            json.dumps(change, separators=(",", ":")).encode("utf-8") + b"\n"
+            for change in changes
+        )
+        with open(self.index_path, "ab") as file:
+            if file.tell() != self.log_offset:
+                lines = b"\n" + lines  # end a torn last line first
+            file.write(lines)
+            offset = file.tell()
+        for change in changes:
+            unused = self.apply(change)
+            if unused:
+                self.unlink_body(unused)
+        self.log_inode = os.stat(self.index_path).st_ino
+        self.log_offset = offset
+        self.log_lines += len(changes)
+
+    def compact(self):
+        """Rewrite the log with only the live records; hold the lock."""
+        data = b"".join(
+            json.dumps([url, *record], separators=(",", ":")).encode("utf-8") + b"\n"
+            for url, record in self.index.items()
+        )
+        self.write_atomic(self.index_path, data)
+        stat = os.stat(self.index_path)
+        self.log_inode = stat.st_ino
+        self.log_offset = stat.st_size
+        self.log_lines = len(self.index)
+
+    def read_body(self, digest, length):
+        """Return the body as bytes, or a memoryview over a mapping if large."""
+        with open(self.body_path(digest), "rb") as file:
+            if length >= MMAP_THRESHOLD:
+                mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                return memoryview(mapping)
+            return file.read()
+
+    def get(self, url):
+        """Return (body, headers, encoding, expires) or None."""
+        with self.locked(exclusive=False):
+            record = self.load_index().get(url)
+            if record is None:
+                return None
+            digest, length, expires, encoding, headers, _stored = record
+            try:
+                body = self.read_body(digest, length)
+            except OSError:
+                return None
+        return body, headers, encoding, expires
+
+    def store(self, url, body, headers, encoding, expires):
+        """Add or replace the entry for `url`."""
+        digest = hashlib.sha256(body).hexdigest()
+        path = self.body_path(digest)
+
+        with self.locked(exclusive=True):
+            if not os.path.exists(path):
+                self.write_atomic(path, body)
+
+            self.load_index()
+            record = [digest, len(body), expires, encoding, headers, time.time()]
+            self.append([[url, *record]] + self.evictions(url, record))
+            if self.log_lines > max(2 * len(self.index), COMPACT_MIN_LINES):
+                self.compact()
+
+    def evictions(self, url, record):
+        """Removals of the oldest records that make room for `record`."""
+        total = self.total
+        if record[0] not in self.references:
+            total += record[1]
+        old = self.index.get(url)
+        if old and self.references[old[0]] == 1 and old[0] != record[0]:
+            total -= old[1]
+
+        references = {}
+        removals = []
+        for other_url, other in self.index.items():
+            if total <= self.max_bytes:
+                break
+            if other_url == url:
+                continue
+            removals.append([other_url])
+            digest = other[0]
+            references[digest] = references.get(digest, 0) + 1
+            if references[digest] == self.references[digest] and digest != record[0]:
+                total -= other[1]
+        return removals
+
+    def unlink_body(self, digest):
+        try:
+            os.unlink(self.body_path(digest))
+        except FileNotFoundError:
+            pass
+
+    def remove(self, url):
+        with self.locked(exclusive=True):
+            if url in self.load_index():
+                self.append([[url]])
+
+    def clear(self):
+        with self.locked(exclusive=True):
+            self.load_index()
+            for _url, record in self.index.items():
+                self.unlink_body(record[0])
+            self.write_atomic(self.index_path, b"")
+            self.reset_index()
+            self.log_inode = os.stat(self.index_path).st_ino
@@ -0,0 +1,187 @@
+import collections
+import queue
+import threading
+
+from network.cache import Cache
+from network.decoders import DecompressionError
+from network.sockets import Sockets
+from network.url import URL
+
+PIPELINE_DEPTH = 8  # requests sent ahead on one connection
+MAX_ATTEMPTS = 3  # times a request is sent before giving up on it
+
+
+class OriginPipeline:
+    """Pipelines GET requests for one (scheme, host, port) over keep-alive
+    connections.
+
+    Each worker checks a socket out of Sockets, writes up to `depth`
+    requests in one go and reads the responses back in order with URL's
+    header, chunked and decoding logic. Requests the server did not answer
+    before closing the connection are queued again for the next batch.
+    """
+
+    def __init__(self, key, urls, results, depth):
+        self.key = key
+        self.jobs = collections.deque([url, 0] for url in urls)
+        self.lock = threading.Lock()
+        self.results = results
+        self.depth = depth
+
+    def run(self):
+        while True:
+            with self.lock:
+                count = min(self.depth, len(self.jobs))
+                batch = [self.jobs.popleft() for _ in range(count)]
+            if not batch:
+                return
+
+            redirects = []
+            answered = self.send_batch(batch, redirects)
+
+            retry = []
+            for job in batch[answered:]:
+                job[1] += 1
+                if job[1] < MAX_ATTEMPTS:
+                    retry.append(job)
+                else:
+                    self.results.put((job[0].url, None))
+            with self.lock:
+                self.jobs.extendleft(reversed(retry))
+
+            # Followed only now, so this worker does not hold one socket of
+            # the origin while waiting for another.
+            for url, target in redirects:
+                self.results.put((url.url, target.try_request()))
+
+    def send_batch(self, batch, redirects):
+        """Pipeline one batch and return how many responses were read."""
+        scheme, host, port = self.key
+        stale = [Cache.get_stale_entry(url.url) for url, _attempts in batch]
+        requests = b"".join(
+            url.build_request(Cache.conditional_headers(entry) if entry else None)
+            for (url, _attempts), entry in zip(batch, stale)
+        )
+
+        try:
+            sock, _reused = Sockets.checkout(scheme, host, port)
+        except OSError as e:
+            print(f"Error connecting to {host}: {e}")
+            return 0
+        response = None
+        answered = 0
+        reusable = False
+        try:
+            sock.sendall(requests)
+            response = sock.makefile("rb")
+            for (url, _attempts), entry in zip(batch, stale):
+                raw_statusline = response.readline()
+                if not raw_statusline:
+                    break  # closed early: the rest are sent again
+                status_code = url.parse_status_line(raw_statusline)
+                response_headers, content_length = url.read_headers(response)
+                has_body = status_code not in (204, 304)
+
+                try:
+                    raw_body = b""
+                    if has_body:
+                        raw_body = url.read_body(
+                            response, response_headers, content_length
+                        )
+                except DecompressionError as e:
+                    # The rest of this body is unread: drop the connection
+                    print(f"Error decompressing response body: {e}")
+                    self.results.put((url.url, None))
+                    answered += 1
+                    break
+
+                answered += 1
+                try:
+                    self.finish(
+                        url, entry, status_code, response_headers, raw_body, redirects
+                    )
+                except Exception as e:
+                    # e.g. LookupError for an unknown charset: still answer
+                    print(f"Error finishing {url.url}: {e}")
+                    self.results.put((url.url, None))
+                if not url.is_reusable(response_headers, has_body):
+                    break
+            else:
+                reusable = True
+        except Exception as e:
+            # The unanswered requests of the batch are sent again
+            print(f"Error pipelining to {host}: {e}")
+        finally:
+            if response:
+                response.close()
+            Sockets.checkin(sock, scheme, host, port, reusable)
+        return answered
+
+    def finish(self, url, stale, status_code, response_headers, raw_body, redirects):
+        if status_code == 304:
+            if stale:
+                body = url.decode_entry(Cache.revalidated(stale, response_headers))
+            else:
+                body = None
+        elif 300 <= status_code < 400:
+            try:
+                redirects.append((url, url.redirect_target(response_headers, 10)))
+            except Exception as e:
+                print(f"Error following redirect from {url.url}: {e}")
+                self.results.put((url.url, None))
+            return
+        else:
+            body = url.finish_body(raw_body, status_code, response_headers)
+        self.results.put((url.url, body))
+
+
+def fetch_many(urls, depth=PIPELINE_DEPTH, max_connections=None):
+    """Fetch many URLs, yielding (url, body) pairs as they complete.
+
+    Bodies are what URL.fetch() returns. Fresh cache hits are yielded
+    first; the other http(s) URLs are grouped by origin and pipelined
+    `depth` at a time over at most `max_connections` connections per
+    origin (the Sockets per-host cap by default).
+    """
+    results = queue.Queue()
+    origins = {}
+    others = []
+    total = 0
+
+    for url in urls:
+        if isinstance(url, str):
+            url = URL(url)
+        total += 1
+
+        if url.scheme not in ["http", "https"]:
+            others.append(url)
+            continue
+
+        cached_response = Cache.get_cached_response(url.url)
+        if cached_response:
+            results.put((url.url, url.decode_entry(cached_response)))
+            continue
+
+        origins.setdefault((url.scheme, url.host, url.port), []).append(url)
+
+    workers = []
+    for key, origin_urls in origins.items():
+        pipeline = OriginPipeline(key, origin_urls, results, depth)
+        connections = min(
+            max_connections or Sockets.max_per_host,
+            -(-len(origin_urls) // depth),
+        )
+        for _ in range(connections):
+            workers.append(threading.Thread(target=pipeline.run, daemon=True))
+
+    def fetch_others():
+        for url in others:
+            results.put((url.url, url.try_request()))
+
+    if others:
+        workers.append(threading.Thread(target=fetch_others, daemon=True))
+
+    for thread in workers:
+        thread.start()
+    for _ in range(total):
+        yield results.get()
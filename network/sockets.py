@@ -1,38 +1,285 @@
+import asyncio
+import collections
+import select
 import threading
 import time
 import socket
 import ssl
+import weakref
+
+
+class Resolver:
+    """Caches DNS lookups for `ttl` seconds.
+
+    getaddrinfo() does not report record TTLs, so every answer is kept for
+    the same fixed time. Hosts that refuse connections at a cached address
+    can be dropped with forget() to force a fresh lookup.
+    """
+
+    cache = {}  # (host, port) -> (addresses, expires)
+    lock = threading.Lock()
+    ttl = 300  # seconds
+
+    lookups = 0
+    hits = 0
+
+    @classmethod
+    def cached(cls, host, port):
+        with cls.lock:
+            entry = cls.cache.get((host, port))
+            if entry and time.time() < entry[1]:
+                cls.hits += 1
+                return entry[0]
+        return None
+
+    @classmethod
+    def remember(cls, host, port, addresses):
+        with cls.lock:
+            cls.lookups += 1
+            cls.cache[(host, port)] = (addresses, time.time() + cls.ttl)
+        return addresses
+
+    @classmethod
+    def resolve(cls, host, port):
+        """Return getaddrinfo() results for a TCP connection to host:port."""
+        addresses = cls.cached(host, port)
+        if addresses is None:
+            addresses = cls.remember(
+                host, port, socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+            )
+        return addresses
+
+    @classmethod
+    async def resolve_async(cls, host, port):
+        """resolve() without blocking the event loop on a cache miss."""
+        addresses = cls.cached(host, port)
+        if addresses is None:
+            loop = asyncio.get_running_loop()
+            addresses = cls.remember(
+                host,
+                port,
+                await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM),
+            )
+        return addresses
+
+    @classmethod
+    def forget(cls, host, port):
+        with cls.lock:
+            cls.cache.pop((host, port), None)
+
+    @classmethod
+    def clear(cls):
+        with cls.lock:
+            cls.cache.clear()
+            cls.lookups = cls.hits = 0
 
 
 class Sockets:
-    """Class to manage sockets."""
+    """Class to manage sockets.
+
+    A pool of keep-alive connections per (scheme, host, port). A socket is
+    checked out for the duration of one request/response exchange, so two
+    threads never share a connection, and checked back in once the body
+    has been read. Idle sockets are reused most recently used first and
+    probed before reuse; connections are capped per origin and in total.
+    """
+
+    idle = {}  # key -> [(sock, last_used)], least recently used first
+    in_use = {}  # key -> number of checked out sockets
+    condition = threading.Condition()
+
+    max_per_host = 6
+    max_total = 32
+    connect_timeout = 30  # seconds
 
-    sockets = {}
+    ssl_context = None  # shared by every TLS connection, see get_ssl_context()
+    sessions = {}  # (host, port) -> ssl.SSLSession to resume
+
+    opened = 0
+    reused = 0
+    stale = 0
+    retries = 0
+    tls_handshakes = 0
+    tls_resumed = 0
 
     @classmethod
-    def get_socket(cls, scheme, host, port):
-        """Method that returns a socket."""
+    def get_ssl_context(cls):
+        """Method that returns the SSLContext shared by all connections.
 
-        key = (scheme, host, port)
-        if key not in cls.sockets or cls.sockets[key] is None:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.connect((host, port))
+        Sharing one context lets OpenSSL keep its session cache, and the
+        sessions kept per host let reconnects resume with an abbreviated
+        handshake.
+        """
+        if cls.ssl_context is None:
+            cls.ssl_context = ssl.create_default_context()
+        return cls.ssl_context
+
+    @staticmethod
+    def connect(host, port):
+        """Method that connects to the first reachable resolved address."""
+        error = None
+        for family, type_, proto, _name, address in Resolver.resolve(host, port):
+            s = socket.socket(family, type_, proto)
+            try:
+                s.settimeout(Sockets.connect_timeout)
+                s.connect(address)
+                s.settimeout(None)
+                return s
+            except OSError as e:
+                s.close()
+                error = e
+        # The cached addresses may be out of date: look them up next time
+        Resolver.forget(host, port)
+        raise error or OSError(f"No addresses for {host}")
+
+    @classmethod
+    def open_socket(cls, scheme, host, port):
+        """Method that connects a new socket, with TLS for https."""
+        s = cls.connect(host, port)
 
-            if scheme == "https":
-                ctx = ssl.create_default_context()
-                s = ctx.wrap_socket(s, server_hostname=host)
+        if scheme == "https":
+            session = cls.sessions.get((host, port))
+            try:
+                s = cls.get_ssl_context().wrap_socket(
+                    s, server_hostname=host, session=session
+                )
+            except BaseException:
+                s.close()
+                raise
+            with cls.condition:
+                cls.tls_handshakes += 1
+                if s.session_reused:
+                    cls.tls_resumed += 1
+            cls.save_session(s, host, port)
+        return s
 
-            cls.sockets[key] = (s, time.time())
-        return cls.sockets[key][0]
+    @classmethod
+    def save_session(cls, sock, host, port):
+        """Method that keeps the TLS session of a socket for reconnects."""
+        # TLS 1.3 tickets arrive after the handshake, so this is called
+        # again when the socket comes back to the pool.
+        if isinstance(sock, ssl.SSLSocket) and sock.session is not None:
+            cls.sessions[(host, port)] = sock.session
 
     @staticmethod
-    def close_idle_sockets(idle_time=300):  # idle time in seconds
+    def is_alive(sock):
+        """Method that probes an idle socket before it is reused.
+
+        An idle keep-alive connection has nothing to read; if it is readable
+        the server either closed it or sent something we did not ask for,
+        and either way it cannot carry another request.
+        """
+        try:
+            if sock.fileno() < 0:
+                return False
+            readable, _, _ = select.select([sock], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+    @classmethod
+    def count(cls, key=None):
+        """Method that counts open sockets, idle or in use."""
+        if key is not None:
+            return len(cls.idle.get(key, ())) + cls.in_use.get(key, 0)
+        return sum(len(socks) for socks in cls.idle.values()) + sum(
+            cls.in_use.values()
+        )
+
+    @classmethod
+    def close_least_recent_idle(cls):
+        """Method that frees a slot by closing the oldest idle socket."""
+        oldest = None
+        for key, socks in cls.idle.items():
+            if socks and (oldest is None or socks[0][1] < cls.idle[oldest][0][1]):
+                oldest = key
+        if oldest is None:
+            return False
+        sock, _last_used = cls.idle[oldest].pop(0)
+        if not cls.idle[oldest]:
+            del cls.idle[oldest]
+        sock.close()
+        return True
+
+    @classmethod
+    def checkout(cls, scheme, host, port):
+        """Method that returns (socket, reused) for exclusive use.
+
+        Blocks while the origin or the whole pool is at its cap and no idle
+        socket can be closed to make room.
+        """
+        key = (scheme, host, port)
+        with cls.condition:
+            while True:
+                socks = cls.idle.get(key)
+                while socks:
+                    sock, _last_used = socks.pop()
+                    if not socks:
+                        del cls.idle[key]
+                    if cls.is_alive(sock):
+                        cls.in_use[key] = cls.in_use.get(key, 0) + 1
+                        cls.reused += 1
+                        return sock, True
+                    sock.close()
+                    cls.stale += 1
+                    socks = cls.idle.get(key)
+
+                if cls.count(key) < cls.max_per_host:
+                    if cls.count() < cls.max_total or cls.close_least_recent_idle():
+                        # Reserve the slot, connect outside the lock
+                        cls.in_use[key] = cls.in_use.get(key, 0) + 1
+                        break
+                cls.condition.wait()
+
+        try:
+            sock = cls.open_socket(scheme, host, port)
+        except BaseException:
+            cls.release(key)
+            raise
+        with cls.condition:
+            cls.opened += 1
+        return sock, False
+
+    @classmethod
+    def release(cls, key):
+        """Method that gives back the slot of a checked out socket."""
+        with cls.condition:
+            cls.in_use[key] -= 1
+            if not cls.in_use[key]:
+                del cls.in_use[key]
+            cls.condition.notify_all()
+
+    @classmethod
+    def checkin(cls, sock, scheme, host, port, reusable=True):
+        """Method that returns a checked out socket to the pool.
+
+        Sockets that cannot carry another request are closed instead.
+        """
+        key = (scheme, host, port)
+        cls.save_session(sock, host, port)
+        with cls.condition:
+            if reusable and sock.fileno() >= 0:
+                cls.idle.setdefault(key, []).append((sock, time.time()))
+            else:
+                sock.close()
+            cls.release(key)
+
+    @classmethod
+    def close_idle_sockets(cls, idle_time=300):  # idle time in seconds
         """Method that deletes idle sockets"""
         current_time = time.time()
-        for key, (sock, last_used) in list(Sockets.sockets.items()):
-            if current_time - last_used > idle_time:
-                sock.close()
-                del Sockets.sockets[key]
+        with cls.condition:
+            for key, socks in list(cls.idle.items()):
+                keep = []
+                for sock, last_used in socks:
+                    if current_time - last_used > idle_time:
+                        sock.close()
+                    else:
+                        keep.append((sock, last_used))
+                if keep:
+                    cls.idle[key] = keep
+                else:
+                    del cls.idle[key]
 
     @staticmethod
     def start_socket_cleaner(interval=300):  # interval in seconds
@@ -48,18 +295,223 @@ class Sockets:
 
     @classmethod
     def close_socket(cls, scheme, host, port):
-        """Method that closes a socket."""
+        """Method that closes the idle sockets of one origin."""
 
         key = (scheme, host, port)
-        if key in cls.sockets:
-            sock, _last_used = cls.sockets[key]
-            sock.close()
-            del cls.sockets[key]
+        with cls.condition:
+            for sock, _last_used in cls.idle.pop(key, []):
+                sock.close()
 
     @classmethod
     def close_all(cls):
-        """Method to close all open sockets"""
-        for key, (sock, _last_used) in list(cls.sockets.items()):
-            sock.close()
-            del cls.sockets[key]
-        cls.sockets = {}
+        """Method to close all idle sockets"""
+        with cls.condition:
+            for socks in cls.idle.values():
+                for sock, _last_used in socks:
+                    sock.close()
+            cls.idle = {}
+
+    @classmethod
+    def configure(cls, max_per_host=None, max_total=None, ssl_context=None):
+        """Method that changes the connection caps or the TLS context."""
+        with cls.condition:
+            if max_per_host is not None:
+                cls.max_per_host = max_per_host
+            if max_total is not None:
+                cls.max_total = max_total
+            if ssl_context is not None:
+                cls.ssl_context = ssl_context
+                cls.sessions = {}  # sessions belong to the old context
+            cls.condition.notify_all()
+
+    @classmethod
+    def stats(cls):
+        """Method that returns connection reuse statistics."""
+        with cls.condition:
+            checkouts = cls.opened + cls.reused
+            return {
+                "opened": cls.opened,
+                "reused": cls.reused,
+                "reuse_rate": cls.reused / checkouts if checkouts else 0.0,
+                "handshakes_saved": cls.reused - cls.retries,
+                "stale": cls.stale,
+                "retries": cls.retries,
+                "idle": sum(len(socks) for socks in cls.idle.values()),
+                "in_use": sum(cls.in_use.values()),
+                "dns_lookups": Resolver.lookups,
+                "dns_saved": Resolver.hits,
+                "tls_handshakes": cls.tls_handshakes,
+                "tls_resumed": cls.tls_resumed,
+            }
+
+
+class AsyncSockets:
+    """Connection pool of asyncio streams, the counterpart of Sockets.
+
+    asyncio objects belong to one event loop, so there is one pool per
+    running loop (see for_loop()). Connections are checked out as
+    (reader, writer) pairs and capped per origin and in total. Everything
+    runs on the loop's thread, so instead of a lock there is a FIFO of
+    waiting checkouts, and a released slot wakes only the first one that
+    can use it rather than every waiter.
+    """
+
+    pools = weakref.WeakKeyDictionary()
+
+    def __init__(self, max_per_host=32, max_total=512):
+        self.max_per_host = max_per_host
+        self.max_total = max_total
+        self.idle = {}  # key -> [(reader, writer, last_used)]
+        self.in_use = {}
+        self.waiters = collections.deque()  # (key, future)
+
+        self.opened = 0
+        self.reused = 0
+        self.stale = 0
+        self.retries = 0
+
+    @classmethod
+    def for_loop(cls):
+        """Method that returns the pool of the running event loop."""
+        loop = asyncio.get_running_loop()
+        pool = cls.pools.get(loop)
+        if pool is None:
+            pool = cls.pools[loop] = cls()
+        return pool
+
+    @staticmethod
+    def is_alive(reader, writer):
+        """Method that checks an idle connection before it is reused."""
+        return not writer.is_closing() and not reader.at_eof()
+
+    def count(self, key=None):
+        if key is not None:
+            return len(self.idle.get(key, ())) + self.in_use.get(key, 0)
+        return sum(len(conns) for conns in self.idle.values()) + sum(
+            self.in_use.values()
+        )
+
+    def close_least_recent_idle(self):
+        oldest = None
+        for key, conns in self.idle.items():
+            if conns and (oldest is None or conns[0][2] < self.idle[oldest][0][2]):
+                oldest = key
+        if oldest is None:
+            return False
+        _reader, writer, _last_used = self.idle[oldest].pop(0)
+        if not self.idle[oldest]:
+            del self.idle[oldest]
+        writer.close()
+        return True
+
+    async def checkout(self, scheme, host, port):
+        """Method that returns (reader, writer, reused) for exclusive use."""
+        key = (scheme, host, port)
+        while True:
+            conns = self.idle.get(key)
+            while conns:
+                reader, writer, _last_used = conns.pop()
+                if not conns:
+                    del self.idle[key]
+                if self.is_alive(reader, writer):
+                    self.in_use[key] = self.in_use.get(key, 0) + 1
+                    self.reused += 1
+                    return reader, writer, True
+                writer.close()
+                self.stale += 1
+                conns = self.idle.get(key)
+
+            if self.count(key) < self.max_per_host:
+                if self.count() < self.max_total or self.close_least_recent_idle():
+                    # Reserve the slot, connect without holding up the loop
+                    self.in_use[key] = self.in_use.get(key, 0) + 1
+                    break
+            await self.wait(key)
+
+        try:
+            reader, writer = await asyncio.wait_for(
+                self.connect(scheme, host, port), Sockets.connect_timeout
+            )
+        except BaseException:
+            self.release(key)
+            raise
+        self.opened += 1
+        return reader, writer, False
+
+    @staticmethod
+    async def connect(scheme, host, port):
+        """Method that opens streams to the first reachable address."""
+        addresses = await Resolver.resolve_async(host, port)
+        context = Sockets.get_ssl_context() if scheme == "https" else None
+        error = None
+        for family, _type, _proto, _name, address in addresses:
+            try:
+                return await asyncio.open_connection(
+                    address[0],
+                    address[1],
+                    family=family,
+                    ssl=context,
+                    server_hostname=host if context else None,
+                )
+            except OSError as e:
+                error = e
+        Resolver.forget(host, port)
+        raise error or OSError(f"No addresses for {host}")
+
+    async def wait(self, key):
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (key, waiter)
+        self.waiters.append(entry)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.wake()  # pass the slot on
+            else:
+                self.waiters.remove(entry)
+            raise
+
+    def wake(self):
+        """Method that wakes the first waiter that can get a connection."""
+        for entry in self.waiters:
+            key, waiter = entry
+            if self.idle.get(key) or self.count(key) < self.max_per_host:
+                self.waiters.remove(entry)
+                waiter.set_result(None)
+                return
+
+    def release(self, key):
+        self.in_use[key] -= 1
+        if not self.in_use[key]:
+            del self.in_use[key]
+        self.wake()
+
+    async def checkin(self, reader, writer, scheme, host, port, reusable=True):
+        """Method that returns a checked out connection to the pool."""
+        key = (scheme, host, port)
+        if reusable and not writer.is_closing():
+            self.idle.setdefault(key, []).append((reader, writer, time.time()))
+        else:
+            writer.close()
+        self.release(key)
+
+    def close_all(self):
+        """Method to close all idle connections"""
+        for conns in self.idle.values():
+            for _reader, writer, _last_used in conns:
+                writer.close()
+        self.idle = {}
+
+    def stats(self):
+        """Method that returns connection reuse statistics."""
+        checkouts = self.opened + self.reused
+        return {
+            "opened": self.opened,
+            "reused": self.reused,
+            "reuse_rate": self.reused / checkouts if checkouts else 0.0,
+            "handshakes_saved": self.reused - self.retries,
+            "stale": self.stale,
+            "retries": self.retries,
+            "idle": sum(len(conns) for conns in self.idle.values()),
+            "in_use": sum(self.in_use.values()),
+        }
@@ -0,0 +1,123 @@
+import heapq
+import threading
+
+from dom.element import Element
+from dom.traversal import walk
+from network.sockets import Sockets
+
+STYLESHEET = "stylesheet"
+SCRIPT = "script"
+IMAGE = "image"
+
+# Lower runs first: styles block rendering, images only fill in boxes.
+PRIORITIES = {STYLESHEET: 0, SCRIPT: 1, IMAGE: 2}
+
+
+def find_subresources(node, base_url):
+    """Return (kind, URL) for every stylesheet, script and image, in order."""
+    resources = []
+
+    def visit(node):
+        if not isinstance(node, Element):
+            return
+        attributes = node.attributes
+        kind = href = None
+        if node.tag == "link" and "stylesheet" in attributes.get(
+            "rel", ""
+        ).casefold().split():
+            kind, href = STYLESHEET, attributes.get("href")
+        elif node.tag == "script":
+            kind, href = SCRIPT, attributes.get("src")
+        elif node.tag == "img":
+            kind, href = IMAGE, attributes.get("src")
+
+        if href:
+            try:
+                resources.append((kind, base_url.resolve(href)))
+            except (AssertionError, ValueError) as e:
+                print(f"Skipping subresource {href!r}: {e}")
+
+    walk(node, visit)
+    return resources
+
+
+class SubresourceFetcher:
+    """Fetches the subresources of a page concurrently.
+
+    A fixed set of worker threads takes jobs in priority order (stylesheets,
+    then scripts, then images, each in document order), skipping over
+    origins that already have `max_per_origin` fetches in flight. Requests
+    go through URL, so they share the Sockets pool and the Cache.
+    """
+
+    def __init__(self, max_workers=8, max_per_origin=None):
+        self.max_workers = max_workers
+        self.max_per_origin = max_per_origin or Sockets.max_per_host
+
+    @staticmethod
+    def origin(url):
+        if url.scheme in ["http", "https"]:
+            return (url.scheme, url.host, url.port)
+        return None  # local resources are not limited
+
+    def fetch_all(self, resources):
+        """Fetch (kind, URL) pairs and return {url string: body or None}."""
+        queue = []
+        seen = set()
+        for order, (kind, url) in enumerate(resources):
+            if url.url not in seen:
+                seen.add(url.url)
+                queue.append((PRIORITIES[kind], order, url))
+        heapq.heapify(queue)
+
+        results = {}
+        active = {}
+        condition = threading.Condition()
+
+        def next_job():
+            with condition:
+                while queue:
+                    skipped = []
+                    job = None
+                    while queue:
+                        candidate = heapq.heappop(queue)
+                        origin = self.origin(candidate[2])
+                        running = active.get(origin, 0)
+                        if origin is None or running < self.max_per_origin:
+                            job = candidate
+                            break
+                        skipped.append(candidate)
+                    for candidate in skipped:
+                        heapq.heappush(queue, candidate)
+
+                    if job:
+                        origin = self.origin(job[2])
+                        if origin is not None:
+                            active[origin] = active.get(origin, 0) + 1
+                        return job[2]
+                    # Every origin left is at its cap; wait for a fetch to end
+                    condition.wait()
+                return None
+
+        def worker():
+            while True:
+                url = next_job()
+                if url is None:
+                    return
+                body = url.try_request()
+                with condition:
+                    results[url.url] = body
+                    origin = self.origin(url)
+                    if origin is not None:
+                        active[origin] -= 1
+                    condition.notify_all()
+
+        workers = [
+            threading.Thread(target=worker, daemon=True)
+            for _ in range(min(self.max_workers, len(queue)))
+        ]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return results
@@ -1,9 +1,11 @@
 import urllib.parse
 import base64
-import html
-import gzip
+import codecs
 from network.cache import Cache
-from network.sockets import Sockets
+from network.decoders import ContentDecoder, DecompressionError, accept_encoding
+from network.sockets import AsyncSockets, Sockets
+
+CHUNK_SIZE = 64 * 1024
 
 
 class URL:
@@ -11,6 +13,8 @@ class URL:
 
     def __init__(self, url="file://html/index.html"):  # default file path
         self.url = url
+        self.socket = None  # checked out of the pool while a response is read
+        self.response = None
 
         self.view_source = False
         if url.startswith("view-source:"):
@@ -44,202 +48,624 @@ class URL:
             # self.data = url  # Data embedded in URL
             self.data = urllib.parse.unquote(url)
 
-    def decode_html_entities(self, text):
-        """Decode HTML entities in the text."""
-        return html.unescape(text)
-
-    def read_chunked(self, response):
-        """Additional method to read chunked binary data"""
-        chunks = []
+    def iter_chunked(self, response):
+        """Yield the chunks of a chunked body as they arrive."""
         while True:
-            # Read and decode the size line
-            size_str = response.readline().decode("iso-8859-1").strip()
-            if not size_str:
-                break  # Exit if the size line is empty (should not happen, but just in case)
-
-            # Convert size from hex to int
-            chunk_size = int(size_str, 16)
+            chunk_size = self.parse_chunk_size(response.readline())
 
             # If chunk size is 0, this is the last chunk
             if chunk_size == 0:
+                # Skip the trailers up to the empty line ending the body
+                while response.readline() not in (b"\r\n", b"\n", b""):
+                    pass
                 break
 
             # Read the chunk data
-            chunk = response.read(chunk_size)
-            chunks.append(chunk)
+            yield response.read(chunk_size)
 
             # Read and discard the trailing "\r\n" after the chunk
             response.read(2)  # Read 2 bytes for "\r\n"
 
-        # Combine all chunks into a single byte sequence
-        return b"".join(chunks)
+    @staticmethod
+    def parse_chunk_size(line):
+        """Return the size announced by a chunk size line, 0 at the end."""
+        size_str = line.decode("iso-8859-1").strip()
+        if not size_str:
+            return 0  # Empty size line (should not happen, but just in case)
+
+        # Convert size from hex to int, ignoring chunk extensions
+        return int(size_str.split(";", 1)[0], 16)
+
+    def iter_body(self, response, response_headers, content_length):
+        """Yield the raw response body in pieces as they arrive."""
+        if response_headers.get("transfer-encoding") == "chunked":
+            yield from self.iter_chunked(response)
+        elif content_length is not None:
+            remaining = content_length
+            while remaining > 0:
+                chunk = response.read(min(remaining, CHUNK_SIZE))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        else:
+            while True:
+                chunk = response.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    def read_body(self, response, response_headers, content_length):
+        """Read the whole body, decompressed, copying it as little as possible.
+
+        An uncompressed body with a Content-Length is read straight into a
+        bytearray of that size; anything else is decompressed piece by piece
+        as it arrives and appended to a single growing bytearray. Corrupt
+        or oversized bodies raise DecompressionError.
+        """
+        decompressor = ContentDecoder.for_headers(response_headers)
+        chunked = response_headers.get("transfer-encoding") == "chunked"
+
+        if decompressor is None and content_length is not None and not chunked:
+            body = bytearray(content_length)
+            with memoryview(body) as view:
+                filled = 0
+                while filled < content_length:
+                    count = response.readinto(view[filled:])
+                    if not count:
+                        break
+                    filled += count
+            if filled < content_length:
+                del body[filled:]
+            return body
 
-    def request(self, redirect_limit=10):
-        """Main method for"""
-        if self.scheme in ["http", "https"]:
-            cached_response = Cache.get_cached_response(self.url)
-            if cached_response:
-                return self.process_cached_response(cached_response)
+        body = bytearray()
+        for chunk in self.iter_body(response, response_headers, content_length):
+            if decompressor:
+                chunk = decompressor.decompress(chunk)
+            body += chunk
+        if decompressor:
+            body += decompressor.flush()
+        return body
+
+    def build_request(self, extra_headers=None):
+        """Return the bytes of the GET request for this URL."""
+        request_headers = (
+            f"GET {self.path} HTTP/1.1\r\n"
+            f"Host: {self.host}\r\n"
+            "Connection: keep-alive\r\n"
+            f"Accept-Encoding: {accept_encoding()}\r\n"
+            "Accept: */*\r\n"
+            "User-Agent: mlwcz\r\n"
+        )
+        for header, value in (extra_headers or {}).items():
+            request_headers += f"{header}: {value}\r\n"
+        request_headers += "\r\n"
+        return request_headers.encode("utf8")
+
+    @staticmethod
+    def parse_status_line(raw_statusline):
+        """Return the status code of a raw status line."""
+        statusline = raw_statusline.decode(
+            "iso-8859-1"
+        )  # ISO-8859-1 is a safe bet for headers
+        _version, status, _explanation = statusline.split(" ", 2)
+        return int(status)
+
+    @staticmethod
+    def parse_header(line):
+        """Split a raw header line into its casefolded name and value."""
+        line = line.decode("iso-8859-1")
+        header, value = line.split(":", 1)
+        return header.casefold(), value.strip()
+
+    @staticmethod
+    def get_content_length(response_headers):
+        if "content-length" in response_headers:
+            return int(response_headers["content-length"])
+        return None
+
+    def send_request(self, extra_headers=None):
+        """Send the GET request and read the status line and headers.
+
+        The socket is checked out of the pool until finish_response(). A
+        reused keep-alive socket may have been closed by the server since
+        the probe; if it fails before any response arrives the request is
+        sent again on another connection.
+        """
+        request = self.build_request(extra_headers)
 
-            s = Sockets.get_socket(self.scheme, self.host, self.port)
+        while True:
+            s, reused = Sockets.checkout(self.scheme, self.host, self.port)
+            response = None
+            try:
+                s.sendall(request)
+                response = s.makefile("rb")  # Open in binary mode
+                raw_statusline = response.readline()
+                if not raw_statusline:
+                    raise ConnectionError("Connection closed without a response")
+                break
+            except OSError:
+                if response:
+                    response.close()
+                Sockets.checkin(s, self.scheme, self.host, self.port, reusable=False)
+                if not reused:
+                    raise
+                with Sockets.condition:
+                    Sockets.retries += 1
+
+        self.socket = s
+        self.response = response
 
-            request_headers = (
-                f"GET {self.path} HTTP/1.1\r\n"
-                f"Host: {self.host}\r\n"
-                "Connection: keep-alive\r\n"
-                "Accept-Encoding: gzip\r\n"
-                "Accept: */*\r\n"
-                "User-Agent: mlwcz\r\n\r\n"
-            )
+        try:
+            status_code = self.parse_status_line(raw_statusline)
+            response_headers, content_length = self.read_headers(response)
+        except BaseException:
+            self.abort_response()
+            raise
 
-            s.send(request_headers.encode("utf8"))
+        return response, status_code, response_headers, content_length
 
-            response = s.makefile("rb")  # Open in binary mode
-            raw_statusline = response.readline()
-            statusline = raw_statusline.decode(
-                "iso-8859-1"
-            )  # ISO-8859-1 is a safe bet for headers
-            _version, status, _explanation = statusline.split(" ", 2)
-            status_code = int(status)
+    def read_headers(self, response):
+        """Read the header lines after the status line."""
+        response_headers = {}
+        while True:
+            line = response.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            header, value = self.parse_header(line)
+            response_headers[header] = value
+        return response_headers, self.get_content_length(response_headers)
 
-            response_headers = {}
-            content_length = None
+    def redirect_url(self, response, response_headers, content_length, redirect_limit):
+        """Drain the redirect response and return the URL it points to."""
+        # Leave the keep-alive socket clean for the next request
+        try:
+            for _chunk in self.iter_body(response, response_headers, content_length):
+                pass
+        except BaseException:
+            self.abort_response()
+            raise
+        self.finish_response(response_headers)
+        return self.redirect_target(response_headers, redirect_limit)
+
+    def redirect_target(self, response_headers, redirect_limit):
+        """Return the URL a redirect response points to."""
+        if redirect_limit <= 0:
+            raise Exception("Too many redirects")
+
+        location = response_headers.get("location")
+        if not location:
+            raise Exception("Redirect location not provided")
+
+        # Handle relative redirect
+        if location.startswith("/"):
+            location = f"{self.scheme}://{self.host}:{self.port}{location}"
+
+        return URL(location)
+
+    @staticmethod
+    def get_encoding(response_headers):
+        """Return the content type and the charset of the response."""
+        content_type = response_headers.get("content-type", "")
+        encoding = "utf8"  # Default encoding
+        if "charset=" in content_type:
+            encoding = content_type.split("charset=")[-1].split(";")[0]
+        return content_type, encoding
+
+    @classmethod
+    def decode_entry(cls, entry):
+        """Decode the body of a cache entry like a fresh response."""
+        if entry["text"] is not None:
+            return entry["text"]
+
+        content_type = entry["headers"].get("content-type", "")
+        body = cls.decode_body(entry["body"], content_type, entry["encoding"])
+        if isinstance(body, str):
+            Cache.remember_text(entry, body)
+        return body
+
+    @staticmethod
+    def decode_body(raw_body, content_type, encoding):
+        """Decode the body if it's text, otherwise return the bytes."""
+        try:
+            if "text" in content_type or "json" in content_type:
+                return str(raw_body, encoding)
+            # Handle as binary data, as immutable bytes (bodies are read into
+            # a bytearray or mapped from the disk cache); bytes pass as they are
+            return bytes(raw_body)
+        except UnicodeDecodeError:
+            print(f"Failed to decode response with encoding: {encoding}")
+            return None
 
-            while True:
-                line = response.readline()
-                if line in (b"\r\n", b"\n", b""):
-                    break
-                line = line.decode("iso-8859-1")
-                header, value = line.split(":", 1)
-                response_headers[header.casefold()] = value.strip()
-                if header.casefold() == "content-length":
-                    content_length = int(value.strip())
+    @staticmethod
+    def is_reusable(response_headers, has_body=True):
+        """Whether the connection can carry another request afterwards."""
+        return response_headers.get("connection") != "close" and (
+            not has_body
+            or "content-length" in response_headers
+            or response_headers.get("transfer-encoding") == "chunked"
+        )
+
+    def finish_response(self, response_headers, has_body=True):
+        """Check the socket back into the pool once the response is read.
+
+        It is closed instead if the server does not keep it alive or the
+        body was delimited by the end of the connection.
+        """
+        reusable = self.is_reusable(response_headers, has_body)
+        self.response.close()
+        Sockets.checkin(self.socket, self.scheme, self.host, self.port, reusable)
+        self.socket = self.response = None
+
+    def abort_response(self):
+        """Close the socket of a response that could not be read to the end."""
+        if self.socket:
+            self.response.close()
+            Sockets.checkin(self.socket, self.scheme, self.host, self.port, False)
+            self.socket = self.response = None
+
+    def open_response(self):
+        """Answer from the cache if possible, otherwise send the request.
+
+        Returns (cached_entry, response, status_code, response_headers,
+        content_length). A stored entry is used when it is fresh, when the
+        server confirms it with a 304, or when the server cannot be reached
+        and the entry allows being served stale; the rest is then None.
+        """
+        cached_response = Cache.get_cached_response(self.url)
+        if cached_response:
+            return cached_response, None, None, None, None
+
+        stale = Cache.get_stale_entry(self.url)
+        try:
+            response, status_code, response_headers, content_length = (
+                self.send_request(Cache.conditional_headers(stale) if stale else None)
+            )
+        except OSError:
+            if stale and Cache.can_serve_stale(stale):
+                return stale, None, None, None, None
+            raise
+
+        if status_code == 304 and stale:
+            # Not modified: no body follows, reuse the stored one
+            self.finish_response(response_headers, has_body=False)
+            entry = Cache.revalidated(stale, response_headers)
+            return entry, None, None, None, None
+
+        return None, response, status_code, response_headers, content_length
+
+    def resolve(self, href):
+        """Return the URL that `href` points to, relative to this one."""
+        base = self.url
+        if base.startswith("view-source:"):
+            base = base[len("view-source:") :]
+        return URL(urllib.parse.urljoin(base, href))
+
+    def fetch(self, redirect_limit=10):
+        """Fetch an http(s) resource without decoding HTML entities.
+
+        Returns the text for textual content types, bytes otherwise, or
+        None if the body could not be decoded.
+        """
+        (
+            cached_response,
+            response,
+            status_code,
+            response_headers,
+            content_length,
+        ) = self.open_response()
+        if cached_response:
+            return self.decode_entry(cached_response)
+
+        # Check if it's a redirect
+        if 300 <= status_code < 400:
+            url = self.redirect_url(
+                response, response_headers, content_length, redirect_limit
+            )
+            return url.fetch(redirect_limit - 1)
 
-            # Check if it's a redirect
-            if 300 <= status_code < 400:
-                location = response_headers.get("location")
-                if not location:
-                    raise Exception("Redirect location not provided")
-
-                # Handle relative redirect
-                if location.startswith("/"):
-                    location = f"{self.scheme}://{self.host}:{self.port}{location}"
-
-                # Follow the redirect
-                return URL(location).request(redirect_limit - 1)
-
-            # Determine correct encoding
-            gzip_compressed = response_headers.get("content-encoding") == "gzip"
-            content_type = response_headers.get("content-type", "")
-            encoding = "utf8"  # Default encoding
-            if "charset=" in content_type:
-                encoding = content_type.split("charset=")[-1].split(";")[0]
-            elif "text" in content_type or "json" in content_type:
-                encoding = "utf8"
-
-            # Read the response body
-            raw_body = b""
-            if (
-                "transfer-encoding" in response_headers
-                and response_headers["transfer-encoding"] == "chunked"
-            ):
-                raw_body = self.read_chunked(response)
-            elif content_length is not None:
-                raw_body = response.read(content_length)
+        # Read the response body
+        try:
+            raw_body = self.read_body(response, response_headers, content_length)
+        except DecompressionError as e:
+            self.abort_response()
+            print(f"Error decompressing response body: {e}")
+            return None
+        except BaseException:
+            self.abort_response()
+            raise
+        self.finish_response(response_headers)
+
+        return self.finish_body(raw_body, status_code, response_headers)
+
+    def finish_body(self, raw_body, status_code, response_headers):
+        """Decode and cache a decompressed body that has been read in full.
+
+        The decoded text is cached next to the raw bytes so that cache hits
+        return it without decoding again.
+        """
+        content_type, encoding = self.get_encoding(response_headers)
+        body = self.decode_body(raw_body, content_type, encoding)
+        if body is None:
+            return None
+
+        if Cache.is_storable(response_headers, status_code):
+            if isinstance(body, str):
+                Cache.store_in_cache(
+                    self.url, raw_body, response_headers, encoding, body
+                )
             else:
-                raw_body = response.read()
+                # Cache the bytes handed to the caller, not the read buffer
+                Cache.store_in_cache(self.url, body, response_headers, encoding)
 
-            if gzip_compressed:
-                # Decompress gzip data
-                try:
-                    raw_body = gzip.decompress(raw_body)
-                except Exception as e:
-                    print(f"Error decompressing gzip data: {e}")
-                    return None
+        return body
 
-            # Decode or process the response body
-            try:
-                # Decode the body if it's text
-                if "text" in content_type or "json" in content_type:
-                    body = raw_body.decode(encoding)
-                else:
-                    body = raw_body  # Handle as binary data
-            except UnicodeDecodeError:
-                print(f"Failed to decode response with encoding: {encoding}")
-                return None
-
-            # Check for cache
-            cache_control = response_headers.get("cache-control", "")
-            # Process the response for caching
-            if "no-store" not in cache_control:
-                max_age = Cache.get_max_age(cache_control)
-                cache_entry = {
-                    "body": raw_body,
-                    "headers": response_headers,
-                    "url": self.url,
-                    "encoding": encoding,
-                }
-                Cache.store_in_cache(cache_entry, max_age, self.url)
-
-            if (
-                "connection" in response_headers
-                and response_headers["connection"] == "close"
-            ) or status_code == 304:
-                Sockets.close_socket(self.scheme, self.host, self.port)
-
-            if self.view_source:
-                # Return raw HTML for view-source
-                return body
-
-            # Decode HTML entities for normal viewing
-            return self.decode_html_entities(body)
+    def request(self, redirect_limit=10):
+        """Main method for fetching the resource as a whole.
+
+        The document is returned as received: entities are decoded by the
+        parser, once, where they are text and not markup.
+        """
+        if self.scheme in ["http", "https"]:
+            return self.fetch(redirect_limit)
 
         if self.scheme == "file":
             with open(self.path, "r", encoding="utf-8") as file:
-                content = file.read()
-
-            if self.view_source:
-                return content
-
-            return self.decode_html_entities(content)
+                return file.read()
 
         if self.scheme == "data":
             mime_type, data_string = self.data.split(",", 1)
 
-            if self.view_source:
-                if ";base64" in mime_type:
-                    return base64.b64decode(data_string).decode("utf8")
-
-                return data_string
-
             if ";base64" in mime_type:
                 return base64.b64decode(data_string).decode("utf8")
 
-            return self.decode_html_entities(data_string)
+            return data_string
 
-    def process_cached_response(self, cached_response):
-        """Process a cached response."""
+    def try_request(self):
+        """request(), printing the error and returning None if it fails.
 
-        # Extract cached data from the response
-        raw_body = cached_response["body"]
-        response_headers = cached_response["headers"]
-        content_type = response_headers.get("content-type", "")
-        encoding = cached_response["encoding"]
+        Used wherever many resources are fetched at once, so one broken
+        resource does not stop the rest.
+        """
+        try:
+            return self.request()
+        except Exception as e:
+            print(f"Error fetching {self.url}: {e}")
+            return None
+
+    async def send_request_async(self, pool, extra_headers=None):
+        """send_request() over a connection of an AsyncSockets pool.
+
+        Returns (reader, writer, status_code, response_headers,
+        content_length); the connection stays checked out until the body
+        has been read.
+        """
+        request = self.build_request(extra_headers)
+
+        while True:
+            reader, writer, reused = await pool.checkout(
+                self.scheme, self.host, self.port
+            )
+            try:
+                writer.write(request)
+                await writer.drain()
+                raw_statusline = await reader.readline()
+                if not raw_statusline:
+                    raise ConnectionError("Connection closed without a response")
+                break
+            except OSError:
+                await pool.checkin(
+                    reader, writer, self.scheme, self.host, self.port, False
+                )
+                if not reused:
+                    raise
+                pool.retries += 1
 
-        # Decode or process the response body
         try:
-            # Decode the body if it's text
-            if "text" in content_type or "json" in content_type:
-                body = raw_body.decode(encoding)
-            else:
-                body = raw_body  # Handle as binary data
-        except UnicodeDecodeError:
-            print(f"Failed to decode response with encoding: {encoding}")
+            status_code = self.parse_status_line(raw_statusline)
+
+            response_headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                header, value = self.parse_header(line)
+                response_headers[header] = value
+            content_length = self.get_content_length(response_headers)
+        except BaseException:
+            await pool.checkin(reader, writer, self.scheme, self.host, self.port, False)
+            raise
+
+        return reader, writer, status_code, response_headers, content_length
+
+    async def aiter_body(self, reader, response_headers, content_length):
+        """iter_body() for an asyncio stream."""
+        if response_headers.get("transfer-encoding") == "chunked":
+            while True:
+                chunk_size = self.parse_chunk_size(await reader.readline())
+                if chunk_size == 0:
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                yield await reader.readexactly(chunk_size)
+                await reader.readexactly(2)  # Trailing "\r\n"
+        elif content_length is not None:
+            remaining = content_length
+            while remaining > 0:
+                chunk = await reader.read(min(remaining, CHUNK_SIZE))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        else:
+            while True:
+                chunk = await reader.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    async def read_body_async(self, reader, response_headers, content_length):
+        """read_body() for an asyncio stream."""
+        decompressor = ContentDecoder.for_headers(response_headers)
+        chunked = response_headers.get("transfer-encoding") == "chunked"
+
+        if decompressor is None and content_length is not None and not chunked:
+            return await reader.readexactly(content_length)
+
+        body = bytearray()
+        async for chunk in self.aiter_body(reader, response_headers, content_length):
+            if decompressor:
+                chunk = decompressor.decompress(chunk)
+            body += chunk
+        if decompressor:
+            body += decompressor.flush()
+        return body
+
+    async def fetch_async(self, redirect_limit=10, pool=None):
+        """Coroutine version of fetch() built on asyncio streams.
+
+        Shares the Cache with the blocking API. Connections come from
+        `pool`, by default the AsyncSockets pool of the running loop.
+        """
+        pool = pool or AsyncSockets.for_loop()
+
+        cached_response = Cache.get_cached_response(self.url)
+        if cached_response:
+            return self.decode_entry(cached_response)
+
+        stale = Cache.get_stale_entry(self.url)
+        try:
+            reader, writer, status_code, response_headers, content_length = (
+                await self.send_request_async(
+                    pool, Cache.conditional_headers(stale) if stale else None
+                )
+            )
+        except OSError:
+            if stale and Cache.can_serve_stale(stale):
+                return self.decode_entry(stale)
+            raise
+
+        has_body = not (status_code == 304 and stale)
+        try:
+            raw_body = b""
+            if has_body:
+                raw_body = await self.read_body_async(
+                    reader, response_headers, content_length
+                )
+        except DecompressionError as e:
+            await pool.checkin(reader, writer, self.scheme, self.host, self.port, False)
+            print(f"Error decompressing response body: {e}")
             return None
+        except BaseException:
+            await pool.checkin(reader, writer, self.scheme, self.host, self.port, False)
+            raise
+        reusable = self.is_reusable(response_headers, has_body)
+        await pool.checkin(reader, writer, self.scheme, self.host, self.port, reusable)
 
+        if not has_body:
+            # Not modified: reuse the stored body
+            return self.decode_entry(Cache.revalidated(stale, response_headers))
+
+        if 300 <= status_code < 400:
+            url = self.redirect_target(response_headers, redirect_limit)
+            return await url.fetch_async(redirect_limit - 1, pool)
+
+        return self.finish_body(raw_body, status_code, response_headers)
+
+    async def request_async(self, redirect_limit=10, pool=None):
+        """Coroutine version of request() for many concurrent fetches."""
+        if self.scheme not in ["http", "https"]:
+            return self.request(redirect_limit)
+
+        return await self.fetch_async(redirect_limit, pool)
+
+    def stream(self, parser, redirect_limit=10):
+        """Feed the document into `parser` while it is being read.
+
+        Unlike request(), the body is never held in memory as a whole: each
+        piece is decompressed, decoded and parsed as soon as it arrives, and
+        entities are left for the parser to decode. Returns parser.close().
+        """
         if self.view_source:
-            # Return raw HTML for view-source
-            return body
+            parser.feed(self.request(redirect_limit))
+            return parser.close()
+
+        if self.scheme in ["http", "https"]:
+            (
+                cached_response,
+                response,
+                status_code,
+                response_headers,
+                content_length,
+            ) = self.open_response()
+            if cached_response:
+                text = cached_response["text"]
+                if text is None:
+                    encoding = cached_response["encoding"]
+                    text = str(cached_response["body"], encoding, "replace")
+                parser.feed(text)
+                return parser.close()
+
+            if 300 <= status_code < 400:
+                url = self.redirect_url(
+                    response, response_headers, content_length, redirect_limit
+                )
+                return url.stream(parser, redirect_limit - 1)
+
+            # Until the body is read, any error must give the socket back
+            try:
+                _content_type, encoding = self.get_encoding(response_headers)
+                decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+
+                decompressor = ContentDecoder.for_headers(response_headers)
+
+                # Keep the pieces only if the whole body ends up in the cache
+                if Cache.is_storable(response_headers, status_code):
+                    cache_chunks = []
+                else:
+                    cache_chunks = None
+
+                for chunk in self.iter_body(
+                    response, response_headers, content_length
+                ):
+                    if decompressor:
+                        chunk = decompressor.decompress(chunk)
+                    if cache_chunks is not None:
+                        cache_chunks.append(chunk)
+                    parser.feed(decoder.decode(chunk))
+            except BaseException:
+                self.abort_response()
+                raise
+            self.finish_response(response_headers)
+
+            if decompressor:
+                chunk = decompressor.flush()
+                if cache_chunks is not None:
+                    cache_chunks.append(chunk)
+                parser.feed(decoder.decode(chunk))
+            parser.feed(decoder.decode(b"", final=True))
+
+            if cache_chunks is not None:
+                raw_body = b"".join(cache_chunks)
+                Cache.store_in_cache(self.url, raw_body, response_headers, encoding)
+
+            return parser.close()
+
+        if self.scheme == "file":
+            with open(self.path, "r", encoding="utf-8") as file:
+                while True:
+                    content = file.read(CHUNK_SIZE)
+                    if not content:
+                        break
+                    parser.feed(content)
+            return parser.close()
+
+        if self.scheme == "data":
+            mime_type, data_string = self.data.split(",", 1)
+
+            if ";base64" in mime_type:
+                data_string = base64.b64decode(data_string).decode("utf8")
 
-        # Decode HTML entities for normal viewing
-        return self.decode_html_entities(body)
+            parser.feed(data_string)
+            return parser.close()
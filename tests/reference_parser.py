@@ -0,0 +1,294 @@
+"""Reference parser and documents for the HTMLParser tests.
+
+OldHTMLParser is the character-by-character parser the tokenizer-based
+HTMLParser replaced; the parity tests and the parser benchmark both
+compare against it. make_document() builds synthetic pages for them.
+"""
+
+import html.entities
+
+from dom.constants import HEAD_TAGS, SELF_CLOSING_TAGS
+from dom.element import Element
+from dom.text import Text
+
+# The named entities the old parser replaced: the Latin-1 ones
+OLD_ENTITIES = {"&quot;": '"', "&apos;": "'", "&amp;": "&", "&lt;": "<", "&gt;": ">"}
+OLD_ENTITIES.update(
+    (f"&{name};", chr(code))
+    for name, code in html.entities.name2codepoint.items()
+    if 0xA0 <= code <= 0xFF
+)
+
+PARAGRAPH = (
+    "<p class='lead' id=\"p{0}\">Some <b>bold</b> and <i>italic</i> text, "
+    "with an entity &amp; a <a href=\"/page/{0}?a=1&amp;b=2\">link</a>.</p>\n"
+    "<!-- comment {0} -->\n"
+    "<div><ul><li>one<li>two</ul><img src='img{0}.png'><br></div>\n"
+)
+SCRIPT = "<script>var s = '<b>not a tag</b>'; if (a < b) {{ f({0}); }}</script>\n"
+
+
+class OldHTMLParser:
+    """The character-by-character HTMLParser the tokenizer replaced."""
+
+    def __init__(self, body):
+        self.body = body
+        self.unfinished = []
+
+        self.tag_stack = []
+        self.in_pre = False
+        self.in_code = False
+
+    def parse(self):
+        text = ""
+        in_tag = False
+        in_comment = False
+        in_script = False
+        in_quote = False
+        quote_char = None
+
+        for i in range(len(self.body)):
+            c = self.body[i]
+
+            if in_quote:
+                if c == quote_char:
+                    in_quote = False
+                text += c
+                continue
+
+            if c == "<" and not in_script and not in_tag:
+                if self.body[i : i + 7].lower() == "<script":
+                    in_script = True
+                    self.add_tag("script")
+                    continue
+
+            if in_script:
+                if c == "<" and self.body[i : i + 9].lower() == "</script>":
+                    in_script = False
+                    self.add_tag("/script")
+                    i += 8
+                    continue
+                else:
+                    text += c
+                    continue
+
+            if c == "<" and not in_comment:
+                next_chars = self.body[i : i + 4]
+                if next_chars == "<!--":
+                    in_comment = True
+                    i += 3
+                    continue
+
+            if in_comment:
+                next_chars = self.body[i : i + 3]
+                if next_chars == "-->":
+                    in_comment = False
+                    i += 2
+                    continue
+                continue
+
+            if in_tag:
+                if c == ">" and not in_quote:
+                    in_tag = False
+                    self.add_tag(text)
+                    text = ""
+                elif c in ['"', "'"]:
+                    in_quote = True
+                    quote_char = c
+                    text += c
+                else:
+                    text += c
+                continue
+
+            if c == "<":
+                in_tag = True
+                if text:
+                    self.add_text(text)
+                text = ""
+            else:
+                text += c
+
+        if not in_tag and text:
+            self.add_text(text)
+
+        return self.finish()
+
+    def get_attributes(self, text):
+        parts = text.split()
+
+        if not parts:
+            return "", {}
+
+        tag = parts[0].casefold()
+        attributes = {}
+
+        for attrpair in parts[1:]:
+            if "=" in attrpair:
+                key, value = attrpair.split("=", 1)
+
+                if len(value) > 2 and value[0] in ["'", '"']:
+                    value = value[1:-1]
+
+                attributes[key.casefold()] = value
+
+            else:
+                attributes[attrpair.casefold()] = ""
+
+        return tag, attributes
+
+    def add_text(self, text):
+        if self.in_pre or self.in_code:
+            self.append_text(text)
+
+        else:
+            text = self.decode_html_entities(text)
+
+            if text.isspace():
+                return
+
+            self.append_text(text)
+
+    @staticmethod
+    def decode_html_entities(text):
+        for entity, char in OLD_ENTITIES.items():
+            text = text.replace(entity, char)
+        return text
+
+    def append_text(self, text):
+        try:
+            self.implicit_tags(None)
+            if self.unfinished:
+                parent = self.unfinished[-1]
+                node = Text(text, parent)
+                parent.children.append(node)
+            else:
+                print("No unfinished tags to add text to.")
+        except Exception as e:
+            print("Error in HTMLParser append_text method: ", e)
+
+    def add_tag(self, tag):
+        tag, attributes = self.get_attributes(tag)
+
+        if tag.startswith("!"):
+            return
+
+        if not tag.startswith("/"):
+            self.tag_stack.append(tag)
+        else:
+            if self.tag_stack and self.tag_stack[-1] == tag[1:]:
+                self.tag_stack.pop()
+
+        self.in_pre = "pre" in self.tag_stack
+        self.in_code = "code" in self.tag_stack
+
+        self.implicit_tags(tag)
+
+        if tag in ["p", "li"]:
+            self.close_open_tags(tag)
+
+        elif tag.startswith("/"):
+            self.close_tag(tag)
+
+        elif tag in SELF_CLOSING_TAGS:
+            if self.unfinished:
+                parent = self.unfinished[-1]
+                node = Element(tag, attributes, parent)
+                parent.children.append(node)
+            else:
+                pass
+
+        else:
+            if self.unfinished:
+                parent = self.unfinished[-1]
+            else:
+                parent = None
+            node = Element(tag, attributes, parent)
+            self.unfinished.append(node)
+
+    def close_open_tags(self, new_tag):
+        last_tag = self.unfinished[-1].tag
+        while self.unfinished and last_tag in ["p", "li"]:
+            if last_tag != new_tag or new_tag == "li":
+                break
+            self.close_tag(last_tag)
+
+    def close_tag(self, tag):
+        if len(self.unfinished) == 1:
+            return
+
+        expected_tag = tag[1:]
+
+        if not self.unfinished or self.unfinished[-1].tag != expected_tag:
+            self.handle_misnested_tags(expected_tag)
+
+        else:
+            node = self.unfinished.pop()
+            if self.unfinished:
+                parent = self.unfinished[-1]
+                parent.children.append(node)
+
+    def handle_misnested_tags(self, expected_tag):
+        if not self.unfinished:
+            return
+
+        for i in range(len(self.unfinished) - 1, -1, -1):
+            if self.unfinished[i].tag == expected_tag:
+                while len(self.unfinished) > i + 1:
+                    node = self.unfinished.pop()
+                    if self.unfinished:
+                        parent = self.unfinished[-1]
+                        parent.children.append(node)
+                return
+
+    def implicit_tags(self, tag):
+        try:
+            while True:
+                open_tags = [node.tag for node in self.unfinished]
+                if open_tags == [] and tag != "html":
+                    self.add_tag("html")
+                elif open_tags == ["html"] and tag not in ["head", "body", "/html"]:
+                    if tag in HEAD_TAGS:
+                        self.add_tag("head")
+                    else:
+                        self.add_tag("body")
+                elif open_tags == ["html", "head"] and tag not in ["/head"] + HEAD_TAGS:
+                    self.add_tag("/head")
+                else:
+                    break
+        except Exception as e:
+            print("Error at HTMLParser implicit tags method ", e)
+
+    def finish(self):
+        if not self.unfinished:
+            self.implicit_tags(None)
+
+        try:
+            while len(self.unfinished) > 1:
+                node = self.unfinished.pop()
+                if self.unfinished:
+                    parent = self.unfinished[-1]
+                    parent.children.append(node)
+
+            if self.unfinished:
+                return self.unfinished.pop()
+            else:
+                return None
+
+        except Exception as e:
+            print("Error at HTMLParser finish method ", e)
+
+
+def make_document(size):
+    """Build a synthetic document of roughly `size` characters."""
+    parts = ["<!DOCTYPE html><html><head><title>bench</title></head><body>\n"]
+    length = len(parts[0])
+    i = 0
+    while length < size:
+        chunk = PARAGRAPH.format(i)
+        if i % 10 == 0:
+            chunk += SCRIPT.format(i)
+        parts.append(chunk)
+        length += len(chunk)
+        i += 1
+    parts.append("</body></html>\n")
+    return "".join(parts)
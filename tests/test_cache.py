@@ -0,0 +1,263 @@
+"""Tests for the HTTP cache: freshness, revalidation, eviction and the
+disk tier's log.
+
+Run from the repository root:
+
+    python -m unittest discover tests
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from network.cache import Cache
+from network.diskcache import DiskCache
+
+URL = "https://example.com/page"
+FRESH = {"cache-control": "max-age=60", "content-type": "text/html"}
+VALIDATED = {"cache-control": "max-age=0", "etag": '"v1"'}
+
+
+class CacheTestCase(unittest.TestCase):
+    """Runs each test on an empty cache with the default settings."""
+
+    def setUp(self):
+        self.saved = Cache.max_bytes, Cache.shared, Cache.disk
+        Cache.disk = None
+        Cache.clear()
+
+    def tearDown(self):
+        Cache.max_bytes, Cache.shared, Cache.disk = self.saved
+        Cache.clear()
+
+
+class FreshnessTest(CacheTestCase):
+    def test_lifetime(self):
+        date = "Wed, 21 Oct 2015 07:28:00 GMT"
+        cases = [
+            ({"cache-control": "max-age=60"}, 60),
+            ({"cache-control": "max-age=60", "age": "20"}, 40),
+            ({"cache-control": "max-age=10", "age": "20"}, 0),
+            ({"cache-control": "max-age=abc"}, 0),
+            ({"cache-control": "s-maxage=5, max-age=60"}, 60),
+            ({"expires": "Wed, 21 Oct 2015 07:38:00 GMT", "date": date}, 600),
+            ({"expires": "0"}, 0),
+            ({"content-type": "text/html"}, None),
+        ]
+        for headers, lifetime in cases:
+            with self.subTest(headers):
+                self.assertEqual(Cache.freshness_lifetime(headers), lifetime)
+
+    def test_shared_cache_uses_s_maxage(self):
+        Cache.shared = True
+        headers = {"cache-control": "s-maxage=5, max-age=60"}
+        self.assertEqual(Cache.freshness_lifetime(headers), 5)
+
+    def test_storable(self):
+        self.assertTrue(Cache.is_storable(FRESH))
+        self.assertTrue(Cache.is_storable({"etag": '"x"'}))
+        self.assertTrue(Cache.is_storable({"cache-control": "no-cache"}))
+        self.assertFalse(Cache.is_storable(FRESH, 404))
+        self.assertFalse(Cache.is_storable({"cache-control": "no-store"}))
+        self.assertFalse(Cache.is_storable({"content-type": "text/html"}))
+
+        private = {"cache-control": "private, max-age=60"}
+        self.assertTrue(Cache.is_storable(private))
+        Cache.shared = True
+        self.assertFalse(Cache.is_storable(private))
+
+
+class LookupTest(CacheTestCase):
+    def test_fresh_hit(self):
+        Cache.store_in_cache(URL, b"body", FRESH, "utf-8", "body")
+        entry = Cache.get_cached_response(URL)
+        self.assertEqual(entry["body"], b"body")
+        self.assertEqual(entry["text"], "body")
+        self.assertEqual(Cache.stats()["hits"], 1)
+
+    def test_stale_entry_is_kept_for_revalidation(self):
+        Cache.store_in_cache(URL, b"body", VALIDATED, "utf-8")
+        self.assertIsNone(Cache.get_cached_response(URL))
+        self.assertEqual(Cache.stats()["misses"], 1)
+
+        stale = Cache.get_stale_entry(URL)
+        self.assertEqual(Cache.conditional_headers(stale), {"If-None-Match": '"v1"'})
+
+    def test_no_cache_always_revalidates(self):
+        headers = {"cache-control": "no-cache, max-age=60", "last-modified": "x"}
+        Cache.store_in_cache(URL, b"body", headers, "utf-8")
+        self.assertIsNone(Cache.get_cached_response(URL))
+        stale = Cache.get_stale_entry(URL)
+        self.assertEqual(Cache.conditional_headers(stale), {"If-Modified-Since": "x"})
+        self.assertFalse(Cache.can_serve_stale(stale))
+
+    def test_least_recently_used_is_evicted(self):
+        Cache.configure(max_bytes=400)  # three entries of 125 bytes
+        for name in "abc":
+            Cache.store_in_cache(name, b"x" * 80, FRESH, "utf-8")
+        Cache.get_cached_response("a")  # now "b" is the oldest
+        Cache.store_in_cache("d", b"x" * 80, FRESH, "utf-8")
+
+        self.assertIsNotNone(Cache.get_stale_entry("a"))
+        self.assertIsNone(Cache.get_stale_entry("b"))
+        self.assertLessEqual(Cache.stats()["bytes"], 400)
+        self.assertEqual(Cache.stats()["evictions"], 1)
+
+    def test_remembered_text_counts_towards_the_budget(self):
+        Cache.store_in_cache(URL, b"body", FRESH, "utf-8")
+        size = Cache.stats()["bytes"]
+        Cache.remember_text(Cache.get_cached_response(URL), "body")
+        self.assertEqual(Cache.stats()["bytes"], size + 4)
+
+    def test_sweep_keeps_entries_with_validators(self):
+        Cache.store_in_cache("plain", b"x", {"cache-control": "max-age=0"}, "utf-8")
+        Cache.store_in_cache("validated", b"x", VALIDATED, "utf-8")
+        Cache.sweep()
+        self.assertIsNone(Cache.get_stale_entry("plain"))
+        self.assertIsNotNone(Cache.get_stale_entry("validated"))
+
+
+class RevalidationTest(CacheTestCase):
+    def test_304_refreshes_the_entry(self):
+        Cache.store_in_cache(URL, b"body", VALIDATED, "utf-8", "body")
+        stale = Cache.get_stale_entry(URL)
+
+        entry = Cache.revalidated(
+            stale, {"cache-control": "max-age=60", "content-length": "0"}
+        )
+        self.assertEqual(entry["body"], b"body")
+        self.assertEqual(entry["text"], "body")
+        self.assertEqual(entry["headers"]["etag"], '"v1"')
+        self.assertNotIn("content-length", entry["headers"])
+        self.assertIs(Cache.get_cached_response(URL), entry)
+        self.assertEqual(Cache.stats()["revalidations"], 1)
+
+    def test_304_after_eviction(self):
+        Cache.store_in_cache(URL, b"body", VALIDATED, "utf-8")
+        stale = Cache.get_stale_entry(URL)
+        Cache.clear()  # e.g. evicted while the request was in flight
+
+        entry = Cache.revalidated(stale, {"cache-control": "max-age=60"})
+        self.assertEqual(entry["body"], b"body")
+        self.assertIs(Cache.get_cached_response(URL), entry)
+
+
+class DiskCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def disk(self, max_bytes=1024 * 1024):
+        return DiskCache(self.path, max_bytes)
+
+    def store(self, disk, url, body):
+        disk.store(url, body, FRESH, "utf-8", time.time() + 60)
+
+    def test_round_trip(self):
+        disk = self.disk()
+        self.store(disk, URL, b"body")
+        body, headers, encoding, _expires = disk.get(URL)
+        self.assertEqual((body, headers, encoding), (b"body", FRESH, "utf-8"))
+        self.assertIsNone(disk.get("https://example.com/other"))
+
+    def test_large_body_is_mapped(self):
+        disk = self.disk()
+        body = os.urandom(128 * 1024)
+        self.store(disk, URL, body)
+        stored = disk.get(URL)[0]
+        self.assertIsInstance(stored, memoryview)
+        self.assertEqual(bytes(stored), body)
+
+    def test_other_instances_replay_the_log(self):
+        first, second = self.disk(), self.disk()
+        self.store(first, "a", b"one")
+        self.assertEqual(second.get("a")[0], b"one")
+
+        self.store(second, "b", b"two")
+        second.remove("a")
+        self.assertIsNone(first.get("a"))
+        self.assertEqual(first.get("b")[0], b"two")
+        self.assertEqual(list(first.index), list(second.index))
+
+    def test_eviction_keeps_the_budget(self):
+        disk = self.disk(max_bytes=1000)
+        for i in range(10):
+            self.store(disk, f"u{i}", bytes([i]) * 300)
+        self.assertEqual(list(disk.index), ["u7", "u8", "u9"])
+        self.assertLessEqual(disk.total, 1000)
+        bodies = [
+            name for _root, _dirs, names in os.walk(self.path) for name in names
+        ]
+        self.assertEqual(len([name for name in bodies if len(name) == 64]), 3)
+
+    def test_shared_body_stays_until_its_last_url_goes(self):
+        disk = self.disk()
+        self.store(disk, "a", b"same")
+        self.store(disk, "b", b"same")
+        self.assertEqual(disk.total, 4)
+        disk.remove("a")
+        self.assertEqual(disk.get("b")[0], b"same")
+        disk.remove("b")
+        self.assertEqual(disk.total, 0)
+
+    def test_torn_line_is_skipped(self):
+        disk = self.disk()
+        self.store(disk, "a", b"one")
+        with open(disk.index_path, "ab") as file:
+            file.write(b'["torn",')  # a writer died in the middle of a line
+        other = self.disk()
+        self.assertEqual(other.get("a")[0], b"one")
+        self.store(other, "b", b"two")
+        self.assertEqual(self.disk().get("b")[0], b"two")
+
+    def test_compaction_keeps_live_records(self):
+        disk = self.disk()
+        for i in range(1500):
+            self.store(disk, f"u{i % 10}", b"%d" % i)
+        with open(disk.index_path, "rb") as file:
+            lines = [json.loads(line) for line in file]
+        self.assertLess(len(lines), 1500)
+        fresh = self.disk()
+        for i in range(10):
+            self.assertEqual(fresh.get(f"u{i}")[0], b"%d" % (1490 + i))
+
+    def test_concurrent_stores(self):
+        disks = [self.disk() for _ in range(4)]
+
+        def fill(disk, worker):
+            for i in range(50):
+                self.store(disk, f"w{worker}-{i}", b"%d-%d" % (worker, i))
+
+        threads = [
+            threading.Thread(target=fill, args=(disk, worker))
+            for worker, disk in enumerate(disks)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        fresh = self.disk()
+        self.assertEqual(len(fresh.load_index()), 200)
+        self.assertEqual(fresh.get("w3-49")[0], b"3-49")
+
+    def test_memory_tier_falls_back_to_disk(self):
+        saved = Cache.disk
+        Cache.disk = self.disk()
+        try:
+            Cache.clear()
+            Cache.store_in_cache(URL, b"body", FRESH, "utf-8")
+            Cache.clear()  # as in a new process
+            self.assertEqual(Cache.get_cached_response(URL)["body"], b"body")
+        finally:
+            Cache.disk = saved
+            Cache.clear()
+
+
+if __name__ == "__main__":
+    unittest.main()
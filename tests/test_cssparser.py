@@ -0,0 +1,137 @@
+"""Tests for the CSS parser, the rule index and the cascade.
+
+Run from the repository root:
+
+    python -m unittest discover tests
+"""
+
+import unittest
+
+from cssom.cssparser import CSSParser, StyleCache, build_rule_index, style
+from cssom.selectors import ImportantDeclarations
+from dom.htmlparser import HTMLParser
+
+
+def styled(body, sheet=""):
+    root = HTMLParser(body).parse()
+    style(root, build_rule_index([sheet]))
+    return root.children[0].children[0]
+
+
+class DeclarationTest(unittest.TestCase):
+    def test_values(self):
+        normal, important = CSSParser(
+            "Color: rgb(1, 2, 3); font-family: 'A B', serif;"
+            " margin: 0 auto !important; content: \"a;b}\""
+        ).declarations()
+        self.assertEqual(
+            normal,
+            {
+                "color": "rgb(1, 2, 3)",
+                "font-family": "'A B', serif",
+                "content": '"a;b}"',
+            },
+        )
+        self.assertEqual(important, {"margin": "0 auto"})
+
+    def test_bad_declarations_are_skipped(self):
+        cases = [
+            "color red; font-size: 12px",
+            "color: ; font-size: 12px",
+            "color: url(a;b) x(; font-size: 12px",
+            "color: 'unterminated; font-size: 12px",
+            ": red; font-size: 12px;;",
+        ]
+        for text in cases:
+            with self.subTest(text):
+                self.assertEqual(CSSParser(text).body().get("font-size"), "12px")
+
+    def test_body_stops_at_the_closing_brace(self):
+        parser = CSSParser("color: red } p { color: blue }")
+        self.assertEqual(parser.body(), {"color": "red"})
+        self.assertEqual(parser.s[parser.i], "}")
+
+    def test_important_overrides_in_body(self):
+        body = CSSParser("color: red !important; color: blue").body()
+        self.assertEqual(body, {"color": "red"})
+
+
+class ParseTest(unittest.TestCase):
+    def test_selector_lists_and_important(self):
+        rules = CSSParser("h1, .a { color: red; margin: 0 !important }").parse()
+        self.assertEqual(len(rules), 4)
+        normal = [body for _selector, body in rules[::2]]
+        self.assertIs(normal[0], normal[1])
+        self.assertEqual(normal[0], {"color": "red"})
+        self.assertIsInstance(rules[1][1], ImportantDeclarations)
+        self.assertEqual(rules[1][1], {"margin": "0"})
+
+    def test_skipped_rules(self):
+        sheet = """
+            @charset "utf-8";
+            /* p { color: red } */
+            @media print { p { color: red } }
+            p > a { color: red }
+            div { color: blue }
+            @import url(x.css);
+            span { }
+        """
+        rules = CSSParser(sheet).parse()
+        self.assertEqual([body for _selector, body in rules], [{"color": "blue"}])
+
+    def test_unterminated_sheet(self):
+        rules = CSSParser("p { color: red").parse()
+        self.assertEqual(len(rules), 1)
+        self.assertEqual(rules[0][1], {"color": "red"})
+
+
+class CascadeTest(unittest.TestCase):
+    def setUp(self):
+        StyleCache.clear()
+
+    def test_specificity_and_source_order(self):
+        sheet = """
+            #x { color: red }
+            em.a { color: green; font-size: 20px }
+            em { color: blue; font-size: 10px }
+            em { font-size: 12px }
+        """
+        em = styled("<em id=x class=a>text</em>", sheet)
+        self.assertEqual(em.style["color"], "red")
+        self.assertEqual(em.style["font-size"], "20px")
+
+    def test_style_attribute_and_important(self):
+        sheet = "em { color: red; font-size: 20px !important }"
+        em = styled('<em style="color: blue; font-size: 8px">x</em>', sheet)
+        self.assertEqual(em.style["color"], "blue")
+        self.assertEqual(em.style["font-size"], "20px")
+
+        em = styled('<em style="font-size: 8px !important">x</em>', sheet)
+        self.assertEqual(em.style["font-size"], "8px")
+
+    def test_inheritance(self):
+        sheet = "div { color: red; margin: 1px } .b { font-weight: bold }"
+        div = styled("<div><em class=b>x<span>y</span></em></div>", sheet)
+        em = div.children[0]
+        span = em.children[1]
+        self.assertEqual(dict(em.style), {"color": "red", "font-weight": "bold"})
+        self.assertEqual(dict(span.style), dict(em.style))
+        self.assertIs(em.children[0].style, em.style)
+
+    def test_default_values_are_not_stored(self):
+        em = styled("<em style='color: black; margin: 0'>x</em>")
+        self.assertEqual(dict(em.style), {"margin": "0"})
+
+    def test_equal_styles_are_shared(self):
+        div = styled("<div><em style='color: red'>a</em><em style='color: red'>b</em>")
+        first, second = div.children
+        self.assertIs(first.style, second.style)
+        with self.assertRaises(TypeError):
+            first.style["color"] = "blue"
+        stats = StyleCache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["parse_misses"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
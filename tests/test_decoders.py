@@ -0,0 +1,147 @@
+"""Tests for the Content-Encoding decoders.
+
+Run from the repository root:
+
+    python -m unittest discover tests
+"""
+
+import gzip
+import io
+import os
+import unittest
+import zlib
+
+from network.decoders import ContentDecoder, DecompressionError, brotli
+from network.url import URL
+
+PAYLOAD = os.urandom(3000) + b"text " * 2000
+
+
+def raw_deflate(data):
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def decode(encoding, data, size=7, max_size=None):
+    """Decode `data` fed in pieces of `size` bytes, flush included."""
+    if max_size is None:
+        decoder = ContentDecoder([encoding])
+    else:
+        decoder = ContentDecoder([encoding], max_size)
+    output = [decoder.decompress(data[i : i + size]) for i in range(0, len(data), size)]
+    output.append(decoder.flush())
+    return b"".join(output)
+
+
+COMPRESSED = {
+    "gzip": gzip.compress(PAYLOAD),
+    "deflate": zlib.compress(PAYLOAD),
+    "raw deflate": raw_deflate(PAYLOAD),
+}
+
+
+def encoding_of(name):
+    return "deflate" if name == "raw deflate" else name
+
+
+class DecodeTest(unittest.TestCase):
+    def test_whole_body(self):
+        for name, data in COMPRESSED.items():
+            for size in [1, 7, 4096, len(data)]:
+                with self.subTest(name, size=size):
+                    self.assertEqual(decode(encoding_of(name), data, size), PAYLOAD)
+
+    def test_empty_body(self):
+        for encoding in ["gzip", "deflate"]:
+            with self.subTest(encoding):
+                self.assertEqual(decode(encoding, b""), b"")
+
+    def test_gzip_members(self):
+        data = gzip.compress(b"a") + gzip.compress(b"b") + gzip.compress(PAYLOAD)
+        for size in [1, 7, len(data)]:
+            with self.subTest(size=size):
+                self.assertEqual(decode("gzip", data, size), b"ab" + PAYLOAD)
+
+    def test_stacked_encodings(self):
+        decoder = ContentDecoder(["deflate", "gzip"])
+        data = gzip.compress(zlib.compress(PAYLOAD))
+        self.assertEqual(decoder.decompress(data) + decoder.flush(), PAYLOAD)
+
+    def test_unsupported_encoding(self):
+        with self.assertRaises(DecompressionError):
+            ContentDecoder(["compress"])
+
+
+class TruncatedTest(unittest.TestCase):
+    def test_truncated_streams(self):
+        for name, data in COMPRESSED.items():
+            for end in [1, 10, len(data) // 2, len(data) - 1]:
+                with self.subTest(name, end=end):
+                    with self.assertRaises(DecompressionError):
+                        decode(encoding_of(name), data[:end])
+
+    def test_truncated_second_member(self):
+        data = gzip.compress(b"a") + gzip.compress(PAYLOAD)[:500]
+        with self.assertRaises(DecompressionError):
+            decode("gzip", data)
+
+    def test_corrupt_stream(self):
+        data = bytearray(COMPRESSED["gzip"])
+        data[20:40] = bytes(20)
+        with self.assertRaises(DecompressionError):
+            decode("gzip", bytes(data))
+
+    def test_read_body_raises(self):
+        data = COMPRESSED["gzip"][:500]
+        headers = {"content-encoding": "gzip", "content-length": str(len(data))}
+        with self.assertRaises(DecompressionError):
+            URL("http://example.com/").read_body(io.BytesIO(data), headers, len(data))
+
+
+class SizeCapTest(unittest.TestCase):
+    def test_at_the_cap(self):
+        for name, data in COMPRESSED.items():
+            with self.subTest(name):
+                self.assertEqual(
+                    decode(encoding_of(name), data, 4096, len(PAYLOAD)), PAYLOAD
+                )
+
+    def test_over_the_cap(self):
+        for name, data in COMPRESSED.items():
+            with self.subTest(name):
+                with self.assertRaises(DecompressionError):
+                    decode(encoding_of(name), data, 4096, len(PAYLOAD) - 1)
+
+    def test_members_count_towards_the_cap(self):
+        data = gzip.compress(b"a" * 100) * 3
+        self.assertEqual(len(decode("gzip", data, max_size=300)), 300)
+        with self.assertRaises(DecompressionError):
+            decode("gzip", data, max_size=299)
+
+    def test_bomb_stops_early(self):
+        decoder = ContentDecoder(["gzip"], 1024 * 1024)
+        bomb = gzip.compress(bytes(64 * 1024 * 1024))
+        with self.assertRaises(DecompressionError):
+            decoder.decompress(bomb)
+        self.assertLessEqual(decoder.stages[0][1], 1024 * 1024 + 1)
+
+
+@unittest.skipIf(brotli is None, "brotli is not installed")
+class BrotliTest(unittest.TestCase):
+    def test_whole_body(self):
+        data = brotli.compress(PAYLOAD)
+        self.assertEqual(decode("br", data, 4096), PAYLOAD)
+
+    def test_truncated(self):
+        data = brotli.compress(PAYLOAD)
+        with self.assertRaises(DecompressionError):
+            decode("br", data[: len(data) // 2])
+
+    def test_over_the_cap(self):
+        data = brotli.compress(PAYLOAD)
+        with self.assertRaises(DecompressionError):
+            decode("br", data, 4096, len(PAYLOAD) - 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""Tests for the DOM node classes and the arena views.
+
+Run from the repository root:
+
+    python -m unittest discover tests
+"""
+
+import unittest
+
+from dom.element import EMPTY_MAPPING, Element
+from dom.htmlparser import HTMLParser
+from dom.text import Text
+
+
+def nodes():
+    """An element with attributes, one without and a text node, both as
+    objects and as arena views."""
+    body = "<div id=a><span>x</span></div>"
+    for arena in [False, True]:
+        root = HTMLParser(body, arena=arena).parse()
+        div = root.children[0].children[0]
+        span = div.children[0]
+        yield div, span, span.children[0]
+
+
+class MappingTest(unittest.TestCase):
+    def test_read_only_on_every_node(self):
+        for div, span, text in nodes():
+            for node in [div, span]:
+                with self.subTest(node=node):
+                    with self.assertRaises(TypeError):
+                        node.attributes["title"] = "t"
+            for node in [div, span, text]:
+                with self.subTest(node=node):
+                    with self.assertRaises(TypeError):
+                        node.style["color"] = "red"
+
+    def test_assign_whole_mappings(self):
+        for div, span, text in nodes():
+            div.attributes = dict(div.attributes, title="t")
+            self.assertEqual(dict(div.attributes), {"id": "a", "title": "t"})
+            span.attributes = {"class": "c"}
+            self.assertEqual(span.attributes["class"], "c")
+            for node in [div, span, text]:
+                node.style = {"color": "red"}
+                self.assertEqual(node.style["color"], "red")
+                with self.assertRaises(TypeError):
+                    node.style["color"] = "blue"
+
+    def test_empty_mappings_are_shared(self):
+        element = Element("p", {}, None)
+        text = Text("x", element)
+        self.assertIs(element.attributes, EMPTY_MAPPING)
+        self.assertIs(element.style, EMPTY_MAPPING)
+        self.assertIs(text.style, EMPTY_MAPPING)
+        element.attributes = {"id": "p"}
+        element.attributes = {}
+        self.assertIs(element.attributes, EMPTY_MAPPING)
+
+
+if __name__ == "__main__":
+    unittest.main()
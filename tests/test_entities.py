@@ -0,0 +1,72 @@
+"""Tests for character reference decoding in text and attribute values.
+
+Run from the repository root:
+
+    python -m unittest discover tests
+"""
+
+import html
+import unittest
+
+from dom.entities import decode_entities, decoded_references
+from dom.htmlparser import HTMLParser
+
+
+class TextTest(unittest.TestCase):
+    def test_references(self):
+        cases = {
+            "&amp;lt;": "&lt;",
+            "&#60;&#x3c;&#X3C;&lt": "<<<<",
+            "&mdash;&hellip;&euro;": "—…€",
+            "&#128;&#0;": "€�",
+            "&#xD800;&#1114112;": "��",
+            "&copy 2024 &unknown;": "© 2024 &unknown;",
+            "&copyright": "©right",
+            "&notin; &notit;": "∉ ¬it;",
+            "a & b &; &# &#x;": "a & b &; &# &#x;",
+            "no references": "no references",
+        }
+        for text, expected in cases.items():
+            with self.subTest(text):
+                self.assertEqual(decode_entities(text), expected)
+
+    def test_matches_html_unescape(self):
+        texts = [
+            "Tom &amp; Jerry &lt;3 caf&eacute; &copy; 2024 &mdash; &#8220;q&#8221;",
+            "&#x263A; &nbsp;&euro;10 &hellip; a &lt; b &gt; c &AMP &Eacute",
+            "&amp&ampx &ltb &gt= &frac12; &frac1 &#65&#x42",
+        ]
+        for text in texts:
+            with self.subTest(text):
+                self.assertEqual(decode_entities(text), html.unescape(text))
+
+    def test_memo_maps_unknown_references_to_themselves(self):
+        self.assertEqual(decoded_references["&lt;"], "<")
+        self.assertEqual(decoded_references["&nosuchname;"], "&nosuchname;")
+
+
+class AttributeTest(unittest.TestCase):
+    def test_references(self):
+        cases = {
+            "?a=1&copy=2": "?a=1&copy=2",
+            "?a=1&copy;=2": "?a=1©=2",
+            "&amp=": "&amp=",
+            "&copyright": "&copyright",
+            "&copy 2024": "© 2024",
+            "&lt;b&gt;": "<b>",
+            "&#60;x": "<x",
+        }
+        for text, expected in cases.items():
+            with self.subTest(text):
+                self.assertEqual(decode_entities(text, attribute=True), expected)
+
+    def test_parser_decodes_text_and_attributes(self):
+        root = HTMLParser('<a href="?x=1&copy=2&amp;y" title=&lt;&copy>a&ampb</a>')
+        a = root.parse().children[0].children[0]
+        self.assertEqual(a.attributes["href"], "?x=1&copy=2&y")
+        self.assertEqual(a.attributes["title"], "<©")
+        self.assertEqual(a.children[0].text, "a&b")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+"""Parity tests for the tokenizer-based HTMLParser.
+
+Trees are compared as nested tuples against OldHTMLParser, the
+character-by-character parser it replaced (kept in reference_parser),
+whole and fed in pieces split at every possible point.
+
+Run from the repository root:
+
+    python -m unittest discover tests
+"""
+
+import unittest
+
+from dom.htmlparser import HTMLParser
+from dom.text import Text
+from tests.reference_parser import OldHTMLParser, make_document
+
+# Documents both parsers must turn into the same tree
+DOCUMENTS = {
+    "nested": "<html><body><div><span>a</span> b <b>c</b></div></body></html>",
+    "implicit tags": "<title>t</title><meta charset=utf-8><div>x</div>",
+    "attributes": (
+        "<div class='a' id=\"b\" data-x=1 hidden><a href='/x?a=1'>link</a></div>"
+    ),
+    "entities": "<div>Tom &amp; Jerry &lt;3 caf&eacute; &copy; &nbsp;x</div>",
+    "misnested": "<div><b><i>x</b> y</i></div><span>z",
+    "void elements": "<div>a<br>b<img src='i.png'><hr><input type=text></div>",
+    "pre and code": "<pre>  keep\n   this <b>bold</b>\n</pre><code> x  y </code>",
+    "whitespace": "<div>\n  <span>a</span>\n  \n</div>",
+    "doctype": (
+        "<!DOCTYPE html><html><head><link rel=stylesheet href=a.css></head>"
+        "<body>x</body></html>"
+    ),
+    "lists and paragraphs": "<ul><li>one<li>two</ul><p>a<p>b",
+}
+
+
+def dump(node):
+    if isinstance(node, Text):
+        return ("text", node.text)
+    return (
+        node.tag,
+        sorted(node.attributes.items()),
+        [dump(child) for child in node.children],
+    )
+
+
+def parse_in_pieces(body, size):
+    parser = HTMLParser()
+    for start in range(0, len(body), size):
+        parser.feed(body[start : start + size])
+    return parser.close()
+
+
+class ParityTest(unittest.TestCase):
+    def test_same_tree_as_old_parser(self):
+        for name, body in DOCUMENTS.items():
+            with self.subTest(name):
+                self.assertEqual(
+                    dump(HTMLParser(body).parse()), dump(OldHTMLParser(body).parse())
+                )
+
+    def test_split_at_every_point(self):
+        for name, body in DOCUMENTS.items():
+            expected = dump(OldHTMLParser(body).parse())
+            for split in range(len(body) + 1):
+                with self.subTest(name, split=split):
+                    parser = HTMLParser()
+                    parser.feed(body[:split])
+                    parser.feed(body[split:])
+                    self.assertEqual(dump(parser.close()), expected)
+
+    def test_fed_in_chunks(self):
+        body = make_document(20000)
+        expected = dump(HTMLParser(body).parse())
+        for size in [1, 7, 64, 1000, 4096]:
+            with self.subTest(size=size):
+                self.assertEqual(dump(parse_in_pieces(body, size)), expected)
+
+    def test_long_tokens_in_pieces(self):
+        # Each token spans many pieces, with what ends it split across two
+        bodies = {
+            "script": "<script>" + "if (a < b) {}</scrip" * 300 + "</script>x",
+            "text": "<p>" + "a &amp; b < c " * 300 + "<b>x</b>",
+            "comment": "<!--" + "- -> --!" * 300 + "--><i>x</i>",
+            "bogus comment": "<!" + "x-" * 300 + "><i>x</i>",
+            "quoted attribute": "<a title='" + 'x > "y" ' * 300 + "'>y</a>",
+        }
+        for name, body in bodies.items():
+            expected = dump(HTMLParser(body).parse())
+            for size in [1, 2, 3, 7, 100]:
+                with self.subTest(name, size=size):
+                    self.assertEqual(dump(parse_in_pieces(body, size)), expected)
+
+    def test_arena_same_tree(self):
+        for name, body in dict(DOCUMENTS, generated=make_document(20000)).items():
+            with self.subTest(name):
+                self.assertEqual(
+                    dump(HTMLParser(body, arena=True).parse()),
+                    dump(HTMLParser(body).parse()),
+                )
+
+
+class FixedTest(unittest.TestCase):
+    """Where the old parser was wrong, the new one must differ."""
+
+    def test_quoted_attribute_with_spaces(self):
+        body = '<meta name="viewport" content="width=device-width, initial-scale=1">'
+        meta = HTMLParser(body).parse().children[0].children[0]
+        self.assertEqual(
+            meta.attributes["content"], "width=device-width, initial-scale=1"
+        )
+
+    def test_comment_leaves_no_text(self):
+        body = "<div>a<!-- <b>not</b> -->b</div>"
+        div = HTMLParser(body).parse().children[0].children[0]
+        self.assertEqual(dump(div), ("div", [], [("text", "a"), ("text", "b")]))
+
+    def test_script_body_is_raw_text(self):
+        body = "<script>if (a < b && c) { f('<b>'); }</script>"
+        script = HTMLParser(body).parse().children[0].children[0]
+        self.assertEqual(
+            dump(script), ("script", [], [("text", "if (a < b && c) { f('<b>'); }")])
+        )
+
+    def test_script_end_tag_split_across_feeds(self):
+        body = "<script>x = '</scr' + 'ipt>';</script><div>y</div>"
+        for split in range(len(body) + 1):
+            with self.subTest(split=split):
+                parser = HTMLParser()
+                parser.feed(body[:split])
+                parser.feed(body[split:])
+                self.assertEqual(dump(parser.close()), dump(HTMLParser(body).parse()))
+
+
+if __name__ == "__main__":
+    unittest.main()